@@ -3,20 +3,52 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 import streamlit as st
 import pandas as pd
 import sqlite3
-from pathlib import Path
-from mca_insights.config import DB_PATH, SELECTED_STATES, MASTER_CSV, SUMMARIES_DIR
+from datetime import date
+from mca_insights.config import DB_PATH, SELECTED_STATES, MASTER_CSV
 from mca_insights.chatbot import interpret_and_execute
+from mca_insights.database import init_db, data_generation, company_filter_sql, rollup_date_range, CHANGE_ROWS_SQL
+from mca_insights.ai_summary import PERIOD_DAYS, window_start, summarize_window
 
 
 
 st.set_page_config(page_title="MCA Insights Engine", layout="wide")
+init_db()
 
 def _connect():
     return sqlite3.connect(DB_PATH)
 
+@st.cache_data(ttl=5, show_spinner=False)
+def _generation():
+    with _connect() as conn:
+        return data_generation(conn)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _rollup_range(gen):
+    with _connect() as conn:
+        return rollup_date_range(conn)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _window_summary(gen, start, end):
+    return summarize_window(start, end)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _count_companies(gen, filters):
+    from_sql, params = company_filter_sql(*filters)
+    with _connect() as conn:
+        return conn.execute("SELECT COUNT(*) " + from_sql, params).fetchone()[0]
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _load_page(gen, filters, page_size, offset):
+    from_sql, params = company_filter_sql(*filters)
+    sql = "SELECT c.* " + from_sql + " ORDER BY c.rowid LIMIT ? OFFSET ?"
+    with _connect() as conn:
+        return pd.read_sql_query(sql, conn, params=params + (page_size, offset))
+
 st.title("MCA Insights Engine")
+# The pipeline bumps the generation after each commit; it keys the caches below
+gen = _generation()
 
-tab1, tab2, tab3 = st.tabs(["🔎 Explore", "💬 Chat with MCA Data", "📈 Daily Summary"])
+tab1, tab2, tab3 = st.tabs(["🔎 Explore", "💬 Chat with MCA Data", "📈 Summaries"])
 
 with tab1:
     st.subheader("Search & Filters")
@@ -29,27 +61,28 @@ with tab1:
     with cols[2]:
         status = st.selectbox("Company Status", options=["All", "Active", "Strike Off", "Amalgamated", "Dormant"])
 
-    with _connect() as conn:
-        df = pd.read_sql_query("SELECT * FROM companies", conn)
-
-    if q:
-        if len(q) >= 5:
-            df = df[(df['CIN'].str.contains(q.upper())) | (df['Company_Name'].str.contains(q, case=False))]
+    cols = st.columns(2)
+    with cols[0]:
+        page_size = st.selectbox("Rows per page", options=[25, 50, 100, 250], index=1)
 
-    if year != "All":
-        df = df[df['Date_of_Incorporation'].str.startswith(year)]
-    if state != "All":
-        df = df[df['State'] == state]
-    if status != "All":
-        df = df[df['Company_Status'].str.contains(status, case=False, na=False)]
+    # Short queries would match most of the table; search starts at 5 characters
+    term = q.strip() if q and len(q.strip()) >= 5 else None
+    filters = (term, int(year) if year != "All" else None,
+               state if state != "All" else None, status if status != "All" else None)
+    total = _count_companies(gen, filters)
+    pages = max(1, -(-total // page_size))
+    with cols[1]:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
 
+    df = _load_page(gen, filters, page_size, (int(page) - 1) * page_size)
+    st.caption(f"{total:,} companies match")
     st.dataframe(df, use_container_width=True, height=400)
 
     st.markdown("#### Change History (select a CIN)")
     selected_cin = st.text_input("CIN for history")
     if selected_cin:
         with _connect() as conn:
-            ch = pd.read_sql_query("SELECT * FROM change_log WHERE CIN = ? ORDER BY Date", conn, params=(selected_cin.upper(),))
+            ch = pd.read_sql_query(CHANGE_ROWS_SQL + " WHERE e.CIN = ? ORDER BY e.Day", conn, params=(selected_cin.upper(),))
         st.dataframe(ch, use_container_width=True, height=300)
 
 with tab2:
@@ -71,8 +104,27 @@ with tab2:
             st.info(res.get('message', 'Sorry, no result.'))
 
 with tab3:
-    st.subheader("Daily Summaries")
-    files = sorted([p for p in Path(SUMMARIES_DIR).glob("daily_summary_*.json")])
-    for f in files:
-        st.write(f"**{f.name}**")
-        st.json(pd.read_json(f).to_dict(orient='records')[0] if f.exists() else {})
+    st.subheader("Change Summaries")
+    first, last = _rollup_range(gen)
+    if last is None:
+        st.info("No changes recorded yet. Run the pipeline first.")
+    else:
+        cols = st.columns(2)
+        with cols[0]:
+            period = st.selectbox("Window", options=list(PERIOD_DAYS), format_func=str.title)
+        with cols[1]:
+            end = st.date_input("Ending on", value=date.fromisoformat(last),
+                                min_value=date.fromisoformat(first), max_value=date.fromisoformat(last))
+        start = window_start(end.isoformat(), period)
+        summary = _window_summary(gen, start, end.isoformat())
+        st.caption(f"{start} to {end.isoformat()}")
+        m = st.columns(3)
+        m[0].metric("New incorporations", summary["new_incorporations"])
+        m[1].metric("Deregistered", summary["deregistered"])
+        m[2].metric("Updated records", summary["updated_records"])
+        if len(summary["daily"]) > 1:
+            st.bar_chart(pd.DataFrame(summary["daily"]).set_index("date"))
+        for title, key in (("By state", "by_state"), ("By sector", "by_sector")):
+            if summary[key]:
+                st.write(f"**{title}**")
+                st.dataframe(pd.DataFrame(summary[key]).T.fillna(0).astype(int), use_container_width=True)
@@ -1,4 +1,6 @@
-from mca_insights.api import app
+from mca_insights.api import app, _pool
 
 if __name__ == "__main__":
+    with _pool.connection():
+        pass  # fail at startup, not on the first request, when the database needs migrating
     app.run(host="0.0.0.0", port=8000, debug=True)
@@ -0,0 +1,109 @@
+"""Compare the full-table REPLACE rewrite with the delta-only write path.
+
+    python benchmarks/bench_db_write.py --rows 1000000 --change-ratio 0.05
+
+Both variants start from the same seeded database and must end with
+identical `companies` / `change_log` contents. The full rewrite keeps the
+original single-table schema; the delta database is migrated by init_db first.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TMP = Path(tempfile.mkdtemp(prefix="mca_bench_db_"))
+os.environ["MCA_DB_PATH"] = str(TMP / "delta.db")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mca_insights.config import CANONICAL_COLUMNS  # noqa: E402
+from mca_insights.database import SCHEMA_COMPANIES, SCHEMA_CHANGELOG, init_db, apply_daily_changes  # noqa: E402
+from mca_insights.change_detector import detect_changes, rows_to_write  # noqa: E402
+
+def make_frames(n: int, change_ratio: float, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    prev = pd.DataFrame({
+        "CIN": [f"U{i:015d}" for i in range(n)],
+        "Company_Name": [f"Company {i} Pvt Ltd" for i in range(n)],
+        "Company_Class": rng.choice(["Private", "Public"], n),
+        "Date_of_Incorporation": "2015-01-01",
+        "Authorized_Capital": rng.choice([1e5, 1e6, 1e7], n),
+        "Paidup_Capital": 1e5,
+        "Company_Status": "Active",
+        "NIC_Code": rng.choice(["10", "46", "62"], n),
+        "Registered_Address": "1, Mumbai",
+        "RoC": "RoC-Mumbai",
+        "State": "Maharashtra",
+    })
+    k = max(1, int(n * change_ratio))
+    curr = prev.iloc[k:].copy()                      # k deregistered
+    upd = rng.choice(curr.index, size=k, replace=False)
+    curr.loc[upd, "Company_Status"] = "Strike Off"   # k updated
+    adds = prev.iloc[:k].copy()
+    adds["CIN"] = [f"N{i:015d}" for i in range(k)]   # k new
+    return prev, pd.concat([curr, adds], ignore_index=True)
+
+def seed_db(path: Path, prev: pd.DataFrame):
+    with sqlite3.connect(path) as conn:
+        conn.execute(SCHEMA_COMPANIES)
+        conn.execute(SCHEMA_CHANGELOG)
+        conn.executemany(f"INSERT INTO companies VALUES ({','.join('?' * len(CANONICAL_COLUMNS))})",
+                         prev[CANONICAL_COLUMNS].astype(object).itertuples(index=False, name=None))
+
+def full_rewrite(path: Path, curr: pd.DataFrame, changes: pd.DataFrame):
+    # The previous write path: REPLACE every row, then a second connection for change_log
+    rows = curr.to_dict(orient="records")
+    with sqlite3.connect(path) as conn:
+        sql = f"REPLACE INTO companies ({','.join(CANONICAL_COLUMNS)}) VALUES ({','.join('?' * len(CANONICAL_COLUMNS))})"
+        conn.executemany(sql, [tuple(r.get(k) for k in CANONICAL_COLUMNS) for r in rows])
+        conn.commit()
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO change_log (CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date) VALUES (?,?,?,?,?,?)",
+                         [(r["CIN"], r["Change_Type"], r["Field_Changed"], str(r["Old_Value"]), str(r["New_Value"]), r["Date"])
+                          for r in changes.to_dict(orient="records")])
+        conn.commit()
+
+def table(path: Path, sql: str) -> pd.DataFrame:
+    with sqlite3.connect(path) as conn:
+        return pd.read_sql_query(sql, conn)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--change-ratio", type=float, default=0.05)
+    args = ap.parse_args()
+
+    prev, curr = make_frames(args.rows, args.change_ratio)
+    changes = detect_changes(prev, curr, "2025-01-02")
+    base, full_db, delta_db = TMP / "base.db", TMP / "full.db", Path(os.environ["MCA_DB_PATH"])
+    seed_db(base, prev)
+    shutil.copy(base, full_db)
+    shutil.copy(base, delta_db)
+    init_db()  # the delta path writes through the current schema (derived columns, change_events)
+
+    t0 = time.perf_counter()
+    full_rewrite(full_db, curr, changes)
+    t_full = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    delta = rows_to_write(prev, curr, changes)
+    apply_daily_changes(delta, changes, "2025-01-02")
+    t_delta = time.perf_counter() - t0
+
+    for sql in (f"SELECT {', '.join(CANONICAL_COLUMNS)} FROM companies ORDER BY CIN",
+                "SELECT CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date FROM change_log ORDER BY id"):
+        pd.testing.assert_frame_equal(table(full_db, sql), table(delta_db, sql))
+
+    print(f"rows={len(curr):,} changes={len(changes):,} rows_written={len(delta):,}")
+    print(f"full rewrite : {t_full:8.3f} s")
+    print(f"delta write  : {t_delta:8.3f} s  ({t_full / t_delta:.1f}x)")
+    shutil.rmtree(TMP, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
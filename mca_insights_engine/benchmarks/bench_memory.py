@@ -0,0 +1,84 @@
+"""Compare in-memory size and diff time of object-typed vs ingest-typed snapshots.
+
+    python benchmarks/bench_memory.py --companies 1M
+
+Writes two days of synthetic snapshots (sample_data_generator fast mode) to a
+scratch directory and consolidates them once. The "object" variant is that
+frame cast back to the dtypes the ingest used to produce (Python strings,
+integer NIC codes, no ingest-time Row_Hash). The "typed" variant keeps schema.INGEST_DTYPES. For each
+variant the script prints deep memory per column, bytes per company and the
+detect_changes wall time, and checks both variants produce the same changes.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TMP = Path(tempfile.mkdtemp(prefix="mca_bench_memory_"))
+os.environ["MCA_DATA_DIR"] = str(TMP / "data")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mca_insights.config import SNAPSHOTS_DIR  # noqa: E402
+from mca_insights.integrate import consolidate_snapshot_dir  # noqa: E402
+from mca_insights.change_detector import detect_changes  # noqa: E402
+from sample_data_generator import write_snapshots_fast, _parse_count  # noqa: E402
+
+DAYS = ("2025-01-01", "2025-01-02")
+
+def as_object(df: pd.DataFrame) -> pd.DataFrame:
+    """The frame with the dtypes consolidation produced before typed ingest."""
+    out = {}
+    for col in df.columns.drop('Row_Hash', errors='ignore'):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(s.cat.categories.dtype)
+        elif isinstance(s.dtype, pd.StringDtype):
+            s = s.astype(object).where(s.notna(), np.nan)
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+def report(label, frame):
+    per_col = frame.memory_usage(deep=True, index=False)
+    total = int(per_col.sum())
+    print(f"\n{label}: {total / 1024 ** 2:,.1f} MB ({total / len(frame):,.0f} B/company)")
+    for col, nbytes in per_col.items():
+        print(f"  {col:<24} {str(frame[col].dtype):<16} {nbytes / 1024 ** 2:>10,.1f} MB")
+    return total
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--companies", type=_parse_count, default=1_000_000)
+    ap.add_argument("--change-ratio", type=float, default=0.05)
+    args = ap.parse_args()
+
+    try:
+        print(f"[{args.companies:,} companies] generating snapshots ...")
+        write_snapshots_fast(DAYS, args.companies, seed=7, out_dir=SNAPSHOTS_DIR, add_ratio=args.change_ratio,
+                             upd_ratio=args.change_ratio, del_ratio=args.change_ratio)
+        typed = [consolidate_snapshot_dir(SNAPSHOTS_DIR / d, use_cache=False) for d in DAYS]
+        plain = [as_object(df) for df in typed]
+
+        sizes, changes = {}, {}
+        for label, (prev, curr) in (("object", plain), ("typed", typed)):
+            sizes[label] = report(label, curr)
+            t0 = time.perf_counter()
+            changes[label] = detect_changes(prev, curr, DAYS[1])
+            print(f"  detect_changes: {time.perf_counter() - t0:.2f}s, {len(changes[label]):,} changes")
+    finally:
+        shutil.rmtree(TMP, ignore_errors=True)
+
+    print(f"\ntyped / object memory: {sizes['typed'] / sizes['object']:.2f} "
+          f"({sizes['object'] / sizes['typed']:.1f}x smaller)")
+    if not changes["object"].astype(str).equals(changes["typed"].astype(str)):
+        print("MISMATCH: typed frames produced different changes")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
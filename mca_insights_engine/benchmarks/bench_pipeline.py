@@ -0,0 +1,143 @@
+"""Time each pipeline stage on synthetic snapshots of increasing size.
+
+    python benchmarks/bench_pipeline.py --sizes 10k,100k,1M
+    python benchmarks/bench_pipeline.py --sizes 10k,100k --output benchmarks/results/baseline.json
+    python benchmarks/bench_pipeline.py --sizes 10k,100k --compare benchmarks/results/baseline.json
+
+For every size, two days of state CSVs are generated with
+sample_data_generator's fast mode (`--change-ratio` of the companies added,
+updated and removed on day two) in a scratch directory, and
+the stages run in pipeline order against a scratch database and outputs dir:
+consolidate_snapshot_dir, seed_companies (day-one seed), detect_changes,
+apply_daily_changes, export_master_csv, enrich_sample and generate_daily_summary.
+Frames are passed to the DB writers as the pipeline does, not as lists of dicts.
+
+Each stage records wall time, rows/s and peak RSS (sampled while the stage
+runs). Results go to `--output` as JSON. With `--compare`, the run exits 1
+when a stage is slower than the baseline by more than `--threshold` (or
+uses more than `--rss-threshold` extra peak memory).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+# Scratch data/outputs dirs must be set before mca_insights.config is imported
+TMP = Path(tempfile.mkdtemp(prefix="mca_bench_pipeline_"))
+os.environ["MCA_DATA_DIR"] = str(TMP / "data")
+os.environ["MCA_OUTPUTS_DIR"] = str(TMP / "outputs")
+os.environ["MCA_DB_PATH"] = str(TMP / "outputs" / "master.db")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mca_insights.config import SNAPSHOTS_DIR, OUTPUTS_DIR  # noqa: E402
+from mca_insights.integrate import consolidate_snapshot_dir  # noqa: E402
+from mca_insights.change_detector import detect_changes, rows_to_write  # noqa: E402
+from mca_insights.database import init_db, seed_companies, apply_daily_changes, export_master_csv  # noqa: E402
+from mca_insights.enrichers import enrich_sample  # noqa: E402
+from mca_insights.ai_summary import generate_daily_summary  # noqa: E402
+from mca_insights.metrics import PeakRSS  # noqa: E402
+from sample_data_generator import write_snapshots_fast  # noqa: E402
+
+DAYS = ("2025-01-01", "2025-01-02")
+# Stages faster than this are too noisy to gate on
+MIN_GATED_SECONDS = 0.05
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def timed(results, size, stage, rows, fn, *args, **kwargs):
+    with PeakRSS() as mem:
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        wall = time.perf_counter() - t0
+    results.append({"size": size, "stage": stage, "rows": int(rows), "wall_s": round(wall, 4),
+                    "rows_per_s": round(rows / wall, 1) if wall > 0 else None,
+                    "peak_rss_mb": round(mem.peak / 1024 ** 2, 1)})
+    r = results[-1]
+    print(f"  {stage:<26} {r['wall_s']:>9.3f}s {r['rows_per_s'] or 0:>14,.0f} rows/s {r['peak_rss_mb']:>9.1f} MB")
+    return out
+
+def run_size(n: int, change_ratio: float):
+    results = []
+    shutil.rmtree(TMP / "data", ignore_errors=True)
+    shutil.rmtree(OUTPUTS_DIR, ignore_errors=True)
+    (OUTPUTS_DIR / "enrichment").mkdir(parents=True)
+    print(f"[{n:,} companies] generating snapshots ...")
+    write_snapshots_fast(DAYS, n, seed=7, out_dir=SNAPSHOTS_DIR,
+                         add_ratio=change_ratio, upd_ratio=change_ratio, del_ratio=change_ratio)
+    init_db()
+
+    prev = consolidate_snapshot_dir(SNAPSHOTS_DIR / DAYS[0], use_cache=False)
+    curr = timed(results, n, "consolidate_snapshot_dir", n, consolidate_snapshot_dir,
+                 SNAPSHOTS_DIR / DAYS[1], use_cache=False)
+    timed(results, n, "seed_companies", len(prev), seed_companies, prev, DAYS[0])
+    changes = timed(results, n, "detect_changes", len(curr), detect_changes, prev, curr, DAYS[1])
+    delta = rows_to_write(prev, curr, changes)
+    timed(results, n, "apply_daily_changes", len(delta) + len(changes), apply_daily_changes, delta, changes, DAYS[1])
+    master_csv = OUTPUTS_DIR / "master_latest.csv"
+    timed(results, n, "export_master_csv", len(prev), export_master_csv, master_csv)
+    master = pd.read_csv(master_csv)
+    changed = changes["CIN"].unique().tolist()
+    timed(results, n, "enrich_sample", min(100, len(changed)), enrich_sample, changed, master, limit=100)
+    timed(results, n, "generate_daily_summary", len(changes), generate_daily_summary, DAYS[1])
+    return results
+
+def compare(results, baseline_path: Path, threshold: float, rss_threshold: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {(r["size"], r["stage"]): r for r in json.load(f)["results"]}
+    failed = 0
+    for r in results:
+        b = base.get((r["size"], r["stage"]))
+        if b is None:
+            continue
+        slow = r["wall_s"] > b["wall_s"] * (1 + threshold) and r["wall_s"] - b["wall_s"] > MIN_GATED_SECONDS
+        fat = r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + rss_threshold)
+        status = "FAIL" if slow or fat else "ok  "
+        failed += slow or fat
+        print(f"[{status}] {r['size']:>10,} {r['stage']:<26} {b['wall_s']:>8.3f}s -> {r['wall_s']:>8.3f}s "
+              f"{b['peak_rss_mb']:>8.1f}MB -> {r['peak_rss_mb']:>8.1f}MB")
+    print(f"{failed} regression(s) against {baseline_path}")
+    return 1 if failed else 0
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="10k,100k", help="comma-separated company counts, e.g. 10k,100k,1M,10M")
+    ap.add_argument("--change-ratio", type=float, default=0.05)
+    ap.add_argument("--output", type=Path, default=Path(__file__).resolve().parent / "results" / "latest.json")
+    ap.add_argument("--compare", type=Path, help="baseline results JSON to gate against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed relative wall-time regression")
+    ap.add_argument("--rss-threshold", type=float, default=0.25, help="allowed relative peak-RSS regression")
+    args = ap.parse_args()
+
+    results = []
+    try:
+        for n in (parse_size(s) for s in args.sizes.split(",")):
+            results += run_size(n, args.change_ratio)
+    finally:
+        shutil.rmtree(TMP, ignore_errors=True)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": {"created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                            "python": platform.python_version(), "platform": platform.platform(),
+                            "sqlite": sqlite3.sqlite_version, "cpus": os.cpu_count(),
+                            "change_ratio": args.change_ratio},
+                   "results": results}, f, indent=2)
+    print(f"results -> {args.output}")
+    if args.compare:
+        return compare(results, args.compare, args.threshold, args.rss_threshold)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Closed-loop load test for the Flask API; reports p50/p99 latency and requests/s.
+
+    python apps/flask_api.py &                     # or: flask run -p 8000
+    python benchmarks/load_test_api.py --url http://localhost:8000 --requests 5000 --concurrency 16
+
+Requests mix CIN lookups and name searches sampled from the database
+(MCA_DB_PATH or outputs/master.db). Run it against two builds to compare
+before/after. With `--batch N`, every request instead POSTs N sampled CINs to
+/companies/batch, and CINs/s is reported as well.
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mca_insights.config import DB_PATH  # noqa: E402
+
+def sample_paths(n: int, name_ratio: float, seed: int = 1):
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute("SELECT CIN, Company_Name FROM companies ORDER BY random() LIMIT 2000").fetchall()
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(n):
+        cin, name = rng.choice(rows)
+        if rng.random() < name_ratio and name:
+            term = name.split('-')[0] if '-' in name else name[:5]
+            paths.append("/search_company?" + urllib.parse.urlencode({"name": term}))
+        else:
+            paths.append("/search_company?" + urllib.parse.urlencode({"cin": cin}))
+    return paths
+
+def sample_batches(n: int, size: int, seed: int = 1):
+    with sqlite3.connect(DB_PATH) as conn:
+        cins = [r[0] for r in conn.execute("SELECT CIN FROM companies ORDER BY random() LIMIT 2000")]
+    rng = random.Random(seed)
+    return [json.dumps({"cins": rng.sample(cins, min(size, len(cins)))}).encode() for _ in range(n)]
+
+def hit(url) -> float:
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as r:
+        r.read()
+    return time.perf_counter() - t0
+
+def percentile(sorted_vals, p):
+    k = min(len(sorted_vals) - 1, max(0, int(round(p / 100 * len(sorted_vals))) - 1))
+    return sorted_vals[k]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--name-ratio", type=float, default=0.3, help="share of name searches")
+    ap.add_argument("--batch", type=int, default=0, help="CINs per POST /companies/batch (0: GET /search_company)")
+    ap.add_argument("--label", default="")
+    args = ap.parse_args()
+
+    if args.batch:
+        urls = [urllib.request.Request(args.url.rstrip("/") + "/companies/batch", data=body,
+                                       headers={"Content-Type": "application/json"})
+                for body in sample_batches(args.requests, args.batch)]
+    else:
+        urls = [args.url.rstrip("/") + p for p in sample_paths(args.requests, args.name_ratio)]
+    hit(urls[0])  # warm up
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        lat = sorted(pool.map(hit, urls))
+    wall = time.perf_counter() - t0
+    print(f"{args.label or args.url}: n={len(lat)} c={args.concurrency} "
+          f"p50={percentile(lat, 50) * 1000:.2f}ms p99={percentile(lat, 99) * 1000:.2f}ms "
+          f"rps={len(lat) / wall:.1f}" + (f" cins/s={len(lat) * args.batch / wall:.0f}" if args.batch else ""))
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,56 @@
-from pathlib import Path
+from datetime import date, timedelta
+from typing import Dict, Any
 import json
 import pandas as pd
 from .config import SUMMARIES_DIR
+from .database import read_rollups, status_change_cins
 
-def generate_daily_summary(change_log_csv: Path, out_date: str):
-    df = pd.read_csv(change_log_csv)
-    total_new = (df['Change_Type'] == 'New Incorporation').sum()
-    total_dereg = (df['Change_Type'] == 'Deregistered').sum()
-    total_updates = (df['Change_Type'] == 'Field Update').sum()
+# Trailing windows (days, ending on the chosen date) offered for summaries
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30, "quarter": 91}
 
-    note_status = df[df['Field_Changed'] == 'Company_Status']
-    notable_status = note_status['CIN'].unique().tolist()
+def window_start(end: str, period: str) -> str:
+    return (date.fromisoformat(end) - timedelta(days=PERIOD_DAYS[period] - 1)).isoformat()
+
+def _totals(df: pd.DataFrame) -> Dict[str, int]:
+    by_type = df.groupby('Change_Type')['Count'].sum()
+    return {
+        "new_incorporations": int(by_type.get('New Incorporation', 0)),
+        "deregistered": int(by_type.get('Deregistered', 0)),
+        "updated_records": int(by_type.get('Field Update', 0)),
+    }
+
+def summarize_window(start: str, end: str) -> Dict[str, Any]:
+    """Change counts for Date in [start, end], read from daily_rollups only."""
+    df = read_rollups(start, end)
+    updates = df[df['Change_Type'] == 'Field Update']
+
+    def breakdown(col):
+        t = df.pivot_table(index=col, columns='Change_Type', values='Count', aggfunc='sum', fill_value=0)
+        return {k or 'Unknown': {ct: int(n) for ct, n in row.items()} for k, row in t.iterrows()}
+
+    return {
+        "start": start,
+        "end": end,
+        **_totals(df),
+        "field_updates": {k: int(v) for k, v in updates.groupby('Field_Changed')['Count'].sum().items()},
+        "by_state": breakdown('State'),
+        "by_sector": breakdown('Sector'),
+        "daily": [{"date": d, **_totals(g)} for d, g in df.groupby('Date')],
+    }
+
+def generate_daily_summary(out_date: str):
+    summary = summarize_window(out_date, out_date)
+    total_new = summary["new_incorporations"]
+    total_dereg = summary["deregistered"]
+    total_updates = summary["updated_records"]
+    notable_status = status_change_cins(out_date, out_date, limit=20)
 
     summary = {
         "date": out_date,
-        "new_incorporations": int(total_new),
-        "deregistered": int(total_dereg),
-        "updated_records": int(total_updates),
-        "notable_status_changes_CINs": notable_status[:20],
+        "new_incorporations": total_new,
+        "deregistered": total_dereg,
+        "updated_records": total_updates,
+        "notable_status_changes_CINs": notable_status,
     }
 
     SUMMARIES_DIR.mkdir(parents=True, exist_ok=True)
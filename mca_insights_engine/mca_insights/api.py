@@ -1,35 +1,402 @@
 from flask import Flask, request, jsonify
+import json
+import os
+import queue
 import sqlite3
-from .config import DB_PATH
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from .config import (DB_PATH, NAME_SEARCH_LIMIT, API_POOL_SIZE, API_MMAP_SIZE,
+                     API_CACHE_SIZE, API_CACHE_TTL, API_CACHE_GENERATION_POLL,
+                     API_BATCH_MAX_CINS, API_PAGE_SIZE, API_PAGE_MAX, API_FEED_PAGE_SIZE, API_FEED_PAGE_MAX,
+                     API_FEED_MAX_WAIT, API_FEED_POLL_INTERVAL, API_FEED_HEARTBEAT)
+from .database import (schema_version, name_search_sql, company_page_sql, change_feed_sql, data_generation, day_int,
+                       AS_OF_SQL, LATEST_CHANGE_ID_SQL,
+                       CHANGE_HISTORY_SQL, CHANGE_HISTORY_UNTIL_SQL, CHANGE_HISTORY_BATCH_SQL,
+                       CHANGE_HISTORY_BATCH_UNTIL_SQL, COMPANIES_BY_CINS_SQL, SCHEMA_VERSION)
 
 app = Flask(__name__)
 
-def _connect():
-    return sqlite3.connect(DB_PATH)
+NDJSON_MIMETYPE = "application/x-ndjson"
+# Rows fetched from SQLite per step while streaming NDJSON
+STREAM_FETCH_ROWS = 500
+
+class SchemaError(RuntimeError):
+    """The database is missing or behind SCHEMA_VERSION. The API only reads, so it never
+    migrates; run the pipeline (or `python -m mca_insights.database`) first."""
+
+def check_schema(conn):
+    current = schema_version(conn)
+    if current < SCHEMA_VERSION:
+        raise SchemaError(f"{DB_PATH} is at schema version {current}, this API needs {SCHEMA_VERSION}; "
+                          "migrate it with `python -m mca_insights.database` or a pipeline run")
+
+class _DictCursor(sqlite3.Cursor):
+    """Cursor whose rows come back as dicts; column names are read once per query."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._columns = None
+        self.row_factory = _dict_row
+
+    def execute(self, sql, params=()):
+        self._columns = None
+        return super().execute(sql, params)
+
+def _dict_row(cursor, row):
+    if cursor._columns is None:
+        cursor._columns = [d[0] for d in cursor.description]
+    return dict(zip(cursor._columns, row))
+
+class _ReadPool:
+    """Read-only connections shared by the threads of one worker process.
+
+    Connections are long-lived, so sqlite3's per-connection statement cache
+    keeps the API's fixed SQL strings prepared across requests. The pool is
+    rebuilt after a fork so pre-forking servers never share handles.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if not DB_PATH.exists():
+            raise SchemaError(f"{DB_PATH} does not exist; build it with run_pipeline.py")
+        conn = sqlite3.connect(f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True,
+                               check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA query_only = 1")
+        conn.execute(f"PRAGMA mmap_size = {int(API_MMAP_SIZE)}")
+        try:
+            check_schema(conn)
+        except SchemaError:
+            conn.close()
+            raise
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if self._pid != os.getpid():
+            self._reset()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self._size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+_pool = _ReadPool(API_POOL_SIZE)
+
+def _query(conn, sql, params=()):
+    return conn.cursor(_DictCursor).execute(sql, params).fetchall()
+
+def _streamed_rows(sql, params=()):
+    """Yield query rows in steps, holding one pooled connection until exhausted or closed."""
+    with _pool.connection() as conn:
+        cur = conn.cursor(_DictCursor).execute(sql, params)
+        while True:
+            rows = cur.fetchmany(STREAM_FETCH_ROWS)
+            if not rows:
+                return
+            yield from rows
+
+class _ResponseCache:
+    """LRU of serialized responses with a per-entry TTL.
+
+    Keys carry the data generation written by run_pipeline; when it moves,
+    the whole cache is dropped, so no entry outlives the data it was built from.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, generation_poll: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation_poll = generation_poll
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked = 0.0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def generation(self) -> int:
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked >= self.generation_poll:
+            with _pool.connection() as conn:
+                gen = data_generation(conn)
+            with self._lock:
+                if gen != self._generation:
+                    if self._entries:
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self._generation = gen
+                self._generation_checked = now
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, body = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "expirations": self.expirations, "invalidations": self.invalidations,
+                    "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                    "size": len(self._entries), "maxsize": self.maxsize, "ttl": self.ttl,
+                    "generation": self._generation}
+
+_cache = _ResponseCache(API_CACHE_SIZE, API_CACHE_TTL, API_CACHE_GENERATION_POLL)
+
+@app.errorhandler(SchemaError)
+def schema_error(e):
+    return jsonify({"error": str(e)}), 503
+
+def _json_response(body: bytes):
+    return app.response_class(body, mimetype=app.json.mimetype)
+
+def _wants_ndjson() -> bool:
+    return request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def _ndjson_response(records):
+    """Stream one JSON line per record; only the line being sent is ever serialized."""
+    return app.response_class((app.json.dumps(r) + "\n" for r in records), mimetype=NDJSON_MIMETYPE)
+
+def _iso_date(value) -> str:
+    """value as an ISO date (YYYY-MM-DD); ValueError otherwise."""
+    return date.fromisoformat(str(value).strip()).isoformat()
 
 @app.get('/search_company')
 def search_company():
     cin = request.args.get('cin')
     name = request.args.get('name')
+    limit = max(1, min(request.args.get('limit', NAME_SEARCH_LIMIT, type=int), API_PAGE_MAX))
+    prefix = request.args.get('match') == 'prefix'
+    as_of = request.args.get('as_of')
+    if as_of:
+        try:
+            as_of = _iso_date(as_of)
+        except ValueError:
+            return jsonify({"error": "as_of must be an ISO date (YYYY-MM-DD)"}), 400
 
-    with _connect() as conn:
+    # Normalized so equivalent requests share an entry (CINs are upper-case, name search ignores case)
+    if cin:
+        cin = cin.strip().upper()
+        key = ("cin", cin, as_of)
+    elif name:
+        key = ("name", name.strip().lower(), limit, prefix, as_of)
+    else:
+        key = None
+    if key is not None and _cache.maxsize > 0:
+        key = (_cache.generation(),) + key
+        body = _cache.get(key)
+        if body is not None:
+            return _json_response(body)
+
+    with _pool.connection() as conn:
         if cin:
-            c = conn.execute("SELECT * FROM companies WHERE CIN = ?", (cin.upper(),))
-            rows = [dict(zip([d[0] for d in c.description], r)) for r in c.fetchall()]
+            rows = _query(conn, "SELECT * FROM companies WHERE CIN = ?", (cin,))
         elif name:
-            c = conn.execute("SELECT * FROM companies WHERE lower(Company_Name) LIKE ?", (f"%{name.lower()}%",))
-            rows = [dict(zip([d[0] for d in c.description], r)) for r in c.fetchall()]
+            rows = _query(conn, *name_search_sql(name, limit=limit, prefix=prefix))
         else:
             rows = []
+        if as_of:
+            # Swap each match for its version valid on that date (one history seek per CIN);
+            # name matches are on current names
+            cins = [cin] if cin else [r['CIN'] for r in rows]
+            rows = [r for c in cins for r in _query(conn, AS_OF_SQL, (c, as_of, as_of))]
 
         if rows:
             cin_val = rows[0]['CIN']
-            cl = conn.execute("SELECT CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date FROM change_log WHERE CIN = ? ORDER BY Date", (cin_val,))
-            changes = [dict(zip([d[0] for d in cl.description], r)) for r in cl.fetchall()]
+            if as_of:
+                changes = _query(conn, CHANGE_HISTORY_UNTIL_SQL, (cin_val, day_int(as_of)))
+            else:
+                changes = _query(conn, CHANGE_HISTORY_SQL, (cin_val,))
         else:
             changes = []
 
-    return jsonify({"results": rows, "change_history": changes})
+    body = jsonify({"results": rows, "change_history": changes}).get_data()
+    if key is not None:
+        _cache.put(key, body)
+    return _json_response(body)
+
+@app.post('/companies/batch')
+def companies_batch():
+    """Resolve many CINs at once: each with its company row (None when unknown) and its full
+    change history, in request order. Two queries serve the batch (plus a seek per CIN with as_of)."""
+    payload = request.get_json(silent=True) or {}
+    cins = payload.get('cins')
+    if not isinstance(cins, list) or not all(isinstance(c, str) for c in cins):
+        return jsonify({"error": "body must be a JSON object with a 'cins' list of strings"}), 400
+    cins = list(dict.fromkeys(c.strip().upper() for c in cins))
+    if len(cins) > API_BATCH_MAX_CINS:
+        return jsonify({"error": f"at most {API_BATCH_MAX_CINS} CINs per batch"}), 400
+    as_of = payload.get('as_of')
+    if as_of:
+        try:
+            as_of = _iso_date(as_of)
+        except ValueError:
+            return jsonify({"error": "as_of must be an ISO date (YYYY-MM-DD)"}), 400
+
+    cins_json = json.dumps(cins)
+    with _pool.connection() as conn:
+        if as_of:
+            companies = {r['CIN']: r for c in cins for r in _query(conn, AS_OF_SQL, (c, as_of, as_of))}
+            changes = _query(conn, CHANGE_HISTORY_BATCH_UNTIL_SQL, (cins_json, day_int(as_of)))
+        else:
+            companies = {r['CIN']: r for r in _query(conn, COMPANIES_BY_CINS_SQL, (cins_json,))}
+            changes = _query(conn, CHANGE_HISTORY_BATCH_SQL, (cins_json,))
+    history = {}
+    for change in changes:
+        history.setdefault(change['CIN'], []).append(change)
+
+    results = ({"CIN": c, "company": companies.get(c), "change_history": history.get(c, [])} for c in cins)
+    if _wants_ndjson():
+        return _ndjson_response(results)
+    return jsonify({"results": list(results)})
+
+@app.get('/companies')
+def list_companies():
+    """Companies in CIN order matching optional q/year/state/status filters, keyset-paginated:
+    pass `next_cursor` back as `cursor`. With format=ndjson every match after the cursor is
+    streamed (up to `limit` when given)."""
+    stream = _wants_ndjson()
+    limit = request.args.get('limit', None if stream else API_PAGE_SIZE, type=int)
+    if limit is not None and not stream:
+        limit = max(1, min(limit, API_PAGE_MAX))
+    cursor = request.args.get('cursor')
+    filters = dict(q=request.args.get('q'), year=request.args.get('year', type=int),
+                   state=request.args.get('state'), status=request.args.get('status'))
+    after = cursor.strip().upper() if cursor else None
+
+    if stream:
+        return _ndjson_response(_streamed_rows(*company_page_sql(after, limit, **filters)))
+    # One row past the page tells whether another page follows
+    with _pool.connection() as conn:
+        rows = _query(conn, *company_page_sql(after, limit + 1, **filters))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return jsonify({"results": rows, "next_cursor": rows[-1]['CIN'] if more else None})
+
+def _feed_request():
+    """(cursor, filters) from the query string; the cursor falls back to SSE's Last-Event-ID."""
+    cursor = request.args.get('cursor', request.headers.get('Last-Event-ID', '0'))
+    filters = dict(change_type=request.args.get('type'), field=request.args.get('field'),
+                   state=request.args.get('state'))
+    return int(cursor), filters
+
+def _feed_page(cursor: int, limit: int, filters):
+    """(rows, next cursor, more pending) for one read of the change feed.
+
+    Rows are read up to the newest id committed when the read starts; when fewer
+    than `limit` match, the cursor moves to that id, past the rows the filters
+    skipped, so the next read only sees newer rows. An idle read is one id lookup.
+    """
+    with _pool.connection() as conn:
+        head = conn.execute(LATEST_CHANGE_ID_SQL).fetchone()[0]
+        if head <= cursor:
+            return [], cursor, False
+        rows = _query(conn, *change_feed_sql(cursor, head, limit + 1, **filters))
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]['id'], True
+    return rows, head, False
+
+@app.get('/changes')
+def change_feed():
+    """change_log rows after `cursor` (an id; 0 = from the start), oldest first, optionally
+    filtered by type, field and state. With `wait`, an empty read long-polls up to that many
+    seconds for new rows. Pass `next_cursor` back as `cursor`."""
+    try:
+        cursor, filters = _feed_request()
+    except ValueError:
+        return jsonify({"error": "cursor must be an integer change id"}), 400
+    limit = max(1, min(request.args.get('limit', API_FEED_PAGE_SIZE, type=int), API_FEED_PAGE_MAX))
+    wait = max(0.0, min(request.args.get('wait', 0, type=float), API_FEED_MAX_WAIT))
+
+    deadline = time.monotonic() + wait
+    while True:
+        rows, cursor, more = _feed_page(cursor, limit, filters)
+        if rows or time.monotonic() >= deadline:
+            break
+        time.sleep(min(API_FEED_POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+    return jsonify({"changes": rows, "next_cursor": cursor, "has_more": more})
+
+@app.get('/changes/stream')
+def change_stream():
+    """The change feed as server-sent events: one `change` event per row (event id = change
+    id, so EventSource resumes from Last-Event-ID), pushed within API_FEED_POLL_INTERVAL of
+    a pipeline commit, with comment keep-alives while idle."""
+    try:
+        cursor, filters = _feed_request()
+    except ValueError:
+        return jsonify({"error": "cursor must be an integer change id"}), 400
+
+    def events(cursor):
+        last_sent = time.monotonic()
+        while True:
+            # A pooled connection is held per read only, never while idle
+            rows, cursor, more = _feed_page(cursor, API_FEED_PAGE_MAX, filters)
+            for row in rows:
+                yield f"id: {row['id']}\nevent: change\ndata: {app.json.dumps(row)}\n\n"
+            now = time.monotonic()
+            if rows:
+                last_sent = now
+            elif now - last_sent >= API_FEED_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                last_sent = now
+            if not more:
+                time.sleep(API_FEED_POLL_INTERVAL)
+
+    return app.response_class(events(cursor), mimetype="text/event-stream",
+                              headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get('/cache_stats')
+def cache_stats():
+    return jsonify(_cache.stats())
 
 if __name__ == '__main__':
+    with _pool.connection():
+        pass  # fail at startup, not on the first request, when the database needs migrating
     app.run(host='0.0.0.0', port=8000, debug=True)
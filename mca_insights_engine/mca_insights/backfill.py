@@ -0,0 +1,80 @@
+"""Process-pool side of the historical backfill (run_pipeline.run_backfill).
+
+Workers consolidate every snapshot date once, which fills the snapshot
+cache, then diff consecutive date pairs from the cached frames. Results
+come back to the caller in date order, for a single writer to commit.
+Without the cache each worker would parse both dates of its pair from CSV,
+so the caller should then diff in one process (see cache_available).
+"""
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+import pandas as pd
+from .config import SNAPSHOTS_DIR, SNAPSHOT_CACHE_ENABLED
+from . import snapshot_cache
+from .integrate import consolidate_snapshot_dir
+from .change_detector import detect_changes, rows_to_write
+
+def cache_available() -> bool:
+    """True when consolidated snapshots are cached, so workers can share them."""
+    return SNAPSHOT_CACHE_ENABLED and snapshot_cache.feather is not None
+
+def consolidate_date(d: str) -> int:
+    """Consolidate one date (filling its cache entry); returns its row count."""
+    # One process per date already; no nested ingest pool
+    return len(consolidate_snapshot_dir(SNAPSHOTS_DIR / d, workers=1))
+
+def diff_dates(prev_date: str, d: str, change_csv: Optional[Path] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(changes, rows to write) for `d` against `prev_date`; writes the change CSV if given."""
+    prev_df = consolidate_snapshot_dir(SNAPSHOTS_DIR / prev_date, workers=1)
+    curr_df = consolidate_snapshot_dir(SNAPSHOTS_DIR / d, workers=1)
+    return _diff_frames(prev_df, curr_df, d, change_csv)
+
+def _diff_frames(prev_df, curr_df, d, change_csv):
+    changes = detect_changes(prev_df, curr_df, d)
+    if change_csv is not None:
+        changes.to_csv(change_csv, index=False)
+    return changes, rows_to_write(prev_df, curr_df, changes)
+
+def consolidate_all(dates: List[str], workers: int) -> int:
+    """Consolidate `dates` across `workers` processes; returns the total row count."""
+    if workers <= 1:
+        return sum(consolidate_date(d) for d in dates)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(consolidate_date, dates))
+
+def iter_diffs(dates: List[str], workers: int, change_csv_for=None,
+               first_df: Optional[pd.DataFrame] = None) -> Iterator[Tuple[str, pd.DataFrame, pd.DataFrame]]:
+    """Yield (date, changes, rows to write) for dates[1:] in date order.
+
+    Pairs are diffed in a pool; at most 2 x `workers` finished results wait
+    for the consumer, which bounds memory however many dates there are.
+    With one worker each date is consolidated once and carried to the next
+    pair; `first_df`, if given, is dates[0]'s frame.
+    `change_csv_for(date)` gives the change CSV path for a date, or None.
+    """
+    pairs = list(zip(dates, dates[1:]))
+    csv_for = change_csv_for or (lambda d: None)
+    if workers <= 1:
+        prev_df = first_df
+        for prev_date, d in pairs:
+            if prev_df is None:
+                prev_df = consolidate_snapshot_dir(SNAPSHOTS_DIR / prev_date, workers=1)
+            curr_df = consolidate_snapshot_dir(SNAPSHOTS_DIR / d, workers=1)
+            yield (d,) + _diff_frames(prev_df, curr_df, d, csv_for(d))
+            prev_df = curr_df
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit(pair):
+            prev_date, d = pair
+            return d, pool.submit(diff_dates, prev_date, d, csv_for(d))
+
+        todo = iter(pairs)
+        pending = deque(submit(p) for p in islice(todo, 2 * workers))
+        while pending:
+            d, fut = pending.popleft()
+            changes, rows = fut.result()
+            pending.extend(submit(p) for p in islice(todo, 1))
+            yield d, changes, rows
@@ -1,68 +1,126 @@
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from .config import CANONICAL_COLUMNS
-from .utils import normalize_cin
+from .schema import text_values, frame_hashes
+from .utils import normalize_cin_series
 
 KEY_FIELDS = [c for c in CANONICAL_COLUMNS if c not in ('Registered_Address',)]  # track most fields
+CHANGE_COLUMNS = ['CIN','Change_Type','Field_Changed','Old_Value','New_Value','Date']
+
+def _stringify_fields(df: pd.DataFrame, fields) -> pd.DataFrame:
+    # Same text form as str(value) per cell; absent columns read as 'None' (like row.get)
+    out = pd.DataFrame(index=df.index)
+    for field in fields:
+        out[field] = text_values(df[field]) if field in df.columns else 'None'
+    return out
+
+def _event_rows(cins, change_type: str, date_str: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'CIN': cins,
+        'Change_Type': change_type,
+        'Field_Changed': '',
+        'Old_Value': '',
+        'New_Value': '',
+        'Date': date_str,
+    }, columns=CHANGE_COLUMNS)
+
+def _unique_positions(keys: pd.Index):
+    """Keys with duplicates resolved to the last occurrence, and their row positions."""
+    if keys.is_unique:
+        return keys, np.arange(len(keys))
+    keep = ~keys.duplicated(keep='last')
+    return keys[keep], np.flatnonzero(keep)
+
+def _match(prev_keys: pd.Index, curr_keys: pd.Index):
+    """Row positions for keyed frames: (prev, curr) of the shared keys, aligned,
+    then curr positions of added keys and prev positions of removed ones.
+    One hash lookup of curr into prev; nothing is sorted."""
+    prev_keys, prev_pos = _unique_positions(prev_keys)
+    curr_keys, curr_pos = _unique_positions(curr_keys)
+    hit = prev_keys.get_indexer(curr_keys)
+    shared = hit >= 0
+    seen = np.zeros(len(prev_keys), dtype=bool)
+    seen[hit[shared]] = True
+    return prev_pos[hit[shared]], curr_pos[shared], curr_pos[~shared], prev_pos[~seen]
+
+def _field_updates(old_df: pd.DataFrame, new_df: pd.DataFrame, cins, date_str: str) -> pd.DataFrame:
+    """Field Update rows for row-aligned old/new frames whose keys are `cins`."""
+    # CIN is the key, never a compared field
+    fields = [f for f in KEY_FIELDS if f != 'CIN']
+    old = _stringify_fields(old_df, fields).values
+    new = _stringify_fields(new_df, fields).values
+    rows, cols = (old != new).nonzero()  # row-major: grouped by CIN, then KEY_FIELDS order
+    return pd.DataFrame({
+        'CIN': np.asarray(cins, dtype=object)[rows],
+        'Change_Type': 'Field Update',
+        'Field_Changed': [fields[c] for c in cols],
+        'Old_Value': old[rows, cols],
+        'New_Value': new[rows, cols],
+        'Date': date_str,
+    }, columns=CHANGE_COLUMNS)
+
+def _normalized_cins(df: pd.DataFrame) -> pd.Index:
+    # An object index keeps the set operations and sorts below off per-element Arrow access
+    return pd.Index(normalize_cin_series(df['CIN']).to_numpy(dtype=object), name='CIN')
+
+def _changes(added_cins, removed_cins, updates: pd.DataFrame, date_str: str) -> pd.DataFrame:
+    return pd.concat([
+        _event_rows(sorted(added_cins), 'New Incorporation', date_str),
+        _event_rows(sorted(removed_cins), 'Deregistered', date_str),
+        updates,
+    ], ignore_index=True)
 
 def detect_changes(prev_df: pd.DataFrame, curr_df: pd.DataFrame, date_str: str):
-    # Normalize CIN keys
-    prev = prev_df.copy()
-    prev['CIN'] = prev['CIN'].apply(normalize_cin)
-    curr = curr_df.copy()
-    curr['CIN'] = curr['CIN'].apply(normalize_cin)
-
-    prev_idx = prev.set_index('CIN')
-    curr_idx = curr.set_index('CIN')
-
-    prev_cins = set(prev_idx.index)
-    curr_cins = set(curr_idx.index)
-
-    new_cins = curr_cins - prev_cins
-    removed_cins = prev_cins - curr_cins
-    intersect = prev_cins & curr_cins
-
-    changes = []
-
-    # New incorporations
-    for cin in sorted(new_cins):
-        changes.append({
-            'CIN': cin,
-            'Change_Type': 'New Incorporation',
-            'Field_Changed': '',
-            'Old_Value': '',
-            'New_Value': '',
-            'Date': date_str
-        })
-
-    # Deregistered (missing today)
-    for cin in sorted(removed_cins):
-        changes.append({
-            'CIN': cin,
-            'Change_Type': 'Deregistered',
-            'Field_Changed': '',
-            'Old_Value': '',
-            'New_Value': '',
-            'Date': date_str
-        })
-
-    # Field updates
-    for cin in sorted(intersect):
-        prev_row = prev_idx.loc[cin]
-        curr_row = curr_idx.loc[cin]
-        for field in KEY_FIELDS:
-            pv = str(prev_row.get(field))
-            cv = str(curr_row.get(field))
-            if pv != cv:
-                changes.append({
-                    'CIN': cin,
-                    'Change_Type': 'Field Update',
-                    'Field_Changed': field,
-                    'Old_Value': pv,
-                    'New_Value': cv,
-                    'Date': date_str
-                })
-
-    change_df = pd.DataFrame(changes, columns=['CIN','Change_Type','Field_Changed','Old_Value','New_Value','Date'])
-    return change_df
+    # Normalized CIN keys; the frames themselves are not copied
+    prev_cins, curr_cins = _normalized_cins(prev_df), _normalized_cins(curr_df)
+    pi, ci, added, removed = _match(prev_cins, curr_cins)
+
+    # Only companies whose content hash differs can have field updates; the rest skip
+    # the field-by-field comparison. Updates are reported in CIN order.
+    changed = frame_hashes(prev_df)[pi] != frame_hashes(curr_df)[ci]
+    pi, ci = pi[changed], ci[changed]
+    order = np.argsort(curr_cins.values[ci], kind='stable')
+    pi, ci = pi[order], ci[order]
+    updates = _field_updates(prev_df.iloc[pi], curr_df.iloc[ci], curr_cins.values[ci], date_str)
+    return _changes(curr_cins.values[added], prev_cins.values[removed], updates, date_str)
+
+def detect_changes_against_db(curr_df: pd.DataFrame, date_str: str):
+    """Diff a consolidated snapshot against the master DB instead of the previous frame.
+
+    Returns (changes, rows to write), as detect_changes and rows_to_write would
+    for the snapshot the DB was last brought to (see database.hashes_date):
+    hashes come from company_hashes, and only the companies whose hash differs
+    are read back from `companies` for the field comparison.
+    """
+    from .database import stored_row_hashes, read_companies
+    stored = stored_row_hashes()
+    curr_cins = _normalized_cins(curr_df)
+    si, ci, added, removed = _match(stored.index, curr_cins)
+
+    changed = stored.values[si] != frame_hashes(curr_df)[ci]
+    ci = ci[changed]
+    ci = ci[np.argsort(curr_cins.values[ci], kind='stable')]
+    cins = curr_cins.values[ci]
+    updates = _field_updates(read_companies(cins), curr_df.iloc[ci], cins, date_str)
+
+    write = np.zeros(len(curr_df), dtype=bool)
+    write[added] = True
+    write[ci] = True
+    return _changes(curr_cins.values[added], stored.index.values[removed], updates, date_str), curr_df[write]
+
+def rows_to_write(prev_df: pd.DataFrame, curr_df: pd.DataFrame, change_df: pd.DataFrame) -> pd.DataFrame:
+    """Rows of curr_df the master table needs for this day: new or changed companies.
+
+    Covers the change log's New Incorporation / Field Update CINs plus CINs whose
+    content hash differs for another reason (e.g. a Registered_Address edit), so
+    a delta write leaves the table identical to rewriting every row. Expects
+    consolidated frames, whose CINs are already normalized.
+    """
+    curr_cins = pd.Index(curr_df['CIN'].to_numpy(dtype=object))
+    pi, ci, added, _ = _match(pd.Index(prev_df['CIN'].to_numpy(dtype=object)), curr_cins)
+    write = curr_cins.isin(change_df.loc[change_df['Change_Type'] != 'Deregistered', 'CIN'].unique())
+    write[added] = True
+    write[ci[frame_hashes(prev_df)[pi] != frame_hashes(curr_df)[ci]]] = True
+    return curr_df[write]
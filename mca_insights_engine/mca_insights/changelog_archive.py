@@ -0,0 +1,84 @@
+"""Move old change_log days out of SQLite into compressed Parquet files.
+
+    python -m mca_insights.changelog_archive --keep-days 90 [--as-of 2025-12-31] [--vacuum]
+
+Each archived day becomes CHANGELOG_ARCHIVE_DIR/changes_<date>.parquet (zstd)
+with the decoded change_log columns, ids included, and its change_events rows
+are deleted. daily_rollups and company_history are left as they are, so
+summaries and as-of lookups still cover archived days.
+database.read_changes_since reads the files back.
+"""
+import argparse
+import os
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+import pandas as pd
+from .config import CHANGELOG_ARCHIVE_DIR, CHANGELOG_RETENTION_DAYS
+from .database import init_db, get_conn, day_int, CHANGE_ROWS_SQL
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # archiving needs pyarrow; without it change_log stays in SQLite
+    pa = None
+    pq = None
+
+COMPRESSION = "zstd"
+
+def _archive_path(date_str: str):
+    return CHANGELOG_ARCHIVE_DIR / f"changes_{date_str}.parquet"
+
+def archived_dates() -> List[str]:
+    return sorted(p.stem[len("changes_"):] for p in CHANGELOG_ARCHIVE_DIR.glob("changes_*.parquet"))
+
+def archive_changes(keep_days: int = CHANGELOG_RETENTION_DAYS, as_of: str = None, vacuum: bool = False) -> List[str]:
+    """Archive change_log days more than `keep_days` before `as_of` (default: the newest
+    change date); returns the archived dates. Each day is written before it is deleted."""
+    if pq is None:
+        print("[!] pyarrow is not installed; change_log was not archived.")
+        return []
+    done = []
+    with get_conn() as conn:
+        if as_of is None:
+            newest = conn.execute("SELECT max(Day) FROM change_events").fetchone()[0]
+            if newest is None:
+                return done
+            as_of = f"{newest // 10000:04d}-{newest // 100 % 100:02d}-{newest % 100:02d}"
+        cutoff = day_int((date.fromisoformat(as_of) - timedelta(days=keep_days)).isoformat())
+        days = [r[0] for r in conn.execute(
+            "SELECT DISTINCT Day FROM change_events WHERE Day < ? ORDER BY Day", (cutoff,))]
+        CHANGELOG_ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        for day in days:
+            df = pd.read_sql_query(CHANGE_ROWS_SQL + " WHERE e.Day = ? ORDER BY e.id", conn, params=(day,))
+            date_str = df['Date'].iat[0]
+            path = _archive_path(date_str)
+            tmp = path.with_name(f".{path.name}.tmp")
+            # A day rerun after an earlier archive replaces that file, as it replaced the DB rows
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, compression=COMPRESSION)
+            os.replace(tmp, path)
+            conn.execute("DELETE FROM change_events WHERE Day = ?", (day,))
+            conn.commit()
+            done.append(date_str)
+        if vacuum and done:
+            conn.execute("VACUUM")
+    return done
+
+def read_archived_changes(since: str, exclude_dates: Iterable[str] = ()) -> Optional[pd.DataFrame]:
+    """Archived change_log rows dated on or after `since`, or None when nothing applies."""
+    if pq is None or not CHANGELOG_ARCHIVE_DIR.exists():
+        return None
+    exclude = set(exclude_dates)
+    frames = [pq.read_table(_archive_path(d)).to_pandas()
+              for d in archived_dates() if d >= since and d not in exclude]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old change_log days to Parquet.")
+    parser.add_argument("--keep-days", type=int, default=CHANGELOG_RETENTION_DAYS,
+                        help="days kept in SQLite, counted back from --as-of")
+    parser.add_argument("--as-of", help="reference date (YYYY-MM-DD); default: the newest change date")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database afterwards to return space")
+    args = parser.parse_args()
+    init_db()
+    archived = archive_changes(args.keep_days, args.as_of, args.vacuum)
+    print(f"[✓] Archived {len(archived)} day(s) to {CHANGELOG_ARCHIVE_DIR}" + (f": {', '.join(archived)}" if archived else ""))
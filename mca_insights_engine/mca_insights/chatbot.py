@@ -2,64 +2,97 @@ import re
 import pandas as pd
 import sqlite3
 from typing import Dict, Any, List
-from .config import DB_PATH
+from .config import DB_PATH, SELECTED_STATES
+from .database import name_search_sql, CHANGE_ROWS_SQL
 
 def _connect():
     return sqlite3.connect(DB_PATH)
 
-def query_new_incorporations(state: str = None, days: int = 30) -> pd.DataFrame:
-    with _connect() as conn:
-        df = pd.read_sql_query(
-            "SELECT * FROM change_log WHERE Change_Type='New Incorporation' "
-            "AND Date >= date('now','-? day')".replace('?','%d' % days), conn
-        )
+# change_events.Day of `date('now', ?)`, so day filters can use its indexes
+_SINCE_DAY_SQL = "CAST(strftime('%Y%m%d', 'now', ?) AS INTEGER)"
+
+def _page(sql: str, params: list, limit: int = None, offset: int = 0, order_by: str = None):
+    """Append a stable ORDER BY / LIMIT / OFFSET when a page is requested."""
+    if limit is None:
+        return sql, params
+    return f"{sql} ORDER BY {order_by} LIMIT ? OFFSET ?", params + [int(limit), int(offset)]
+
+def _canonical_state(state: str) -> str:
+    """The stored spelling of a state name typed in any case (companies.State)."""
+    state = state.strip()
+    for known in SELECTED_STATES:
+        if known.lower() == state.lower():
+            return known
+    return state.title()
+
+def new_incorporations_sql(state: str = None, days: int = 30):
+    """SQL and params for New Incorporation rows of the last `days` days, optionally in one state."""
+    sql = (CHANGE_ROWS_SQL + " WHERE e.Type_Id = (SELECT id FROM change_types WHERE name = 'New Incorporation') "
+           f"AND e.Day >= {_SINCE_DAY_SQL}")
+    params = [f"-{int(days)} day"]
     if state:
-        with _connect() as conn:
-            companies = pd.read_sql_query("SELECT CIN, State FROM companies", conn)
-        df = df.merge(companies, on='CIN', how='left')
-        df = df[df['State'].str.lower() == state.lower()]
-    return df
+        sql = f"SELECT r.*, c.State FROM ({sql}) r JOIN companies c ON c.CIN = r.CIN WHERE c.State = ?"
+        params.append(_canonical_state(state))
+    return sql, params
 
-def query_struck_off(days: int = 30) -> pd.DataFrame:
+def query_new_incorporations(state: str = None, days: int = 30, limit: int = None, offset: int = 0) -> pd.DataFrame:
+    sql, params = new_incorporations_sql(state, days)
+    sql, params = _page(sql, params, limit, offset, order_by="id")
     with _connect() as conn:
-        df = pd.read_sql_query(
-            "SELECT * FROM change_log WHERE (Change_Type='Deregistered' OR (Change_Type='Field Update' AND Field_Changed='Company_Status' AND New_Value LIKE '%Strike Off%')) "
-            "AND Date >= date('now','-? day')".replace('?','%d' % days), conn
-        )
-    return df
+        return pd.read_sql_query(sql, conn, params=params)
 
-def query_capital_threshold(sector: str = None, min_auth_cap: float = 0.0) -> pd.DataFrame:
+def query_struck_off(days: int = 30, limit: int = None, offset: int = 0) -> pd.DataFrame:
+    sql = (CHANGE_ROWS_SQL + " WHERE (t.name='Deregistered' OR (t.name='Field Update' AND f.name='Company_Status' "
+           f"AND e.New_Value LIKE '%Strike Off%')) AND e.Day >= {_SINCE_DAY_SQL}")
+    sql, params = _page(sql, [f"-{int(days)} day"], limit, offset, order_by="e.id")
     with _connect() as conn:
-        df = pd.read_sql_query("SELECT * FROM companies", conn)
+        return pd.read_sql_query(sql, conn, params=params)
+
+def capital_threshold_sql(sector: str = None, min_auth_cap: float = 0.0):
+    """SQL and params for companies at or above an authorized capital, optionally in the
+    manufacturing sector (NIC_Sector, derived at ingest from NIC_SECTOR_MAP)."""
+    sql = "SELECT * FROM companies WHERE 1=1"
+    params = []
+    if sector and 'manufactur' in sector.lower():
+        # With the capital bound this is one range seek on idx_companies_sector_cap
+        sql += " AND NIC_Sector = ?"
+        params.append("Manufacturing")
     if min_auth_cap:
-        df = df[df['Authorized_Capital'] >= float(min_auth_cap)]
-    if sector:
-        # naive: infer by NIC prefix match from sector keywords in name or NIC (demo-ready)
-        df = df[df['NIC_Code'].astype(str).str.startswith(tuple([str(i) for i in range(10,20)]))] if 'manufactur' in sector.lower() else df
-    return df
+        sql += " AND Authorized_Capital >= ?"
+        params.append(float(min_auth_cap))
+    return sql, params
+
+def query_capital_threshold(sector: str = None, min_auth_cap: float = 0.0, limit: int = None, offset: int = 0) -> pd.DataFrame:
+    sql, params = capital_threshold_sql(sector, min_auth_cap)
+    sql, params = _page(sql, params, limit, offset, order_by="CIN")
+    with _connect() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
 
-def interpret_and_execute(question: str) -> Dict[str, Any]:
+def interpret_and_execute(question: str, limit: int = None, offset: int = 0) -> Dict[str, Any]:
+    """Answer a question; `limit`/`offset` page the tabular intents."""
     q = question.strip().lower()
 
     # 1) new incorporations in {state}
     m = re.search(r"new incorporations(?: in ([a-z\s]+))?", q)
     if m:
         st = m.group(1).strip() if m.group(1) else None
-        return {"intent": "new_incorporations", "dataframe": query_new_incorporations(state=st)}
+        return {"intent": "new_incorporations", "dataframe": query_new_incorporations(state=st, limit=limit, offset=offset)}
 
     # 2) manufacturing sector with authorized capital above Rs.X
     m = re.search(r"(manufacturing|sector)[^\d]*(?:authorized|auth)[^\d]*(?:capital|cap)[^\d]*([\d]+)", q)
     if m:
         cap = float(m.group(2))
-        df = query_capital_threshold(sector='manufacturing', min_auth_cap=cap)
+        df = query_capital_threshold(sector='manufacturing', min_auth_cap=cap, limit=limit, offset=offset)
         return {"intent": "capital_threshold", "dataframe": df}
 
     # 3) struck off last month
     if 'struck off' in q or 'deregistered' in q:
-        return {"intent": "struck_off", "dataframe": query_struck_off(days=30)}
+        return {"intent": "struck_off", "dataframe": query_struck_off(days=30, limit=limit, offset=offset)}
 
     # 4) search company by CIN or name
-    m = re.search(r"(?:show|find|search).*([ul][0-9a-z]{2}[0-9]{5}[a-z]{2}[0-9]{6})", q)  # very rough CIN regex
+    # Registry-layout CIN (21 chars), or the rough demo one from sample_data_generator.make_cin
+    m = re.search(r"(?:show|find|search).*([ul][0-9]{5}[a-z]{2}[0-9]{4}[a-z]{3}[0-9]{6}"
+                  r"|[ul][0-9a-z]{2}[0-9]{5}[a-z]{2}[0-9]{6})", q)
     if m:
         cin = m.group(1).upper()
         with _connect() as conn:
@@ -72,7 +105,8 @@ def interpret_and_execute(question: str) -> Dict[str, Any]:
     if m:
         name = m.group(1).strip()
         with _connect() as conn:
-            matches = pd.read_sql_query("SELECT * FROM companies WHERE lower(Company_Name) LIKE ?", conn, params=(f"%{name.lower()}%",))
+            sql, params = name_search_sql(name)
+            matches = pd.read_sql_query(sql, conn, params=params)
         return {"intent": "name_search", "dataframe": matches}
 
     return {"intent": "unknown", "message": "Sorry, I couldn't understand. Try: 'Show new incorporations in Maharashtra' or 'How many companies were struck off last month?'"}
@@ -0,0 +1,75 @@
+import json
+import os
+from typing import Optional, Tuple
+import pandas as pd
+from .config import CHECKPOINT_DIR
+from .schema import as_ingest_types
+from .snapshot_cache import write_frame, read_frame
+
+CHECKPOINT_FILE = CHECKPOINT_DIR / "checkpoint.json"
+
+def _read_meta() -> Optional[dict]:
+    if not CHECKPOINT_FILE.exists():
+        return None
+    try:
+        with open(CHECKPOINT_FILE, encoding="utf-8") as f:
+            meta = json.load(f)
+    except ValueError:
+        meta = None
+    if not isinstance(meta, dict) or not {"last_date", "format", "state_file"} <= meta.keys():
+        # A pointer we can't read counts as no checkpoint, so the next run starts over
+        print(f"[!] Ignoring unreadable checkpoint {CHECKPOINT_FILE}")
+        return None
+    if meta["format"] == "hashes":
+        return meta
+    return meta if (CHECKPOINT_DIR / meta["state_file"]).exists() else None
+
+def checkpoint_date() -> Optional[str]:
+    """The last processed date (as load_checkpoint reports it), without loading its state."""
+    meta = _read_meta()
+    return meta["last_date"] if meta else None
+
+def load_checkpoint() -> Tuple[Optional[str], Optional[pd.DataFrame]]:
+    """Return (last processed date, its consolidated frame), or (None, None).
+
+    The frame is None for a date checkpointed without one (a streamed day); the
+    master DB's company_hashes stands for it then (see database.hashes_date).
+    """
+    meta = _read_meta()
+    if meta is None:
+        return None, None
+    if meta["format"] == "hashes":
+        return meta["last_date"], None
+    state_path = CHECKPOINT_DIR / meta["state_file"]
+    if meta["format"] == "feather":
+        df = read_frame(state_path)
+    else:
+        df = pd.read_pickle(state_path)
+    return meta["last_date"], as_ingest_types(df)
+
+def save_checkpoint(date_str: str, df: Optional[pd.DataFrame] = None):
+    """Persist the consolidated state for `date_str`; the JSON pointer is swapped last.
+
+    Without a frame (streamed days are never held in memory) only the date is
+    recorded, and the next run diffs against the DB's company_hashes.
+    """
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    state_file = f"state_{date_str}.feather"
+    fmt = "feather"
+    if df is None:
+        state_file = None
+        fmt = "hashes"
+    elif not write_frame(CHECKPOINT_DIR / state_file, df):
+        state_file = f"state_{date_str}.pkl"
+        fmt = "pickle"
+        df.to_pickle(CHECKPOINT_DIR / state_file)
+    meta = {"last_date": date_str, "rows": int(len(df)) if df is not None else None, "format": fmt,
+            "state_file": state_file}
+    tmp = CHECKPOINT_FILE.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, CHECKPOINT_FILE)
+    # Older states are no longer referenced
+    for p in CHECKPOINT_DIR.glob("state_*"):
+        if p.name != state_file:
+            p.unlink()
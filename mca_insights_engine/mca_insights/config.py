@@ -2,14 +2,18 @@ from pathlib import Path
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = Path(os.getenv("MCA_DATA_DIR", str(BASE_DIR / "data")))
 SNAPSHOTS_DIR = DATA_DIR / "snapshots"
-OUTPUTS_DIR = BASE_DIR / "outputs"
+SNAPSHOT_CACHE_DIR = DATA_DIR / "cache"
+OUTPUTS_DIR = Path(os.getenv("MCA_OUTPUTS_DIR", str(BASE_DIR / "outputs")))
 CHANGELOGS_DIR = OUTPUTS_DIR / "changelogs"
 ENRICH_DIR = OUTPUTS_DIR / "enrichment"
 SUMMARIES_DIR = OUTPUTS_DIR / "summaries"
-DB_PATH = OUTPUTS_DIR / "master.db"
+DB_PATH = Path(os.getenv("MCA_DB_PATH", str(OUTPUTS_DIR / "master.db")))
 MASTER_CSV = OUTPUTS_DIR / "master_latest.csv"
+CHECKPOINT_DIR = OUTPUTS_DIR / "checkpoint"
+METRICS_DIR = OUTPUTS_DIR / "metrics"
+CHANGELOG_ARCHIVE_DIR = OUTPUTS_DIR / "archive" / "changelog"
 
 # States/ROCs selected
 SELECTED_STATES = ["Maharashtra", "Gujarat", "Delhi", "Tamil Nadu", "Karnataka"]
@@ -47,3 +51,69 @@ NIC_SECTOR_MAP = {
 
 # Enrichment options
 ENABLE_WEB_ENRICHMENT = str(os.getenv("ENABLE_WEB_ENRICHMENT", "false")).lower() == "true"
+# Live enrichment: page URL is base + CIN; fetches run on a thread pool, rate-limited per host
+ENRICH_BASE_URL = os.getenv("ENRICH_BASE_URL", "https://www.zaubacorp.com/companysearchresults/")
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "8"))
+ENRICH_RATE_PER_HOST = float(os.getenv("ENRICH_RATE_PER_HOST", "5"))  # requests/s, 0 = unlimited
+ENRICH_TIMEOUT = float(os.getenv("ENRICH_TIMEOUT", "10"))  # per request, seconds
+ENRICH_RETRIES = int(os.getenv("ENRICH_RETRIES", "3"))
+ENRICH_BACKOFF = float(os.getenv("ENRICH_BACKOFF", "0.5"))  # seconds, doubled per retry
+ENRICH_DEADLINE = float(os.getenv("ENRICH_DEADLINE", "120"))  # whole batch, seconds
+# Fetched pages are cached in SQLite; entries younger than this are reused without a request
+ENRICH_CACHE_TTL = int(os.getenv("ENRICH_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+
+# Company-name search: default result cap for API / chatbot lookups
+NAME_SEARCH_LIMIT = int(os.getenv("NAME_SEARCH_LIMIT", "100"))
+# Matches considered for ranking per limited query (bounds cost for very common terms)
+NAME_SEARCH_RANK_WINDOW = int(os.getenv("NAME_SEARCH_RANK_WINDOW", "500"))
+
+# Flask API: read-only SQLite connections per worker process, and their mmap window
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "8"))
+API_MMAP_SIZE = int(os.getenv("API_MMAP_SIZE", str(256 * 1024 ** 2)))
+# /search_company response cache: max entries (0 disables), entry TTL, and how often
+# (seconds) the DB generation is re-read to drop entries from before a pipeline run
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "4096"))
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300"))
+API_CACHE_GENERATION_POLL = float(os.getenv("API_CACHE_GENERATION_POLL", "1"))
+# POST /companies/batch: most CINs per request; GET /companies: default and largest JSON page
+API_BATCH_MAX_CINS = int(os.getenv("API_BATCH_MAX_CINS", "1000"))
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "100"))
+API_PAGE_MAX = int(os.getenv("API_PAGE_MAX", "1000"))
+# GET /changes feed: default and largest page, longest long-poll wait (seconds), how often waiting
+# requests and /changes/stream look for new rows, and the SSE keep-alive interval
+API_FEED_PAGE_SIZE = int(os.getenv("API_FEED_PAGE_SIZE", "500"))
+API_FEED_PAGE_MAX = int(os.getenv("API_FEED_PAGE_MAX", "5000"))
+API_FEED_MAX_WAIT = float(os.getenv("API_FEED_MAX_WAIT", "30"))
+API_FEED_POLL_INTERVAL = float(os.getenv("API_FEED_POLL_INTERVAL", "0.5"))
+API_FEED_HEARTBEAT = float(os.getenv("API_FEED_HEARTBEAT", "15"))
+
+# Snapshot ingest: process-pool size for loading state CSVs (1 = sequential), used only when
+# a snapshot's state CSVs total at least INGEST_PARALLEL_MIN_BYTES (smaller ones load faster inline)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_PARALLEL_MIN_BYTES = int(os.getenv("INGEST_PARALLEL_MIN_BYTES", str(32 * 1024 ** 2)))
+
+# Columnar cache of consolidated snapshots (needs pyarrow)
+SNAPSHOT_CACHE_ENABLED = str(os.getenv("SNAPSHOT_CACHE_ENABLED", "true")).lower() == "true"
+
+# Historical backfill (run_pipeline.py --backfill): processes that consolidate and diff
+# snapshot pairs, and pipeline days committed per SQLite transaction by the single writer
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", str(os.cpu_count() or 1)))
+BACKFILL_COMMIT_DAYS = int(os.getenv("BACKFILL_COMMIT_DAYS", "30"))
+
+# Snapshot diff: snapshots larger than this (bytes of state CSVs) are diffed out-of-core
+STREAMING_DIFF_THRESHOLD_BYTES = int(os.getenv("STREAMING_DIFF_THRESHOLD_BYTES", str(2 * 1024 ** 3)))
+EXTERNAL_SORT_CHUNK_ROWS = int(os.getenv("EXTERNAL_SORT_CHUNK_ROWS", "500000"))
+
+# Pipeline run metrics: a JSON report per run goes to METRICS_DIR; the Prometheus textfile
+# can be pointed at a node-exporter textfile-collector directory
+METRICS_TEXTFILE = Path(os.getenv("METRICS_TEXTFILE") or METRICS_DIR / "mca_pipeline.prom")
+# Profile one stage (consolidate, diff, db_write, csv_export, enrichment, summary) with
+# cProfile and/or tracemalloc; output lands next to the run report
+PROFILE_STAGE = os.getenv("PROFILE_STAGE", "")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")  # cprofile, tracemalloc or both
+
+# change_log retention: days older than this (counted back from the newest change) move to
+# zstd Parquet files under CHANGELOG_ARCHIVE_DIR after each pipeline run; 0 keeps all in SQLite
+CHANGELOG_RETENTION_DAYS = int(os.getenv("CHANGELOG_RETENTION_DAYS", "0"))
+# Also write each day's changes to outputs/changelogs/changes_<date>.csv (SQLite holds them either way)
+WRITE_CHANGELOG_CSV = str(os.getenv("WRITE_CHANGELOG_CSV", "true")).lower() == "true"
@@ -1,7 +1,10 @@
 import sqlite3
 from pathlib import Path
 from typing import List, Dict, Any
-from .config import DB_PATH, CANONICAL_COLUMNS
+from .config import DB_PATH, CANONICAL_COLUMNS, NAME_SEARCH_LIMIT, NAME_SEARCH_RANK_WINDOW
+from .metrics import trace_connection
+from .schema import as_ingest_types, row_hashes, frame_hashes
+from .utils import incorporation_year, nic_sector, incorporation_year_series, nic_sector_series
 
 SCHEMA_COMPANIES = f"""
 CREATE TABLE IF NOT EXISTS companies (
@@ -31,47 +34,709 @@ CREATE TABLE IF NOT EXISTS change_log (
 );
 """
 
+# Read-optimized columns derived from the canonical ones at ingest
+DERIVED_COLUMNS = ["Incorporation_Year", "NIC_Sector"]
+COMPANY_COLUMNS = CANONICAL_COLUMNS + DERIVED_COLUMNS
+
+def _rollup_sql(where: str) -> str:
+    """Add the change_log rows matching `where` into daily_rollups (counts per
+    date x type x field x state x sector; state and sector come from companies)."""
+    return f"""
+INSERT INTO daily_rollups (Date, Change_Type, Field_Changed, State, Sector, Count)
+SELECT cl.Date, cl.Change_Type, coalesce(cl.Field_Changed, ''), coalesce(c.State, ''),
+       coalesce(c.NIC_Sector, ''), COUNT(*)
+FROM change_log cl LEFT JOIN companies c ON c.CIN = cl.CIN
+WHERE {where}
+GROUP BY 1, 2, 3, 4, 5
+ON CONFLICT (Date, Change_Type, Field_Changed, State, Sector) DO UPDATE SET Count = Count + excluded.Count
+"""
+
+# company_history: one row per version of a company, valid for valid_from <= day < valid_to
+OPEN_VALID_TO = "9999-12-31"
+_HISTORY_VALUE_COLUMNS = [c for c in CANONICAL_COLUMNS + DERIVED_COLUMNS if c != "CIN"]
+SCHEMA_HISTORY = f"""
+CREATE TABLE IF NOT EXISTS company_history (
+    CIN TEXT NOT NULL,
+    valid_from TEXT NOT NULL,
+    valid_to TEXT NOT NULL DEFAULT '{OPEN_VALID_TO}',
+    Company_Name TEXT,
+    Company_Class TEXT,
+    Date_of_Incorporation TEXT,
+    Authorized_Capital REAL,
+    Paidup_Capital REAL,
+    Company_Status TEXT,
+    NIC_Code TEXT,
+    Registered_Address TEXT,
+    RoC TEXT,
+    State TEXT,
+    Incorporation_Year INTEGER,
+    NIC_Sector TEXT,
+    PRIMARY KEY (CIN, valid_from)
+);
+"""
+
+# change_log storage: change types and field names are ids into small lookup tables, the
+# date is an integer day (YYYYMMDD), and old/new values are kept for Field Updates only.
+# The change_log view decodes rows back to the original columns.
+FIELD_UPDATE = "Field Update"
+SCHEMA_CHANGE_EVENTS = """
+CREATE TABLE IF NOT EXISTS change_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Day INTEGER NOT NULL,
+    CIN TEXT,
+    Type_Id INTEGER REFERENCES change_types (id),
+    Field_Id INTEGER REFERENCES change_fields (id),
+    Old_Value TEXT,
+    New_Value TEXT
+);
+"""
+_DAY_TO_DATE = "printf('%04d-%02d-%02d', e.Day / 10000, e.Day / 100 % 100, e.Day % 100)"
+_CHANGE_COLUMNS_SQL = (
+    "e.CIN, t.name AS Change_Type, coalesce(f.name, '') AS Field_Changed, "
+    "coalesce(e.Old_Value, '') AS Old_Value, coalesce(e.New_Value, '') AS New_Value, "
+    f"{_DAY_TO_DATE} AS Date")
+_CHANGE_JOINS_SQL = ("FROM change_events e LEFT JOIN change_types t ON t.id = e.Type_Id "
+                     "LEFT JOIN change_fields f ON f.id = e.Field_Id")
+# Decoded change_log rows; append a WHERE on e.Day / e.CIN / e.id to use the indexes
+CHANGE_ROWS_SQL = f"SELECT e.id, {_CHANGE_COLUMNS_SQL} {_CHANGE_JOINS_SQL}"
+
+# schema.row_hashes of each company in the latest applied snapshot (deregistered ones are
+# dropped), so a new snapshot can be diffed against the DB; meta 'hashes_date' names that
+# snapshot's date and is cleared while a write is in progress
+SCHEMA_COMPANY_HASHES = """
+CREATE TABLE IF NOT EXISTS company_hashes (
+    CIN TEXT PRIMARY KEY,
+    Row_Hash INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+def _write_hashes(c, cins, hashes):
+    c.executemany("INSERT INTO company_hashes (CIN, Row_Hash) VALUES (?, ?) "
+                  "ON CONFLICT(CIN) DO UPDATE SET Row_Hash = excluded.Row_Hash",
+                  zip(cins, hashes.tolist()))
+
+def _backfill_company_hashes(conn):
+    # Companies with an open version are the live ones; the snapshot date they match is
+    # unknown, so 'hashes_date' stays unset until the next pipeline write
+    import pandas as pd
+    df = pd.read_sql_query(f"SELECT {', '.join('c.' + col for col in CANONICAL_COLUMNS)} FROM companies c "
+                           f"WHERE EXISTS (SELECT 1 FROM company_history h WHERE h.CIN = c.CIN "
+                           f"AND h.valid_to = '{OPEN_VALID_TO}')", conn)
+    _write_hashes(conn, df['CIN'].tolist(), row_hashes(as_ingest_types(df)))
+
+def _backfill_derived_columns(conn):
+    # Parsed in Python like ingest (utils.incorporation_year also reads dd-mm-yyyy etc.),
+    # so migrated rows get the values a fresh write would
+    rows = conn.execute("SELECT rowid, Date_of_Incorporation, NIC_Code FROM companies").fetchall()
+    conn.executemany("UPDATE companies SET Incorporation_Year = ?, NIC_Sector = ? WHERE rowid = ?",
+                     ((incorporation_year(d), nic_sector(nic), rid) for rid, d, nic in rows))
+
+# Versioned schema migrations, applied in order by init_db and tracked in PRAGMA user_version;
+# a callable step is run with the connection
+MIGRATIONS = [
+    (1, [SCHEMA_COMPANIES, SCHEMA_CHANGELOG]),
+    (2, [
+        "CREATE INDEX IF NOT EXISTS idx_change_log_cin_date ON change_log (CIN, Date)",
+        "CREATE INDEX IF NOT EXISTS idx_change_log_date_type ON change_log (Date, Change_Type)",
+        "CREATE INDEX IF NOT EXISTS idx_change_log_type_date ON change_log (Change_Type, Date)",
+        "ALTER TABLE companies ADD COLUMN Incorporation_Year INTEGER",
+        "ALTER TABLE companies ADD COLUMN NIC_Sector TEXT",
+        _backfill_derived_columns,
+        "CREATE INDEX IF NOT EXISTS idx_companies_state_year ON companies (State, Incorporation_Year)",
+        "CREATE INDEX IF NOT EXISTS idx_companies_year ON companies (Incorporation_Year)",
+        "CREATE INDEX IF NOT EXISTS idx_companies_sector_cap ON companies (NIC_Sector, Authorized_Capital)",
+        "CREATE INDEX IF NOT EXISTS idx_companies_auth_cap ON companies (Authorized_Capital)",
+    ]),
+    (3, [
+        # Trigram index over names and CINs (external content: values live only in companies)
+        "CREATE VIRTUAL TABLE IF NOT EXISTS companies_fts USING fts5("
+        "Company_Name, CIN, content='companies', content_rowid='rowid', tokenize='trigram')",
+        # Triggers keep it in sync with every write path (upserts update rows in place)
+        "CREATE TRIGGER IF NOT EXISTS companies_fts_ai AFTER INSERT ON companies BEGIN "
+        "INSERT INTO companies_fts (rowid, Company_Name, CIN) VALUES (new.rowid, new.Company_Name, new.CIN); END",
+        "CREATE TRIGGER IF NOT EXISTS companies_fts_ad AFTER DELETE ON companies BEGIN "
+        "INSERT INTO companies_fts (companies_fts, rowid, Company_Name, CIN) "
+        "VALUES ('delete', old.rowid, old.Company_Name, old.CIN); END",
+        "CREATE TRIGGER IF NOT EXISTS companies_fts_au AFTER UPDATE OF Company_Name, CIN ON companies BEGIN "
+        "INSERT INTO companies_fts (companies_fts, rowid, Company_Name, CIN) "
+        "VALUES ('delete', old.rowid, old.Company_Name, old.CIN); "
+        "INSERT INTO companies_fts (rowid, Company_Name, CIN) VALUES (new.rowid, new.Company_Name, new.CIN); END",
+        "INSERT INTO companies_fts (companies_fts) VALUES ('rebuild')",
+    ]),
+    (4, [
+        # Small key/value store; 'generation' is bumped after each pipeline commit
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0')",
+    ]),
+    (5, [
+        # Parsed live-enrichment results plus the validators for conditional refresh
+        "CREATE TABLE IF NOT EXISTS enrichment_cache ("
+        "CIN TEXT NOT NULL, Source TEXT NOT NULL, Directors TEXT, Sector TEXT, Source_URL TEXT, "
+        "Fetched_At TEXT, TTL_Seconds INTEGER, ETag TEXT, Last_Modified TEXT, "
+        "PRIMARY KEY (CIN, Source))",
+    ]),
+    (6, [
+        "CREATE TABLE IF NOT EXISTS daily_rollups ("
+        "Date TEXT NOT NULL, Change_Type TEXT NOT NULL, Field_Changed TEXT NOT NULL, "
+        "State TEXT NOT NULL, Sector TEXT NOT NULL, Count INTEGER NOT NULL, "
+        "PRIMARY KEY (Date, Change_Type, Field_Changed, State, Sector)) WITHOUT ROWID",
+        _rollup_sql("1 = 1"),  # backfill from the existing change_log
+    ]),
+    (7, [
+        SCHEMA_HISTORY,
+        # (CIN, valid_from) is the as-of lookup; the date indexes let a rerun undo its own day
+        "CREATE INDEX IF NOT EXISTS idx_company_history_from ON company_history (valid_from)",
+        "CREATE INDEX IF NOT EXISTS idx_company_history_to ON company_history (valid_to)",
+        # Earlier versions can't be recovered; current rows open at the last change date.
+        # Companies whose latest change is a deregistration get no open version.
+        f"INSERT INTO company_history (CIN, valid_from, valid_to, {', '.join(_HISTORY_VALUE_COLUMNS)}) "
+        f"SELECT c.CIN, (SELECT coalesce(max(Date), '0001-01-01') FROM change_log), '{OPEN_VALID_TO}', "
+        f"{', '.join('c.' + col for col in _HISTORY_VALUE_COLUMNS)} FROM companies c "
+        "WHERE NOT EXISTS (SELECT 1 FROM change_log d WHERE d.CIN = c.CIN AND d.Change_Type = 'Deregistered' "
+        "AND NOT EXISTS (SELECT 1 FROM change_log l WHERE l.CIN = c.CIN AND l.Date > d.Date))",
+    ]),
+    (8, [
+        "CREATE TABLE IF NOT EXISTS change_types (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+        "CREATE TABLE IF NOT EXISTS change_fields (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+        SCHEMA_CHANGE_EVENTS,
+        "INSERT INTO change_types (name) SELECT DISTINCT Change_Type FROM change_log "
+        "WHERE Change_Type IS NOT NULL ORDER BY 1",
+        "INSERT INTO change_fields (name) SELECT DISTINCT Field_Changed FROM change_log "
+        "WHERE coalesce(Field_Changed, '') <> '' ORDER BY 1",
+        # ids are kept, so rollup batches and anything holding a change id stay valid
+        "INSERT INTO change_events (id, Day, CIN, Type_Id, Field_Id, Old_Value, New_Value) "
+        "SELECT l.id, CAST(replace(l.Date, '-', '') AS INTEGER), l.CIN, t.id, f.id, "
+        f"CASE WHEN l.Change_Type = '{FIELD_UPDATE}' THEN l.Old_Value END, "
+        f"CASE WHEN l.Change_Type = '{FIELD_UPDATE}' THEN l.New_Value END "
+        "FROM change_log l LEFT JOIN change_types t ON t.name = l.Change_Type "
+        "LEFT JOIN change_fields f ON f.name = l.Field_Changed ORDER BY l.id",
+        "DROP TABLE change_log",
+        "CREATE INDEX IF NOT EXISTS idx_change_events_cin_day ON change_events (CIN, Day)",
+        "CREATE INDEX IF NOT EXISTS idx_change_events_day_type ON change_events (Day, Type_Id)",
+        "CREATE INDEX IF NOT EXISTS idx_change_events_type_day ON change_events (Type_Id, Day)",
+        f"CREATE VIEW IF NOT EXISTS change_log AS {CHANGE_ROWS_SQL}",
+        # Writes through the view keep working for older callers (the pipeline encodes in Python)
+        "CREATE TRIGGER IF NOT EXISTS change_log_insert INSTEAD OF INSERT ON change_log BEGIN "
+        "INSERT OR IGNORE INTO change_types (name) SELECT new.Change_Type WHERE new.Change_Type IS NOT NULL; "
+        "INSERT OR IGNORE INTO change_fields (name) SELECT new.Field_Changed WHERE coalesce(new.Field_Changed, '') <> ''; "
+        "INSERT INTO change_events (Day, CIN, Type_Id, Field_Id, Old_Value, New_Value) VALUES ("
+        "CAST(replace(new.Date, '-', '') AS INTEGER), new.CIN, "
+        "(SELECT id FROM change_types WHERE name = new.Change_Type), "
+        "(SELECT id FROM change_fields WHERE name = new.Field_Changed), "
+        f"CASE WHEN new.Change_Type = '{FIELD_UPDATE}' THEN new.Old_Value END, "
+        f"CASE WHEN new.Change_Type = '{FIELD_UPDATE}' THEN new.New_Value END); END",
+        "CREATE TRIGGER IF NOT EXISTS change_log_delete INSTEAD OF DELETE ON change_log BEGIN "
+        "DELETE FROM change_events WHERE id = old.id; END",
+    ]),
+    (9, [
+        SCHEMA_COMPANY_HASHES,
+        _backfill_company_hashes,
+    ]),
+]
+# The schema this code reads and writes; init_db migrates older databases up to it
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# A company's change history in date order (index-ordered on change_events)
+CHANGE_HISTORY_SQL = f"SELECT {_CHANGE_COLUMNS_SQL} {_CHANGE_JOINS_SQL} WHERE e.CIN = ? ORDER BY e.Day"
+# The same up to and including a day (see day_int)
+CHANGE_HISTORY_UNTIL_SQL = (f"SELECT {_CHANGE_COLUMNS_SQL} {_CHANGE_JOINS_SQL} "
+                            "WHERE e.CIN = ? AND e.Day <= ? ORDER BY e.Day")
+
+# Change history of a JSON array of CINs in one statement, grouped by CIN in day order
+CHANGE_HISTORY_BATCH_SQL = (f"SELECT {_CHANGE_COLUMNS_SQL} {_CHANGE_JOINS_SQL} "
+                            "WHERE e.CIN IN (SELECT value FROM json_each(?)) ORDER BY e.CIN, e.Day")
+CHANGE_HISTORY_BATCH_UNTIL_SQL = (f"SELECT {_CHANGE_COLUMNS_SQL} {_CHANGE_JOINS_SQL} "
+                                  "WHERE e.CIN IN (SELECT value FROM json_each(?)) AND e.Day <= ? "
+                                  "ORDER BY e.CIN, e.Day")
+# Companies for a JSON array of CINs: one primary-key seek each, whatever the batch size
+COMPANIES_BY_CINS_SQL = "SELECT c.* FROM json_each(?) j JOIN companies c ON c.CIN = j.value"
+
+# Newest change_log id (0 when empty): the change feed reads up to it, so ids committed
+# later are always above the cursor it hands out
+LATEST_CHANGE_ID_SQL = "SELECT coalesce(max(id), 0) FROM change_events"
+
+# Rolls up change_log rows written after a given id (the current batch)
+_ROLLUP_NEW_CHANGES = _rollup_sql("cl.id > ?")
+
+# Latest version starting on or before the date, if it is still valid then: one index seek
+AS_OF_SQL = ("SELECT * FROM (SELECT * FROM company_history WHERE CIN = ? AND valid_from <= ? "
+             "ORDER BY valid_from DESC LIMIT 1) WHERE valid_to > ?")
+
+ENRICHMENT_CACHE_COLUMNS = ["CIN", "Source", "Directors", "Sector", "Source_URL",
+                            "Fetched_At", "TTL_Seconds", "ETag", "Last_Modified"]
+
+# Bulk-load settings: WAL lets readers continue during the nightly write, and
+# NORMAL sync is durable across application crashes in WAL mode.
+WRITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+)
+
 def get_conn():
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    return sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH)
+    for pragma in WRITE_PRAGMAS:
+        conn.execute(pragma)
+    return trace_connection(conn)
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
 
 def init_db():
     with get_conn() as conn:
-        c = conn.cursor()
-        c.execute(SCHEMA_COMPANIES)
-        c.execute(SCHEMA_CHANGELOG)
-        conn.commit()
+        current = schema_version(conn)
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            # One transaction per migration, including the version bump
+            conn.execute("BEGIN")
+            for stmt in statements:
+                if callable(stmt):
+                    stmt(conn)
+                else:
+                    conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+
+def _with_derived(rows: List[Dict[str, Any]]):
+    for r in rows:
+        yield tuple(r.get(k) for k in CANONICAL_COLUMNS) + (
+            incorporation_year(r.get('Date_of_Incorporation')), nic_sector(r.get('NIC_Code')))
+
+def _frame_with_derived(df):
+    out = df[CANONICAL_COLUMNS].astype(object)
+    out['Incorporation_Year'] = incorporation_year_series(df['Date_of_Incorporation']).astype(object)
+    out['NIC_Sector'] = nic_sector_series(df['NIC_Code']).astype(object)
+    return out.where(out.notna(), None)
+
+def _upsert_sql(cols: List[str]) -> str:
+    placeholders = ','.join(['?'] * len(cols))
+    updates = ','.join(f"{k}=excluded.{k}" for k in cols if k != 'CIN')
+    # Updates in place (no delete + reinsert as with REPLACE), keeping rowids stable
+    return (f"INSERT INTO companies ({','.join(cols)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(CIN) DO UPDATE SET {updates}")
 
-def upsert_companies(rows: List[Dict[str, Any]]):
+def _rows_hashes(rows: List[Dict[str, Any]]):
+    import pandas as pd
+    return row_hashes(as_ingest_types(pd.DataFrame(rows, columns=CANONICAL_COLUMNS)))
+
+def upsert_companies(rows: List[Dict[str, Any]], hashes=None):
+    """Insert or update companies from row dicts; `hashes` are their row_hashes when already known."""
+    if hashes is None:
+        hashes = _rows_hashes(rows)
     with get_conn() as conn:
         c = conn.cursor()
-        cols = CANONICAL_COLUMNS
-        placeholders = ','.join(['?'] * len(cols))
-        sql = f"REPLACE INTO companies ({','.join(cols)}) VALUES ({placeholders})"
-        data = [tuple(r.get(k) for k in cols) for r in rows]
-        c.executemany(sql, data)
+        c.executemany(_upsert_sql(COMPANY_COLUMNS), _with_derived(rows))
+        _write_hashes(c, [r['CIN'] for r in rows], hashes)
         conn.commit()
 
+def _change_tuples(rows: List[Dict[str, Any]]):
+    return [(r['CIN'], r['Change_Type'], r.get('Field_Changed',''), str(r.get('Old_Value','')), str(r.get('New_Value','')), r['Date']) for r in rows]
+
 def log_changes(rows: List[Dict[str, Any]]):
     if not rows:
         return
+    with get_conn() as conn:
+        _insert_changes(conn.cursor(), _change_tuples(rows))
+        conn.commit()
+
+def day_int(date_str: str) -> int:
+    """ISO date -> the integer day stored in change_events (2025-10-18 -> 20251018)."""
+    return int(date_str[:10].replace("-", ""))
+
+def _delete_changes_for_date(c, date_str: str):
+    c.execute("DELETE FROM change_events WHERE Day = ?", (day_int(date_str),))
+    c.execute("DELETE FROM daily_rollups WHERE Date = ?", (date_str,))
+
+def _lookup_ids(c, table: str, names) -> Dict[str, int]:
+    c.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", ((n,) for n in sorted(names)))
+    return dict(c.execute(f"SELECT name, id FROM {table}").fetchall())
+
+def _insert_changes(c, rows):
+    """Encode and insert (CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date)
+    tuples, adding them to daily_rollups in the same transaction.
+
+    Companies referenced by the rows should already be written, so new
+    incorporations roll up under their state and sector.
+    """
+    rows = list(rows)
+    types = _lookup_ids(c, "change_types", {r[1] for r in rows if r[1] is not None})
+    fields = _lookup_ids(c, "change_fields", {r[2] for r in rows if r[2]})
+    days = {}
+    data = []
+    for cin, change_type, field, old, new, date_str in rows:
+        if date_str not in days:
+            days[date_str] = day_int(date_str)
+        update = change_type == FIELD_UPDATE
+        data.append((days[date_str], cin, types.get(change_type), fields.get(field) if field else None,
+                     old if update else None, new if update else None))
+    # AUTOINCREMENT ids only grow, so everything above the current max is this batch
+    last_id = c.execute("SELECT coalesce(max(id), 0) FROM change_events").fetchone()[0]
+    c.executemany("INSERT INTO change_events (Day, CIN, Type_Id, Field_Id, Old_Value, New_Value) "
+                  "VALUES (?,?,?,?,?,?)", data)
+    c.execute(_ROLLUP_NEW_CHANGES, (last_id,))
+
+def replace_changes_for_date(date_str: str, rows: List[Dict[str, Any]]):
+    """Idempotent daily write: drop any change_log rows for the date, then insert."""
     with get_conn() as conn:
         c = conn.cursor()
-        sql = """INSERT INTO change_log (CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date)
-                 VALUES (?,?,?,?,?,?)"""
-        data = [(r['CIN'], r['Change_Type'], r.get('Field_Changed',''), str(r.get('Old_Value','')), str(r.get('New_Value','')), r['Date']) for r in rows]
-        c.executemany(sql, data)
+        _delete_changes_for_date(c, date_str)
+        _insert_changes(c, _change_tuples(rows))
         conn.commit()
 
-def export_master_csv(path: Path):
+def apply_daily_changes(companies, changes, date_str: str, conn=None):
+    """Write one day's delta in a single transaction.
+
+    `companies` is a DataFrame holding only the CINs to insert or update
+    (see change_detector.rows_to_write); deregistered CINs keep their last
+    row, as with the full-table rewrite. `changes` replaces the date's
+    change_log rows. company_history gets new versions for the written CINs
+    and closes deregistered ones, and company_hashes follows; rerunning the
+    latest date replaces its effects. With `conn`, the writes join its open
+    transaction and are left for the caller to commit (batched days).
+    """
+    if conn is None:
+        with get_conn() as conn:
+            apply_daily_changes(companies, changes, date_str, conn)
+            conn.commit()
+        return
+    company_data = _frame_with_derived(companies).itertuples(index=False, name=None)
+    change_data = changes[['CIN', 'Change_Type', 'Field_Changed', 'Old_Value', 'New_Value', 'Date']].astype(
+        {'Old_Value': str, 'New_Value': str}).astype(object).itertuples(index=False, name=None)
+    c = conn.cursor()
+    c.executemany(_upsert_sql(COMPANY_COLUMNS), company_data)
+    _write_hashes(c, companies['CIN'].tolist(), frame_hashes(companies))
+    _reset_history_for_date(c, date_str)
+    _record_history(c, date_str, companies['CIN'].tolist(),
+                    changes.loc[changes['Change_Type'] == 'Deregistered', 'CIN'].tolist())
+    _delete_changes_for_date(c, date_str)
+    _insert_changes(c, change_data)
+    _set_hashes_date(c, date_str)
+
+def seed_companies(companies, date_str: str):
+    """Load a full snapshot as of `date_str` (first pipeline day): upsert and open versions."""
+    company_data = _frame_with_derived(companies).itertuples(index=False, name=None)
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.executemany(_upsert_sql(COMPANY_COLUMNS), company_data)
+        c.execute("DELETE FROM company_hashes")
+        _write_hashes(c, companies['CIN'].tolist(), frame_hashes(companies))
+        _reset_history_for_date(c, date_str)
+        _record_history(c, date_str, companies['CIN'].tolist())
+        _set_hashes_date(c, date_str)
+        conn.commit()
+
+def _reset_history_for_date(c, date_str: str):
+    # Undo a previous run for the same date: drop its versions, reopen what it closed
+    c.execute("DELETE FROM company_history WHERE valid_from = ?", (date_str,))
+    c.execute("UPDATE company_history SET valid_to = ? WHERE valid_to = ?", (OPEN_VALID_TO, date_str))
+
+def _record_history(c, date_str: str, written_cins, closed_cins=()):
+    """Close the open versions of written and closed CINs at `date_str` and open
+    new versions for the written ones, copied from their (already upserted)
+    companies rows. Safe to call repeatedly for the same date."""
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS history_cins (CIN TEXT PRIMARY KEY, reopen INTEGER)")
+    c.execute("DELETE FROM temp.history_cins")
+    c.executemany("INSERT OR REPLACE INTO temp.history_cins VALUES (?, 0)", ((cin,) for cin in closed_cins))
+    c.executemany("INSERT OR REPLACE INTO temp.history_cins VALUES (?, 1)", ((cin,) for cin in written_cins))
+    # Unary + keeps the planner off idx_company_history_to (nearly every row is open)
+    c.execute("UPDATE company_history SET valid_to = ? WHERE +valid_to = ? AND valid_from < ? "
+              "AND CIN IN (SELECT CIN FROM temp.history_cins)", (date_str, OPEN_VALID_TO, date_str))
+    cols = ", ".join(_HISTORY_VALUE_COLUMNS)
+    c.execute(f"INSERT INTO company_history (CIN, valid_from, valid_to, {cols}) "
+              f"SELECT c.CIN, ?, ?, {', '.join('c.' + col for col in _HISTORY_VALUE_COLUMNS)} "
+              "FROM temp.history_cins h JOIN companies c ON c.CIN = h.CIN WHERE h.reopen = 1 "
+              f"ON CONFLICT (CIN, valid_from) DO UPDATE SET valid_to = excluded.valid_to, "
+              + ", ".join(f"{col} = excluded.{col}" for col in _HISTORY_VALUE_COLUMNS),
+              (date_str, OPEN_VALID_TO))
+    # Versions opened earlier today for CINs that are now closed (e.g. streamed batches)
+    c.execute("DELETE FROM company_history WHERE valid_from = ? AND CIN IN "
+              "(SELECT CIN FROM temp.history_cins WHERE reopen = 0)", (date_str,))
+    # Closed companies leave the live snapshot
+    c.execute("DELETE FROM company_hashes WHERE CIN IN (SELECT CIN FROM temp.history_cins WHERE reopen = 0)")
+
+def reset_history_for_date(date_str: str):
+    with get_conn() as conn:
+        _reset_history_for_date(conn.cursor(), date_str)
+        conn.commit()
+
+def record_history(date_str: str, written_cins, closed_cins=()):
+    """Version the given companies at `date_str` (see _record_history); for the streamed path."""
+    with get_conn() as conn:
+        _record_history(conn.cursor(), date_str, written_cins, closed_cins)
+        conn.commit()
+
+def _set_hashes_date(c, date_str):
+    c.execute("INSERT INTO meta (key, value) VALUES ('hashes_date', ?) "
+              "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (date_str,))
+
+def set_hashes_date(date_str, clear: bool = False):
+    """Record the snapshot date company_hashes matches (None while a streamed day is
+    being written); `clear` empties it first, for a streamed seed."""
+    with get_conn() as conn:
+        if clear:
+            conn.execute("DELETE FROM company_hashes")
+        _set_hashes_date(conn, date_str)
+        conn.commit()
+
+def hashes_date(conn=None):
+    """Date of the snapshot company_hashes matches, or None when unknown."""
+    if conn is None:
+        with get_conn() as conn:
+            return hashes_date(conn)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'hashes_date'").fetchone()
+    return row[0] if row else None
+
+def stored_row_hashes():
+    """company_hashes as an int64 Series of Row_Hash indexed by CIN."""
+    import pandas as pd
+    with get_conn() as conn:
+        df = pd.read_sql_query("SELECT CIN, Row_Hash FROM company_hashes", conn)
+    return df.set_index('CIN')['Row_Hash'].astype('int64')
+
+def changed_company_rows(rows: List[Dict[str, Any]]):
+    """(rows, their row_hashes) for the companies in `rows` that are new or whose hash
+    differs from company_hashes; the rest are already stored as given."""
+    hashes = _rows_hashes(rows)
+    with get_conn() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted_cins (CIN TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.wanted_cins")
+        conn.executemany("INSERT OR IGNORE INTO temp.wanted_cins VALUES (?)", ((r['CIN'],) for r in rows))
+        stored = dict(conn.execute("SELECT h.CIN, h.Row_Hash FROM temp.wanted_cins w "
+                                   "JOIN company_hashes h ON h.CIN = w.CIN"))
+    keep = [i for i, (r, h) in enumerate(zip(rows, hashes.tolist())) if stored.get(r['CIN']) != h]
+    return [rows[i] for i in keep], hashes[keep]
+
+def read_companies(cins):
+    """Stored rows (CANONICAL_COLUMNS, ingest dtypes) for `cins`, in that order."""
     import pandas as pd
     with get_conn() as conn:
-        df = pd.read_sql_query("SELECT * FROM companies", conn)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted_cins (CIN TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM temp.wanted_cins")
+        conn.executemany("INSERT OR IGNORE INTO temp.wanted_cins VALUES (?)", ((cin,) for cin in cins))
+        df = pd.read_sql_query(f"SELECT {', '.join('c.' + col for col in CANONICAL_COLUMNS)} "
+                               "FROM temp.wanted_cins w JOIN companies c ON c.CIN = w.CIN", conn)
+    df = df.set_index('CIN', drop=False).reindex(cins).reset_index(drop=True)
+    return as_ingest_types(df)
+
+def company_as_of(cin: str, as_of: str, conn=None):
+    """The company_history version of `cin` valid on `as_of` (ISO date) as a dict, or None."""
+    if conn is None:
+        with get_conn() as conn:
+            return company_as_of(cin, as_of, conn)
+    cur = conn.execute(AS_OF_SQL, (cin, as_of, as_of))
+    row = cur.fetchone()
+    return dict(zip([d[0] for d in cur.description], row)) if row else None
+
+def bump_generation() -> int:
+    """Mark the data as changed so generation-keyed caches drop stale entries."""
+    with get_conn() as conn:
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+        conn.commit()
+        return int(conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+def data_generation(conn=None) -> int:
+    if conn is None:
+        with get_conn() as conn:
+            return data_generation(conn)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+    return int(row[0]) if row else 0
+
+def read_enrichment_cache(cins: List[str], source: str) -> Dict[str, Dict[str, Any]]:
+    """Cached enrichment rows for `cins` from one source, keyed by CIN."""
+    cins = list(dict.fromkeys(cins))
+    out = {}
+    with get_conn() as conn:
+        conn.row_factory = sqlite3.Row
+        # Chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(cins), 500):
+            chunk = cins[i:i + 500]
+            sql = (f"SELECT * FROM enrichment_cache WHERE Source = ? "
+                   f"AND CIN IN ({','.join('?' * len(chunk))})")
+            for row in conn.execute(sql, [source] + chunk):
+                out[row["CIN"]] = dict(row)
+    return out
+
+def store_enrichment(rows: List[Dict[str, Any]]):
+    """Insert or refresh enrichment_cache rows (dicts with ENRICHMENT_CACHE_COLUMNS)."""
+    if not rows:
+        return
+    cols = ENRICHMENT_CACHE_COLUMNS
+    updates = ", ".join(f"{c}=excluded.{c}" for c in cols[2:])
+    sql = (f"INSERT INTO enrichment_cache ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+           f"ON CONFLICT(CIN, Source) DO UPDATE SET {updates}")
+    with get_conn() as conn:
+        conn.executemany(sql, [tuple(r.get(c) for c in cols) for r in rows])
+        conn.commit()
+
+def export_master_csv(path: Path) -> int:
+    """Write the companies table to CSV; returns the row count."""
+    import pandas as pd
+    with get_conn() as conn:
+        df = pd.read_sql_query(f"SELECT {','.join(CANONICAL_COLUMNS)} FROM companies", conn)
     path.parent.mkdir(parents=True, exist_ok=True)
     df.to_csv(path, index=False)
+    return len(df)
+
+_LIKE_ESCAPE = "ESCAPE '\\'"
+
+def _like_literal(text: str) -> str:
+    """text with LIKE's wildcards escaped, so % and _ in a search term match themselves."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def name_search_sql(name: str, limit: int = NAME_SEARCH_LIMIT, prefix: bool = False,
+                    include_cin: bool = False, columns: str = "c.*"):
+    """SQL and params for a ranked, case-insensitive search on Company_Name.
+
+    Substring matches by default; `prefix=True` keeps names starting with `name`,
+    and `include_cin=True` also matches CIN substrings. Terms of 3+ characters
+    go through the trigram index; shorter ones fall back to LIKE, which
+    trigrams cannot serve.
+
+    Results rank names starting with the term first, then shorter (closer)
+    names. bm25 is not used: its corpus statistics cost a pass over every
+    match, which dominates for common terms. With a `limit`, only the first
+    NAME_SEARCH_RANK_WINDOW matches (or `limit`, if larger) are ranked, taken in
+    rowid (insertion) order: when more names match, a better-ranked one past
+    the window is left out. `limit=None` ranks every match.
+    """
+    term = name.strip()
+    literal = _like_literal(term.lower())
+    like = (f"{literal}%" if prefix else f"%{literal}%")
+    name_like = (f"(lower(c.Company_Name) LIKE ? {_LIKE_ESCAPE}"
+                 + (f" OR lower(c.CIN) LIKE ? {_LIKE_ESCAPE})" if include_cin else ")"))
+    like_params = [like, like] if include_cin else [like]
+    if len(term) >= 3:
+        target = "{Company_Name CIN}" if include_cin else "Company_Name"
+        params = [f'{target} : "' + term.replace('"', '""') + '"']
+        candidates = "SELECT f.rowid AS rid FROM companies_fts f"
+        if prefix:
+            candidates += f" JOIN companies c ON c.rowid = f.rowid WHERE companies_fts MATCH ? AND {name_like}"
+            params += like_params
+        else:
+            candidates += " WHERE companies_fts MATCH ?"
+    else:
+        candidates = f"SELECT c.rowid AS rid FROM companies c WHERE {name_like}"
+        params = list(like_params)
+    if limit is not None:
+        candidates += " LIMIT ?"
+        params.append(max(int(limit), NAME_SEARCH_RANK_WINDOW))
+    sql = f"SELECT {columns} FROM ({candidates}) m JOIN companies c ON c.rowid = m.rid"
+    sql += f" ORDER BY lower(c.Company_Name) LIKE ? {_LIKE_ESCAPE} DESC, length(c.Company_Name), c.Company_Name"
+    params.append(f"{literal}%")
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return sql, tuple(params)
+
+def company_filter_sql(q: str = None, year: int = None, state: str = None, status: str = None):
+    """FROM/WHERE clause and params for the Explore filters (CIN/name text, year, state, status)."""
+    clauses, params = [], []
+    if q:
+        term = q.strip()
+        if len(term) >= 3:
+            clauses.append("c.rowid IN (SELECT rowid FROM companies_fts WHERE companies_fts MATCH ?)")
+            params.append('{Company_Name CIN} : "' + term.replace('"', '""') + '"')
+        else:
+            clauses.append(f"(lower(c.Company_Name) LIKE ? {_LIKE_ESCAPE} OR lower(c.CIN) LIKE ? {_LIKE_ESCAPE})")
+            params += [f"%{_like_literal(term.lower())}%"] * 2
+    if year is not None:
+        clauses.append("c.Incorporation_Year = ?")
+        params.append(int(year))
+    if state:
+        clauses.append("c.State = ?")
+        params.append(state)
+    if status:
+        clauses.append("c.Company_Status LIKE ?")
+        params.append(f"%{status}%")
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return "FROM companies c" + where, tuple(params)
+
+def company_page_sql(after: str = None, limit: int = None, q: str = None, year: int = None,
+                     state: str = None, status: str = None):
+    """SQL and params for a keyset page of companies in CIN order: rows after CIN `after`
+    matching the Explore filters. Pages stay cheap however deep, unlike OFFSET."""
+    from_sql, params = company_filter_sql(q, year, state, status)
+    if after is not None:
+        from_sql += (" AND" if " WHERE " in from_sql else " WHERE") + " c.CIN > ?"
+        params += (after,)
+    sql = f"SELECT c.* {from_sql} ORDER BY c.CIN"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params += (int(limit),)
+    return sql, params
+
+def change_feed_sql(after_id: int, until_id: int, limit: int = None, change_type: str = None,
+                    field: str = None, state: str = None):
+    """SQL and params for change_log rows with after_id < id <= until_id, oldest first,
+    optionally of one change type, field and company state.
+
+    The id range drives the query and filters are checked per row (`+` keeps the
+    type index out), so a read costs the rows past the cursor, not the table size.
+    """
+    sql = CHANGE_ROWS_SQL + " WHERE e.id > ? AND e.id <= ?"
+    params = [int(after_id), int(until_id)]
+    if change_type:
+        sql += " AND +e.Type_Id = (SELECT id FROM change_types WHERE name = ?)"
+        params.append(change_type)
+    if field:
+        sql += " AND e.Field_Id = (SELECT id FROM change_fields WHERE name = ?)"
+        params.append(field)
+    if state:
+        sql += " AND (SELECT State FROM companies WHERE CIN = e.CIN) = ?"
+        params.append(state)
+    sql += " ORDER BY e.id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return sql, tuple(params)
+
+def explain_query_plan(sql: str, params=()) -> List[str]:
+    """Detail lines of EXPLAIN QUERY PLAN, e.g. 'SEARCH change_log USING INDEX ...'."""
+    with get_conn() as conn:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def read_rollups(start: str, end: str):
+    """daily_rollups rows for Date in [start, end] (ISO dates) as a DataFrame."""
+    import pandas as pd
+    with get_conn() as conn:
+        return pd.read_sql_query(
+            "SELECT Date, Change_Type, Field_Changed, State, Sector, Count FROM daily_rollups "
+            "WHERE Date BETWEEN ? AND ? ORDER BY Date", conn, params=(start, end))
+
+def rollup_date_range(conn=None):
+    """(first, last) dates with rolled-up changes, or (None, None)."""
+    if conn is None:
+        with get_conn() as conn:
+            return rollup_date_range(conn)
+    return conn.execute("SELECT min(Date), max(Date) FROM daily_rollups").fetchone()
+
+def status_change_cins(start: str, end: str, limit: int = 20) -> List[str]:
+    """CINs with a Company_Status update in [start, end], in change order."""
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT CIN FROM change_events WHERE Day BETWEEN ? AND ? "
+            "AND Type_Id = (SELECT id FROM change_types WHERE name = ?) "
+            "AND Field_Id = (SELECT id FROM change_fields WHERE name = 'Company_Status') "
+            "GROUP BY CIN ORDER BY min(id) LIMIT ?",
+            (day_int(start), day_int(end), FIELD_UPDATE, limit)).fetchall()
+    return [r[0] for r in rows]
 
 def read_changes_since(date_str: str):
+    """change_log rows dated on or after `date_str`, including days archived to Parquet."""
     import pandas as pd
+    from .changelog_archive import read_archived_changes
     with get_conn() as conn:
-        df = pd.read_sql_query("SELECT * FROM change_log WHERE Date >= ?", conn, params=(date_str,))
-    return df
+        df = pd.read_sql_query(CHANGE_ROWS_SQL + " WHERE e.Day >= ? ORDER BY e.Day, e.id", conn,
+                               params=(day_int(date_str),))
+    # A day rerun after archiving lives in the DB again; its archive copy is stale
+    archived = read_archived_changes(date_str, exclude_dates=set(df['Date']))
+    if archived is None or archived.empty:
+        return df
+    return pd.concat([archived, df], ignore_index=True).sort_values(['Date', 'id'], kind='stable', ignore_index=True)
+
+if __name__ == "__main__":
+    init_db()
+    print(f"[✓] {DB_PATH} is at schema version {SCHEMA_VERSION}")
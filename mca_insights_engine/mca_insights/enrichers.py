@@ -1,88 +1,275 @@
 from pathlib import Path
 import os
+import random
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from .config import ENRICH_DIR, ENABLE_WEB_ENRICHMENT
+from .config import (ENRICH_DIR, ENABLE_WEB_ENRICHMENT, ENRICH_BASE_URL, ENRICH_WORKERS,
+                     ENRICH_RATE_PER_HOST, ENRICH_TIMEOUT, ENRICH_RETRIES, ENRICH_BACKOFF,
+                     ENRICH_DEADLINE, ENRICH_CACHE_TTL)
+from .database import read_enrichment_cache, store_enrichment
+
+ENRICH_COLUMNS = ['CIN','COMPANY_NAME','STATE','STATUS','SOURCE','FIELD','SOURCE_URL']
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LIVE_SOURCE = 'ZaubaCorp'
+
+# Changes that can alter what a company page shows; other changes reuse a stale cache entry
+REFRESH_CHANGE_TYPES = {'New Incorporation'}
+REFRESH_FIELDS = {'Company_Name', 'Company_Class', 'Company_Status', 'NIC_Code'}
 
 def _read_seed():
     seed_file = ENRICH_DIR / "enrichment_seed.csv"
     if seed_file.exists():
         return pd.read_csv(seed_file)
-    return pd.DataFrame(columns=['CIN','COMPANY_NAME','STATE','STATUS','SOURCE','FIELD','SOURCE_URL'])
+    return pd.DataFrame(columns=ENRICH_COLUMNS)
+
+def _seed_by_cin(seed: pd.DataFrame):
+    """Seed rows grouped per CIN, in file order."""
+    by_cin = {}
+    for row in seed.to_dict(orient='records'):
+        by_cin.setdefault(row['CIN'], []).append(row)
+    return by_cin
+
+class _HostRateLimiter:
+    """Spaces request start times per host to at most `rate` per second."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str, deadline: float) -> bool:
+        """Wait for the host's next slot; False if that slot is past the deadline."""
+        if not self._interval:
+            return time.monotonic() < deadline
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            if slot >= deadline:
+                return False
+            self._next[host] = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+        return True
+
+class PageFetcher:
+    """Concurrent GETs with per-thread pooled sessions, a per-host rate limit,
+    retries with exponential backoff and one deadline for the whole batch."""
+
+    def __init__(self, workers=None, rate_per_host=None, timeout=None, retries=None,
+                 backoff=None, deadline=None):
+        self.workers = workers or ENRICH_WORKERS
+        self.timeout = ENRICH_TIMEOUT if timeout is None else timeout
+        self.retries = ENRICH_RETRIES if retries is None else retries
+        self.backoff = ENRICH_BACKOFF if backoff is None else backoff
+        self.deadline_s = ENRICH_DEADLINE if deadline is None else deadline
+        self._limiter = _HostRateLimiter(ENRICH_RATE_PER_HOST if rate_per_host is None else rate_per_host)
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
 
-def _safe_request(url, timeout=10):
+    def _session(self):
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = requests.Session()
+            s.headers['User-Agent'] = 'Mozilla/5.0'
+            # Keep-alive pool per thread; retries are handled here so they honour the deadline
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0)
+            s.mount('http://', adapter)
+            s.mount('https://', adapter)
+            self._local.session = s
+            with self._sessions_lock:
+                self._sessions.append(s)
+        return s
+
+    def get(self, url, deadline, headers=None):
+        """Return the final response (or None on error / deadline)."""
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            if not self._limiter.acquire(host, deadline):
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                r = self._session().get(url, timeout=min(self.timeout, remaining), headers=headers)
+                if r.status_code not in RETRY_STATUSES:
+                    return r
+            except requests.RequestException:
+                r = None
+            if attempt == self.retries:
+                return r
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            if r is not None and r.headers.get('Retry-After', '').isdigit():
+                delay = max(delay, float(r.headers['Retry-After']))
+            if time.monotonic() + delay >= deadline:
+                return r
+            time.sleep(delay)
+        return None
+
+    def fetch_all(self, urls, headers=None):
+        """GET every URL concurrently; returns {url: response or None} and run stats.
+
+        `headers` optionally maps a URL to extra request headers (e.g. validators).
+        """
+        headers = headers or {}
+        start = time.monotonic()
+        deadline = start + self.deadline_s
+        results = {url: None for url in urls}
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="enrich")
+        try:
+            futures = {pool.submit(self.get, url, deadline, headers.get(url)): url for url in results}
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            for fut in done:
+                results[futures[fut]] = fut.result()
+        finally:
+            # Anything still queued at the deadline is dropped; requests in flight are waited
+            # for (their timeouts are capped by the deadline) so no session closes under a thread
+            pool.shutdown(wait=True, cancel_futures=True)
+            with self._sessions_lock:
+                for s in self._sessions:
+                    s.close()
+                self._sessions.clear()
+        elapsed = time.monotonic() - start
+        ok = sum(1 for r in results.values() if r is not None and r.status_code in (200, 304))
+        stats = {"requested": len(results), "ok": ok, "elapsed_s": round(elapsed, 3),
+                 "per_s": round(ok / elapsed, 1) if elapsed > 0 else None}
+        return results, stats
+
+def _parse_page(html):
+    # Extremely naive parsing (for demo) — real world needs robust locators
+    directors, sector = '', ''
     try:
-        r = requests.get(url, timeout=timeout, headers={'User-Agent': 'Mozilla/5.0'})
-        if r.status_code == 200:
-            return r.text
+        soup = BeautifulSoup(html, 'html.parser')
+        directors = ';'.join([a.get_text(strip=True) for a in soup.select('table tr td a')][:3])
+        sector = (soup.find('title').get_text(strip=True) if soup.find('title') else '')[:60]
     except Exception:
-        return None
-    return None
+        pass
+    return directors, sector
 
-def enrich_sample(changed_cins, master_df, limit=100):
-    """Enrich up to 'limit' changed CINs using seeded data or (optionally) live web lookups."""
-    out_rows = []
-    taken = 0
-    seed = _read_seed()
-    idx_master = master_df.set_index('CIN')
+def refresh_worthy(changes_df):
+    """CINs whose changes make re-fetching their page worthwhile."""
+    worthy = changes_df['Change_Type'].isin(REFRESH_CHANGE_TYPES)
+    if 'Field_Changed' in changes_df.columns:
+        worthy |= (changes_df['Change_Type'] == 'Field Update') & changes_df['Field_Changed'].isin(REFRESH_FIELDS)
+    return set(changes_df.loc[worthy, 'CIN'])
 
-    for cin in changed_cins:
-        if taken >= limit:
-            break
-        name = idx_master.loc[cin]['Company_Name'] if cin in idx_master.index else ''
-        state = idx_master.loc[cin]['State'] if cin in idx_master.index else ''
-        status = idx_master.loc[cin]['Company_Status'] if cin in idx_master.index else ''
-
-        # Seed first
-        seed_matches = seed[seed['CIN'] == cin]
-        if not seed_matches.empty:
-            for _, row in seed_matches.iterrows():
-                out_rows.append(row.to_dict())
-            taken += 1
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+def _is_fresh(entry, now):
+    try:
+        fetched = datetime.fromisoformat(entry['Fetched_At'])
+    except (TypeError, ValueError):
+        return False
+    return now < fetched + timedelta(seconds=entry['TTL_Seconds'] or 0)
+
+def _fetch_live(live_rows, worthy, fetcher):
+    """Fill FIELD on live rows from the enrichment cache, fetching only what needs it.
+
+    Fresh entries are reused; stale ones are revalidated with If-None-Match /
+    If-Modified-Since when their CIN is refresh-worthy (or `worthy` is None)
+    and reused as-is otherwise. CINs with no entry are always fetched.
+    """
+    now = _utcnow()
+    cache = read_enrichment_cache([r['CIN'] for r in live_rows], LIVE_SOURCE)
+    to_fetch, headers, reused = [], {}, 0
+    for row in live_rows:
+        entry = cache.get(row['CIN'])
+        if entry is not None and (_is_fresh(entry, now) or (worthy is not None and row['CIN'] not in worthy)):
+            reused += 1
             continue
+        to_fetch.append(row)
+        if entry is not None:
+            validators = {}
+            if entry['ETag']:
+                validators['If-None-Match'] = entry['ETag']
+            if entry['Last_Modified']:
+                validators['If-Modified-Since'] = entry['Last_Modified']
+            headers[row['SOURCE_URL']] = validators
+
+    updates = []
+    if to_fetch:
+        responses, stats = (fetcher or PageFetcher()).fetch_all([r['SOURCE_URL'] for r in to_fetch], headers)
+        fetched_at = _utcnow().isoformat(timespec='seconds')
+        for row in to_fetch:
+            resp, entry = responses.get(row['SOURCE_URL']), cache.get(row['CIN'])
+            if resp is None or resp.status_code not in (200, 304) or (resp.status_code == 304 and entry is None):
+                continue  # keep whatever the cache had (possibly nothing)
+            if resp.status_code == 200:
+                directors, sector = _parse_page(resp.text)
+            else:
+                directors, sector = entry['Directors'], entry['Sector']
+            entry = {'CIN': row['CIN'], 'Source': LIVE_SOURCE, 'Directors': directors, 'Sector': sector,
+                     'Source_URL': row['SOURCE_URL'], 'Fetched_At': fetched_at, 'TTL_Seconds': ENRICH_CACHE_TTL,
+                     'ETag': resp.headers.get('ETag') or (entry or {}).get('ETag'),
+                     'Last_Modified': resp.headers.get('Last-Modified') or (entry or {}).get('Last_Modified')}
+            cache[row['CIN']] = entry
+            updates.append(entry)
+        store_enrichment(updates)
+        print(f"[+] Fetched {stats['ok']}/{stats['requested']} company pages in {stats['elapsed_s']}s "
+              f"({stats['per_s']} companies/s)")
+    print(f"[+] Enrichment cache: {reused} reused, {len(to_fetch)} requested, {len(updates)} refreshed")
+
+    for row in live_rows:
+        entry = cache.get(row['CIN'])
+        directors, sector = (entry['Directors'] or '', entry['Sector'] or '') if entry else ('', '')
+        row['FIELD'] = f'Director_Names={directors};Sector={sector}'
+
+def _merge_output(out_df, out_path: Path):
+    """Replace rows for this run's CINs in the existing output; keep everyone else's."""
+    if out_path.exists():
+        previous = pd.read_csv(out_path, dtype=str, keep_default_na=False)
+        previous = previous[~previous['CIN'].isin(set(out_df['CIN']))]
+        out_df = pd.concat([previous, out_df], ignore_index=True)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    out_df.to_csv(tmp, index=False)
+    os.replace(tmp, out_path)
 
-        if not ENABLE_WEB_ENRICHMENT:
+def enrich_sample(changed_cins, master_df, limit=100, live=None, base_url=None, fetcher=None, changes_df=None):
+    """Enrich up to 'limit' changed CINs using seeded data or (optionally) live web lookups.
+
+    Live lookups (`live`, default ENABLE_WEB_ENRICHMENT) go to `base_url` + CIN
+    through a PageFetcher and the SQLite enrichment cache; with `changes_df`,
+    stale entries are only refreshed for refresh-worthy changes. Rows for these
+    CINs replace their previous rows in enriched_changes.csv.
+    """
+    live = ENABLE_WEB_ENRICHMENT if live is None else live
+    base_url = base_url or ENRICH_BASE_URL
+    seed = _seed_by_cin(_read_seed())
+    info = master_df.drop_duplicates('CIN').set_index('CIN')[['Company_Name', 'State', 'Company_Status']].to_dict('index')
+
+    # Each taken CIN produces seed rows, a demo row, or a live row filled in after fetching
+    plan, live_rows = [], []
+    for cin in changed_cins:
+        if len(plan) >= limit:
+            break
+        m = info.get(cin, {})
+        base = {'CIN': cin, 'COMPANY_NAME': m.get('Company_Name', ''), 'STATE': m.get('State', ''),
+                'STATUS': m.get('Company_Status', '')}
+        if cin in seed:
+            plan.append(seed[cin])
+        elif not live:
             # Fallback synthetic enrichment
-            out_rows.append({
-                'CIN': cin,
-                'COMPANY_NAME': name,
-                'STATE': state,
-                'STATUS': status,
-                'SOURCE': 'Seeded (demo)',
-                'FIELD': 'Director_Names;Sector;Company_Type',
-                'SOURCE_URL': 'N/A'
-            })
-            taken += 1
-            continue
+            plan.append([{**base, 'SOURCE': 'Seeded (demo)', 'FIELD': 'Director_Names;Sector;Company_Type',
+                          'SOURCE_URL': 'N/A'}])
+        else:
+            row = {**base, 'SOURCE': LIVE_SOURCE, 'FIELD': '', 'SOURCE_URL': f"{base_url}{cin}"}
+            live_rows.append(row)
+            plan.append([row])
 
-        # Optional: Live web enrichment (very lightweight demo stubs)
-        # ZaubaCorp example (structure may change; best-effort demo)
-        zurl = f"https://www.zaubacorp.com/companysearchresults/{cin}"
-        html = _safe_request(zurl)
-        directors = ''
-        sector = ''
-        if html:
-            try:
-                soup = BeautifulSoup(html, 'html.parser')
-                # Extremely naive parsing (for demo) — real world needs robust locators
-                directors = ';'.join([a.get_text(strip=True) for a in soup.select('table tr td a')][:3])
-                sector = (soup.find('title').get_text(strip=True) if soup.find('title') else '')[:60]
-            except Exception:
-                pass
-
-        out_rows.append({
-            'CIN': cin,
-            'COMPANY_NAME': name,
-            'STATE': state,
-            'STATUS': status,
-            'SOURCE': 'ZaubaCorp',
-            'FIELD': f'Director_Names={directors};Sector={sector}',
-            'SOURCE_URL': zurl
-        })
-        taken += 1
-
-    out_df = pd.DataFrame(out_rows, columns=['CIN','COMPANY_NAME','STATE','STATUS','SOURCE','FIELD','SOURCE_URL'])
+    if live_rows:
+        _fetch_live(live_rows, refresh_worthy(changes_df) if changes_df is not None else None, fetcher)
+
+    out_rows = [row for rows in plan for row in rows]
+    out_df = pd.DataFrame(out_rows, columns=ENRICH_COLUMNS)
+    ENRICH_DIR.mkdir(parents=True, exist_ok=True)
     out_path = ENRICH_DIR / "enriched_changes.csv"
-    out_df.to_csv(out_path, index=False)
+    _merge_output(out_df, out_path)
     return out_path
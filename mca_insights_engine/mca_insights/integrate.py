@@ -1,7 +1,11 @@
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-from .config import CANONICAL_COLUMNS, SELECTED_STATES
-from .utils import normalize_cin, to_float
+from .config import (CANONICAL_COLUMNS, SELECTED_STATES, INGEST_WORKERS, INGEST_PARALLEL_MIN_BYTES,
+                     SNAPSHOT_CACHE_ENABLED)
+from . import snapshot_cache
+from .schema import as_ingest_types, concat_typed, row_hashes
+from .utils import normalize_cin_series, to_float_series
 
 def load_and_normalize_state_csv(path: Path, state: str) -> pd.DataFrame:
     df = pd.read_csv(path)
@@ -26,29 +30,56 @@ def load_and_normalize_state_csv(path: Path, state: str) -> pd.DataFrame:
         if col not in df.columns:
             df[col] = None
     # Clean
-    df['CIN'] = df['CIN'].apply(normalize_cin)
-    df['Authorized_Capital'] = df['Authorized_Capital'].apply(to_float)
-    df['Paidup_Capital'] = df['Paidup_Capital'].apply(to_float)
+    df['CIN'] = normalize_cin_series(df['CIN'])
+    df['Authorized_Capital'] = to_float_series(df['Authorized_Capital'])
+    df['Paidup_Capital'] = to_float_series(df['Paidup_Capital'])
     df['State'] = state
     # Drop duplicates by CIN (keep last)
     df = df.drop_duplicates(subset=['CIN'], keep='last')
-    # Restrict to canonical columns
-    df = df[CANONICAL_COLUMNS].copy()
+    # Restrict to canonical columns, compactly typed (see schema.INGEST_DTYPES)
+    return _with_row_hashes(as_ingest_types(df[CANONICAL_COLUMNS].copy()))
+
+def _with_row_hashes(df: pd.DataFrame) -> pd.DataFrame:
+    # Content hash per company, computed once at ingest (in the state's worker) and
+    # reused by change detection and the DB writers
+    df['Row_Hash'] = row_hashes(df)
     return df
 
-def consolidate_snapshot_dir(snapshot_dir: Path) -> pd.DataFrame:
-    pieces = []
+def consolidate_snapshot_dir(snapshot_dir: Path, workers: int = None, use_cache: bool = None) -> pd.DataFrame:
+    use_cache = SNAPSHOT_CACHE_ENABLED if use_cache is None else use_cache
+    manifest = None
+    if use_cache and snapshot_cache.feather is not None:
+        cached = snapshot_cache.load_cached_snapshot(snapshot_dir)
+        if cached is not None:
+            return as_ingest_types(cached)
+        manifest = snapshot_cache.build_manifest(snapshot_dir)
+    master = _consolidate_from_csv(snapshot_dir, workers)
+    if manifest is not None and manifest["sources"]:
+        snapshot_cache.store_snapshot(snapshot_dir, master, manifest)
+    return master
+
+def _consolidate_from_csv(snapshot_dir: Path, workers: int = None) -> pd.DataFrame:
+    jobs = []
     for state in SELECTED_STATES:
         # Expect filenames like state_name.csv in the directory
         fname = state.lower().replace(' ', '_') + '.csv'
         fpath = snapshot_dir / fname
         if not fpath.exists():
             continue
-        df = load_and_normalize_state_csv(fpath, state)
-        pieces.append(df)
+        jobs.append((fpath, state))
+    if workers is None:
+        # Below the threshold, process start-up and pickling cost more than the pool saves
+        small = sum(fpath.stat().st_size for fpath, _ in jobs) < INGEST_PARALLEL_MIN_BYTES
+        workers = 1 if small else INGEST_WORKERS
+    if workers > 1 and len(jobs) > 1:
+        # States load independently; map() keeps SELECTED_STATES order for last-wins dedupe
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            pieces = list(pool.map(load_and_normalize_state_csv, *zip(*jobs)))
+    else:
+        pieces = [load_and_normalize_state_csv(fpath, state) for fpath, state in jobs]
     if not pieces:
-        return pd.DataFrame(columns=CANONICAL_COLUMNS)
-    master = pd.concat(pieces, ignore_index=True)
+        return _with_row_hashes(as_ingest_types(pd.DataFrame(columns=CANONICAL_COLUMNS)))
+    master = concat_typed(pieces)
     # Final dedupe
     master = master.drop_duplicates(subset=['CIN'], keep='last')
     return master
@@ -0,0 +1,247 @@
+"""Per-stage instrumentation for pipeline runs.
+
+`pipeline_run()` opens a run; inside it, `stage(name)` records wall time, rows
+in/out, peak RSS and the SQLite statements executed on connections from
+`database.get_conn`. When the run ends a JSON report is written to METRICS_DIR
+and a Prometheus textfile to METRICS_TEXTFILE. Outside a run, `stage()` does
+nothing beyond yielding a record, so callers need not check.
+"""
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from .config import METRICS_DIR, METRICS_TEXTFILE, PROFILE_STAGE, PROFILE_MODE
+
+TRACEMALLOC_TOP = 25
+
+_current = None
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No /proc: fall back to the process high-water mark
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+
+class PeakRSS:
+    """Samples resident memory in a background thread while a block runs."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+class StageRecord:
+    """One execution of a stage; set rows_in/rows_out inside the `with` block."""
+
+    def __init__(self, name: str, date: Optional[str], rows_in: Optional[int]):
+        self.name = name
+        self.date = date
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.duration_s = 0.0
+        self.peak_rss_bytes = 0
+        self.statements: Counter = Counter()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"stage": self.name, "date": self.date, "duration_s": round(self.duration_s, 4),
+                "rows_in": self.rows_in, "rows_out": self.rows_out, "peak_rss_bytes": self.peak_rss_bytes,
+                "sqlite_statements": sum(self.statements.values()),
+                "sqlite_statements_by_kind": dict(sorted(self.statements.items()))}
+
+class RunMetrics:
+    def __init__(self, mode: str, dates: List[str]):
+        self.mode = mode
+        self.dates = list(dates)
+        self.started = datetime.now(timezone.utc)
+        self.stages: List[StageRecord] = []
+        self.status = "running"
+        self.duration_s = 0.0
+        self.peak_rss_bytes = 0
+        self.profiles: List[str] = []
+        self.profile_seq = 0
+        self._open: List[StageRecord] = []
+
+    def _trace(self, sql: str):
+        if not self._open:
+            return
+        words = sql.split(None, 1)
+        # Statements run by triggers are reported as "-- TRIGGER <name>"
+        kind = "TRIGGER" if sql.startswith("--") else (words[0].upper() if words else "OTHER")
+        for rec in self._open:
+            rec.statements[kind] += 1
+
+    def report(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "dates": self.dates, "status": self.status,
+                "started": self.started.isoformat(timespec="seconds"),
+                "duration_s": round(self.duration_s, 4), "peak_rss_bytes": self.peak_rss_bytes,
+                "stages": [s.as_dict() for s in self.stages], "totals": self.totals(),
+                "profiles": self.profiles}
+
+    def totals(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage sums across days (peak RSS is the max)."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for s in self.stages:
+            t = out.setdefault(s.name, {"runs": 0, "duration_s": 0.0, "rows_in": 0, "rows_out": 0,
+                                        "peak_rss_bytes": 0, "sqlite_statements": 0})
+            t["runs"] += 1
+            t["duration_s"] = round(t["duration_s"] + s.duration_s, 4)
+            t["rows_in"] += s.rows_in or 0
+            t["rows_out"] += s.rows_out or 0
+            t["peak_rss_bytes"] = max(t["peak_rss_bytes"], s.peak_rss_bytes)
+            t["sqlite_statements"] += sum(s.statements.values())
+        return out
+
+    def prometheus(self) -> str:
+        lines = []
+
+        def gauge(name, help_text, samples):
+            lines.append(f"# HELP mca_pipeline_{name} {help_text}")
+            lines.append(f"# TYPE mca_pipeline_{name} gauge")
+            for labels, value in samples:
+                lbl = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"mca_pipeline_{name}{{{lbl}}} {value}" if lbl else f"mca_pipeline_{name} {value}")
+
+        totals = self.totals()
+        per_stage = lambda key: [({"stage": k}, v[key]) for k, v in totals.items()]  # noqa: E731
+        gauge("last_run_timestamp_seconds", "Start of the last pipeline run (unix time).",
+              [({}, int(self.started.timestamp()))])
+        gauge("last_run_success", "1 if the last pipeline run completed.", [({}, int(self.status == "ok"))])
+        gauge("last_run_duration_seconds", "Wall time of the last pipeline run.", [({}, round(self.duration_s, 4))])
+        gauge("last_run_peak_rss_bytes", "Peak resident memory during the last run.", [({}, self.peak_rss_bytes)])
+        gauge("stage_duration_seconds", "Wall time per stage in the last run.", per_stage("duration_s"))
+        gauge("stage_rows_in", "Rows into each stage in the last run.", per_stage("rows_in"))
+        gauge("stage_rows_out", "Rows out of each stage in the last run.", per_stage("rows_out"))
+        gauge("stage_peak_rss_bytes", "Peak resident memory per stage in the last run.", per_stage("peak_rss_bytes"))
+        kinds: Counter = Counter()
+        for s in self.stages:
+            for kind, n in s.statements.items():
+                kinds[(s.name, kind)] += n
+        gauge("stage_sqlite_statements", "SQLite statements executed per stage in the last run.",
+              [({"stage": st, "kind": kind}, n) for (st, kind), n in sorted(kinds.items())])
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        report = METRICS_DIR / f"run_{self.started.strftime('%Y%m%dT%H%M%SZ')}.json"
+        _write_atomic(report, json.dumps(self.report(), indent=2))
+        METRICS_TEXTFILE.parent.mkdir(parents=True, exist_ok=True)
+        # node-exporter may read mid-write; rename keeps the textfile whole
+        _write_atomic(METRICS_TEXTFILE, self.prometheus())
+        return report
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def trace_connection(conn):
+    """Count statements run on conn toward the open stages (no-op outside a run)."""
+    if _current is not None:
+        conn.set_trace_callback(_current._trace)
+    return conn
+
+@contextmanager
+def pipeline_run(mode: str, dates):
+    """Collect stage metrics for one run and write the report when it ends, even on failure."""
+    global _current
+    run = RunMetrics(mode, dates)
+    _current = run
+    t0 = time.perf_counter()
+    try:
+        with PeakRSS(interval=0.05) as mem:
+            yield run
+        run.status = "ok"
+    except BaseException:
+        run.status = "failed"
+        raise
+    finally:
+        run.duration_s = time.perf_counter() - t0
+        run.peak_rss_bytes = mem.peak
+        _current = None
+        path = run.write()
+        print(f"[+] Run metrics -> {path}")
+
+@contextmanager
+def _profiled(rec: StageRecord, run: RunMetrics):
+    modes = {"cprofile", "tracemalloc"} if PROFILE_MODE == "both" else {PROFILE_MODE}
+    # A stage can run more than once per day (e.g. csv_export), so number the profiles within the run
+    run.profile_seq += 1
+    stem = METRICS_DIR / f"profile_{rec.name}_{rec.date or 'run'}_{run.profile_seq:03d}"
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    prof = cProfile.Profile() if "cprofile" in modes else None
+    tracing = "tracemalloc" in modes and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    if prof:
+        prof.enable()
+    try:
+        yield
+    finally:
+        if prof:
+            prof.disable()
+            prof.dump_stats(f"{stem}.pstats")
+            run.profiles.append(f"{stem}.pstats")
+        if tracing:
+            snap = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, cProfile.__file__), tracemalloc.Filter(False, tracemalloc.__file__)])
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            top = snap.statistics("lineno")[:TRACEMALLOC_TOP]
+            _write_atomic(Path(f"{stem}.tracemalloc.txt"),
+                          f"traced current={current} peak={peak} bytes\n" + "\n".join(str(s) for s in top) + "\n")
+            run.profiles.append(f"{stem}.tracemalloc.txt")
+
+@contextmanager
+def stage(name: str, date: Optional[str] = None, rows_in: Optional[int] = None):
+    """Time one stage of the active run; yields a StageRecord for row counts."""
+    rec = StageRecord(name, date, rows_in)
+    run = _current
+    if run is None:
+        yield rec
+        return
+    run._open.append(rec)
+    profile = _profiled(rec, run) if name == PROFILE_STAGE else None
+    mem = PeakRSS()
+    t0 = time.perf_counter()
+    try:
+        with mem:
+            if profile:
+                with profile:
+                    yield rec
+            else:
+                yield rec
+    finally:
+        rec.duration_s = time.perf_counter() - t0
+        rec.peak_rss_bytes = mem.peak
+        run._open.remove(rec)
+        run.stages.append(rec)
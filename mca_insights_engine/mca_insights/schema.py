@@ -1,5 +1,14 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from typing import Optional
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:  # Arrow-backed strings need pyarrow; plain object columns otherwise
+    TEXT_DTYPE = object
 
 @dataclass
 class Company:
@@ -14,3 +23,100 @@ class Company:
     Registered_Address: str
     RoC: str
     State: str
+
+# Low-cardinality Company fields, held as categoricals in consolidated frames
+CATEGORICAL_FIELDS = ('Company_Class', 'Company_Status', 'NIC_Code', 'RoC', 'State')
+
+def _ingest_dtype(f):
+    if f.type is float:
+        return "float64"
+    return "category" if f.name in CATEGORICAL_FIELDS else TEXT_DTYPE
+
+# In-memory dtypes of a consolidated snapshot, one per Company field
+INGEST_DTYPES = {f.name: _ingest_dtype(f) for f in fields(Company)}
+
+def as_ingest_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast the Company columns of df to INGEST_DTYPES, in place; returns df.
+
+    Categoricals keep their values as read (e.g. integer NIC codes stay
+    integers); text columns hold missing values as NA instead of NaN/None.
+    """
+    for col, dtype in INGEST_DTYPES.items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        if dtype == "category":
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                df[col] = s.astype("category")
+        elif dtype == "float64":
+            if s.dtype != "float64":
+                df[col] = s.astype("float64")
+        elif s.dtype != dtype:
+            df[col] = s.astype(dtype)
+    return df
+
+def concat_typed(frames) -> pd.DataFrame:
+    """pd.concat for ingest-typed frames that keeps categoricals categorical.
+
+    Plain concat falls back to object when category sets differ (every state
+    has its own State/RoC), so categories are unified first, with values cast
+    to their common dtype as concat would do for the raw columns.
+    """
+    frames = list(frames)
+    for col, dtype in INGEST_DTYPES.items():
+        if dtype != "category" or len(frames) < 2 or not all(col in f.columns for f in frames):
+            continue
+        cats = [f[col].cat.categories for f in frames]
+        # Concatenating the category values gives their common dtype; empty ones don't count
+        values = [pd.Series(c, copy=False) for c in cats if len(c)]
+        common_type = pd.concat(values, ignore_index=True).dtype if values else object
+        cats = [c.astype(common_type) for c in cats]
+        common = cats[0].append(cats[1:]).unique()
+        frames = [f.assign(**{col: f[col].cat.rename_categories(c).cat.set_categories(common)})
+                  for f, c in zip(frames, cats)]
+    return pd.concat(frames, ignore_index=True)
+
+def text_values(s: pd.Series) -> pd.Series:
+    """str(value) per cell as object strings; missing cells read 'nan' whatever the dtype."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # str() once per category, then spread by code (code -1, missing, picks the trailing 'nan')
+        labels = np.append(s.cat.categories.astype(str).to_numpy(dtype=object), "nan")
+        return pd.Series(labels[s.cat.codes.to_numpy()], index=s.index)
+    if isinstance(s.dtype, pd.StringDtype):
+        return pd.Series(s.to_numpy(dtype=object, na_value="nan"), index=s.index)
+    return s.astype(str)
+
+# Fields covered by row_hashes: all of a company's content (CIN is the key)
+HASHED_FIELDS = tuple(f.name for f in fields(Company) if f.name != 'CIN')
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+def _field_hashes(s: pd.Series) -> np.ndarray:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        labels = np.append(s.cat.categories.astype(str).to_numpy(dtype=object), "nan")
+        return hash_array(labels, categorize=False)[s.cat.codes.to_numpy()]
+    if s.dtype == "float64":
+        # Equal floats print alike (0.0 and -0.0 don't, and neither do their bits); NaNs are unified
+        v = s.to_numpy()
+        return hash_array(np.where(np.isnan(v), np.nan, v))
+    return hash_array(text_values(s).to_numpy(), categorize=False)
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Stable 64-bit content hash per row over HASHED_FIELDS, as int64.
+
+    Rows hash alike when every field has the same text_values form, so equal
+    hashes stand for "no change" in change detection; the same field held in
+    a different dtype (e.g. float vs text) may hash differently, which only
+    costs a field-by-field comparison. Absent fields read 'None'.
+    """
+    h = np.zeros(len(df), dtype=np.uint64)
+    for field in HASHED_FIELDS:
+        if field in df.columns:
+            col = _field_hashes(df[field])
+        else:
+            col = hash_array(np.array(["None"], dtype=object), categorize=False)
+        h = (h ^ col) * _HASH_MULTIPLIER
+    return h.view(np.int64)
+
+def frame_hashes(df: pd.DataFrame) -> np.ndarray:
+    """df's Row_Hash column (set at ingest), or row_hashes computed now."""
+    return df['Row_Hash'].to_numpy() if 'Row_Hash' in df.columns else row_hashes(df)
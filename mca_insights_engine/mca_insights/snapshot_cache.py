@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Any, Optional
+import pandas as pd
+from .config import SNAPSHOT_CACHE_DIR, SELECTED_STATES
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # cache is an optimisation; without pyarrow every run parses CSVs
+    pa = None
+    feather = None
+
+CACHE_VERSION = 3
+
+def _cache_paths(snapshot_dir: Path):
+    name = snapshot_dir.name
+    return SNAPSHOT_CACHE_DIR / f"{name}.feather", SNAPSHOT_CACHE_DIR / f"{name}.manifest.json"
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _source_files(snapshot_dir: Path) -> Dict[str, Path]:
+    files = {}
+    for state in SELECTED_STATES:
+        fpath = snapshot_dir / (state.lower().replace(' ', '_') + '.csv')
+        if fpath.exists():
+            files[fpath.name] = fpath
+    return files
+
+def build_manifest(snapshot_dir: Path) -> Dict[str, Any]:
+    sources = {}
+    for name, fpath in _source_files(snapshot_dir).items():
+        st = fpath.stat()
+        sources[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ctime_ns": st.st_ctime_ns,
+                         "sha256": _sha256(fpath)}
+    return {"version": CACHE_VERSION, "states": list(SELECTED_STATES), "sources": sources}
+
+def _manifest_matches(manifest: Dict[str, Any], snapshot_dir: Path) -> bool:
+    """Size/mtime/ctime check first; only hash files whose times moved.
+
+    ctime catches an edit whose mtime was set back (utime can't restore ctime).
+    """
+    if manifest.get("version") != CACHE_VERSION or manifest.get("states") != list(SELECTED_STATES):
+        return False
+    files = _source_files(snapshot_dir)
+    sources = manifest.get("sources", {})
+    if set(files) != set(sources):
+        return False
+    touched = False
+    for name, fpath in files.items():
+        st = fpath.stat()
+        rec = sources[name]
+        if st.st_size != rec["size"]:
+            return False
+        if (st.st_mtime_ns, st.st_ctime_ns) != (rec["mtime_ns"], rec.get("ctime_ns")):
+            if _sha256(fpath) != rec["sha256"]:
+                return False
+            rec["mtime_ns"], rec["ctime_ns"] = st.st_mtime_ns, st.st_ctime_ns
+            touched = True
+    if touched:
+        _write_json(_cache_paths(snapshot_dir)[1], manifest)
+    return True
+
+def _write_json(path: Path, payload: Dict[str, Any]):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+def write_frame(path: Path, df: pd.DataFrame) -> bool:
+    """Atomically write a frame (index included) as uncompressed Feather."""
+    if feather is None:
+        return False
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+    except (pa.ArrowException, TypeError, ValueError):
+        return False
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, path)
+    return True
+
+def _string_types(arrow_type):
+    # Keep Arrow strings Arrow-backed (to_pandas would otherwise build Python str objects)
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+def read_frame(path: Path) -> pd.DataFrame:
+    # Uncompressed Feather is memory-mapped; numeric columns convert without copying
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(types_mapper=_string_types)
+
+def load_cached_snapshot(snapshot_dir: Path) -> Optional[pd.DataFrame]:
+    """Return the cached consolidated frame for a snapshot dir, or None if absent/stale."""
+    if feather is None:
+        return None
+    data_path, manifest_path = _cache_paths(snapshot_dir)
+    if not data_path.exists() or not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not _manifest_matches(manifest, snapshot_dir):
+        return None
+    return read_frame(data_path)
+
+def store_snapshot(snapshot_dir: Path, df: pd.DataFrame, manifest: Dict[str, Any] = None) -> bool:
+    """Write the consolidated frame and its source manifest; False if it can't be cached.
+
+    Pass the manifest taken *before* parsing so a file edited mid-run invalidates the entry.
+    """
+    if feather is None:
+        return False
+    data_path, manifest_path = _cache_paths(snapshot_dir)
+    SNAPSHOT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = manifest or build_manifest(snapshot_dir)
+    if not write_frame(data_path, df):
+        # Mixed-type object columns have no columnar form; keep parsing CSVs
+        return False
+    _write_json(manifest_path, manifest)
+    return True
@@ -0,0 +1,124 @@
+import csv
+import heapq
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Tuple
+from .config import CANONICAL_COLUMNS, SELECTED_STATES, EXTERNAL_SORT_CHUNK_ROWS
+from .change_detector import KEY_FIELDS
+from .utils import normalize_cin, to_float
+
+CAPITAL_FIELDS = ('Authorized_Capital', 'Paidup_Capital')
+
+def _state_files(snapshot_dir: Path) -> List[Tuple[str, Path]]:
+    files = []
+    for state in SELECTED_STATES:
+        fpath = snapshot_dir / (state.lower().replace(' ', '_') + '.csv')
+        if fpath.exists():
+            files.append((state, fpath))
+    return files
+
+def snapshot_size_bytes(snapshot_dir: Path) -> int:
+    return sum(p.stat().st_size for _, p in _state_files(snapshot_dir))
+
+def _normalize_record(rec: Dict[str, str], state: str) -> Dict[str, Any]:
+    # Same cleaning as integrate.load_and_normalize_state_csv, one row at a time
+    row = {}
+    for col in CANONICAL_COLUMNS:
+        v = rec.get(col)
+        row[col] = v if v not in (None, '') else None
+    row['CIN'] = normalize_cin(row['CIN']) or ''
+    for col in CAPITAL_FIELDS:
+        row[col] = to_float(row[col]) if row[col] is not None else float('nan')
+    row['State'] = state
+    return row
+
+def _text(v) -> str:
+    # Field text as detect_changes writes it (schema.text_values): missing cells read 'nan'
+    return 'nan' if v is None else str(v)
+
+def _write_run(buf: List[Tuple[str, int, Dict[str, Any]]], workdir: Path, n: int) -> Path:
+    buf.sort(key=lambda t: (t[0], t[1]))
+    path = workdir / f"run_{n:05d}.csv"
+    with open(path, "w", newline='', encoding="utf-8") as f:
+        w = csv.writer(f)
+        for cin, seq, row in buf:
+            w.writerow([cin, seq] + [row[c] for c in CANONICAL_COLUMNS])
+    return path
+
+def _read_run(path: Path) -> Iterator[Tuple[str, int, Dict[str, Any]]]:
+    with open(path, newline='', encoding="utf-8") as f:
+        for rec in csv.reader(f):
+            row = dict(zip(CANONICAL_COLUMNS, rec[2:]))
+            for col in CANONICAL_COLUMNS:
+                if row[col] == '':
+                    row[col] = None
+            for col in CAPITAL_FIELDS:
+                row[col] = float(row[col]) if row[col] is not None else float('nan')
+            yield rec[0], int(rec[1]), row
+
+def iter_sorted_snapshot(snapshot_dir: Path, chunk_rows: int = None) -> Iterator[Dict[str, Any]]:
+    """Yield the consolidated snapshot one company at a time in CIN order.
+
+    State files are read in chunks of `chunk_rows`, each chunk is sorted and
+    spilled to a temporary run file, and the runs are k-way merged. Duplicate
+    CINs keep the last occurrence (state order, then file order), like
+    consolidate_snapshot_dir.
+    """
+    chunk_rows = chunk_rows or EXTERNAL_SORT_CHUNK_ROWS
+    with tempfile.TemporaryDirectory(prefix="mca_sort_") as tmp:
+        workdir = Path(tmp)
+        runs, buf, seq = [], [], 0
+        for state, fpath in _state_files(snapshot_dir):
+            with open(fpath, newline='', encoding="utf-8") as f:
+                for rec in csv.DictReader(f):
+                    row = _normalize_record(rec, state)
+                    buf.append((row['CIN'], seq, row))
+                    seq += 1
+                    if len(buf) >= chunk_rows:
+                        runs.append(_write_run(buf, workdir, len(runs)))
+                        buf = []
+        if buf:
+            runs.append(_write_run(buf, workdir, len(runs)))
+            buf = []
+
+        merged = heapq.merge(*[_read_run(p) for p in runs], key=lambda t: (t[0], t[1]))
+        pending = None
+        for cin, _, row in merged:
+            if pending is not None and pending['CIN'] != cin:
+                yield pending
+            pending = row
+        if pending is not None:
+            yield pending
+
+def stream_changes(prev_dir: Path, curr_dir: Path, date_str: str, chunk_rows: int = None) -> Iterator[Dict[str, Any]]:
+    """Merge-walk two snapshot directories and yield change records in CIN order.
+
+    Records have the detect_changes columns and value text, but come in CIN
+    order rather than grouped by change type. Memory is bounded by `chunk_rows`
+    during the sort phase and by one row per side during the walk. Field values
+    are compared as read from the CSVs (capital columns parsed to float).
+    """
+    fields = [f for f in KEY_FIELDS if f != 'CIN']
+    prev_it = iter_sorted_snapshot(prev_dir, chunk_rows)
+    curr_it = iter_sorted_snapshot(curr_dir, chunk_rows)
+    p = next(prev_it, None)
+    c = next(curr_it, None)
+
+    def event(cin, change_type, field='', old='', new=''):
+        return {'CIN': cin, 'Change_Type': change_type, 'Field_Changed': field,
+                'Old_Value': old, 'New_Value': new, 'Date': date_str}
+
+    while p is not None or c is not None:
+        if c is None or (p is not None and p['CIN'] < c['CIN']):
+            yield event(p['CIN'], 'Deregistered')
+            p = next(prev_it, None)
+        elif p is None or c['CIN'] < p['CIN']:
+            yield event(c['CIN'], 'New Incorporation')
+            c = next(curr_it, None)
+        else:
+            for field in fields:
+                pv, cv = _text(p[field]), _text(c[field])
+                if pv != cv:
+                    yield event(c['CIN'], 'Field Update', field, pv, cv)
+            p = next(prev_it, None)
+            c = next(curr_it, None)
@@ -1,5 +1,7 @@
 import re
 from datetime import datetime
+import pandas as pd
+from .config import NIC_SECTOR_MAP
 
 def normalize_cin(cin: str) -> str:
     return re.sub(r"\s+", "", cin.upper()) if isinstance(cin, str) else cin
@@ -14,6 +16,31 @@ def to_float(x):
     except Exception:
         return 0.0
 
+def _is_numeric(s: pd.Series) -> bool:
+    # Categorical and string columns take the per-cell text path, like object ones
+    return pd.api.types.is_numeric_dtype(s.dtype) and not isinstance(s.dtype, pd.CategoricalDtype)
+
+def normalize_cin_series(s: pd.Series) -> pd.Series:
+    """Vectorized normalize_cin: non-string cells pass through unchanged."""
+    if _is_numeric(s):
+        return s
+    s = s.astype(object)
+    out = s.str.upper().str.replace(r"\s+", "", regex=True)
+    return out.where(out.notna(), s)
+
+def to_float_series(s: pd.Series) -> pd.Series:
+    """Vectorized to_float over a column, with identical results per cell."""
+    if _is_numeric(s):
+        return s.astype(float)
+    s = s.astype(object)
+    cleaned = s.astype(str).str.replace(',', '', regex=False).str.replace('₹', '', regex=False).str.strip()
+    out = pd.to_numeric(cleaned, errors='coerce').astype(float)
+    # Blanks, None, NaN and junk fall back to the scalar rules
+    missing = out.isna()
+    if missing.any():
+        out[missing] = s[missing].map(to_float)
+    return out
+
 def parse_date(s: str):
     for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%Y/%m/%d"):
         try:
@@ -21,3 +48,34 @@ def parse_date(s: str):
         except Exception:
             continue
     return None
+
+def incorporation_year(s):
+    """Year from a Date_of_Incorporation value (ISO prefix, else any parse_date format)."""
+    if not isinstance(s, str):
+        return None
+    if s[:4].isdigit():
+        return int(s[:4])
+    d = parse_date(s)
+    return d.year if d else None
+
+def incorporation_year_series(s: pd.Series) -> pd.Series:
+    """Vectorized incorporation_year: non-string cells give <NA>."""
+    if _is_numeric(s):
+        return pd.Series(pd.NA, index=s.index, dtype='Int64')
+    s = s.astype(object)
+    # .str yields NaN for non-string cells, so only strings are parsed, as in the scalar version
+    head = s.str[:4]
+    is_text = head.notna()
+    iso = head.str.isdigit().eq(True)
+    years = pd.to_numeric(head.where(iso), errors='coerce').astype('Int64')
+    other = is_text & ~iso
+    if other.any():
+        years[other] = s[other].map(incorporation_year).astype('Int64')
+    return years
+
+def nic_sector(nic):
+    """Sector for a NIC code via its 2-digit division (see NIC_SECTOR_MAP)."""
+    return NIC_SECTOR_MAP.get(str(nic)[:2])
+
+def nic_sector_series(s: pd.Series) -> pd.Series:
+    return s.astype(str).str[:2].map(NIC_SECTOR_MAP)
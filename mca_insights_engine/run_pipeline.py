@@ -1,64 +1,334 @@
 from pathlib import Path
+import argparse
+import csv
+from contextlib import nullcontext
+from itertools import islice
 import pandas as pd
 from datetime import date
 from dotenv import load_dotenv
-from mca_insights.config import SNAPSHOTS_DIR, OUTPUTS_DIR, CHANGELOGS_DIR, MASTER_CSV
+from mca_insights.config import (SNAPSHOTS_DIR, OUTPUTS_DIR, CHANGELOGS_DIR, MASTER_CSV, STREAMING_DIFF_THRESHOLD_BYTES,
+                                 WRITE_CHANGELOG_CSV, CHANGELOG_RETENTION_DAYS,
+                                 BACKFILL_WORKERS, BACKFILL_COMMIT_DAYS)
 from mca_insights.integrate import consolidate_snapshot_dir
-from mca_insights.change_detector import detect_changes
-from mca_insights.database import init_db, upsert_companies, log_changes, export_master_csv
+from mca_insights.change_detector import detect_changes, detect_changes_against_db, rows_to_write, CHANGE_COLUMNS
+from mca_insights.stream_diff import snapshot_size_bytes, iter_sorted_snapshot, stream_changes
+from mca_insights.database import (init_db, upsert_companies, changed_company_rows, log_changes, replace_changes_for_date,
+                                   apply_daily_changes, seed_companies, reset_history_for_date, record_history,
+                                   export_master_csv, bump_generation, read_changes_since, hashes_date, set_hashes_date,
+                                   get_conn)
+from mca_insights.changelog_archive import archive_changes
+from mca_insights.backfill import cache_available, consolidate_all, iter_diffs
+from mca_insights.checkpoint import load_checkpoint, save_checkpoint, checkpoint_date
 from mca_insights.enrichers import enrich_sample
 from mca_insights.ai_summary import generate_daily_summary
+from mca_insights.metrics import pipeline_run, stage
+
+STREAM_BATCH_ROWS = 50_000
+
+def _batches(it, size=STREAM_BATCH_ROWS):
+    it = iter(it)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def _stream_day(prev_dir, snap_dir, d):
+    """Out-of-core variant of one pipeline day (seeds when prev_dir is None)."""
+    with stage("db_write", d) as st:
+        reset_history_for_date(d)
+        # With company_hashes at the previous snapshot only new and changed companies are
+        # written, as in the in-memory path; otherwise every row is
+        delta = prev_dir is not None and hashes_date() == prev_dir.name
+        # company_hashes is rewritten batch by batch; it matches no snapshot until the day is done
+        set_hashes_date(None, clear=prev_dir is None)
+        st.rows_in = st.rows_out = 0
+        # Companies first, so logged changes roll up under each company's current state/sector
+        for batch in _batches(iter_sorted_snapshot(snap_dir)):
+            st.rows_in += len(batch)
+            hashes = None
+            if delta:
+                batch, hashes = changed_company_rows(batch)
+                if not batch:
+                    continue
+            upsert_companies(batch, hashes)
+            st.rows_out += len(batch)
+            if prev_dir is None or delta:
+                # Every written company gets a version, as in apply_daily_changes (address-only edits too)
+                record_history(d, [r['CIN'] for r in batch])
+    if prev_dir is not None:
+        change_csv = _change_csv_path(d)
+        # Sort-merge, CSV and change-log writes are interleaved per batch; timed as one diff stage
+        with stage("diff", d) as st:
+            st.rows_out = 0
+            replace_changes_for_date(d, [])
+            with (open(change_csv, "w", newline='', encoding="utf-8") if change_csv else nullcontext()) as f:
+                # Same CSV dialect as DataFrame.to_csv; rows stay in CIN order (see stream_changes)
+                w = csv.DictWriter(f, fieldnames=CHANGE_COLUMNS, lineterminator="\n") if f else None
+                if w:
+                    w.writeheader()
+                for batch in _batches(stream_changes(prev_dir, snap_dir, d)):
+                    if w:
+                        w.writerows(batch)
+                    log_changes(batch)
+                    # Delta days versioned their written companies above; here deregistered ones are
+                    # closed. Full rewrites can only follow the tracked-field changes
+                    opened = [] if delta else [r['CIN'] for r in batch if r['Change_Type'] != 'Deregistered']
+                    record_history(d, opened, [r['CIN'] for r in batch if r['Change_Type'] == 'Deregistered'])
+                    st.rows_out += len(batch)
+    set_hashes_date(d)
+    bump_generation()
+
+def _change_csv_path(d):
+    """Where the day's change CSV goes, or None when WRITE_CHANGELOG_CSV is off."""
+    if not WRITE_CHANGELOG_CSV:
+        return None
+    CHANGELOGS_DIR.mkdir(parents=True, exist_ok=True)
+    return CHANGELOGS_DIR / f"changes_{d}.csv"
+
+def _consolidate(snap_dir, d):
+    with stage("consolidate", d) as st:
+        df = consolidate_snapshot_dir(snap_dir)
+        st.rows_out = len(df)
+    return df
+
+def _seed(curr_df, d):
+    with stage("db_write", d, rows_in=len(curr_df)) as st:
+        seed_companies(curr_df, d)
+        st.rows_out = len(curr_df)
+    bump_generation()
+
+def _export_master(d=None):
+    with stage("csv_export", d) as st:
+        st.rows_in = st.rows_out = export_master_csv(MASTER_CSV)
 
 def run_for_dates(dates):
     load_dotenv()
     init_db()
+    with pipeline_run("full", dates):
+        _run_for_dates(dates)
+
+def _run_for_dates(dates):
     prev_df = None
-    enriched_path = None
-    last_change_csv = None
+    prev_dir = None
+    last_change_date = None
 
     for d in dates:
         snap_dir = SNAPSHOTS_DIR / d
+        if snapshot_size_bytes(snap_dir) > STREAMING_DIFF_THRESHOLD_BYTES:
+            print(f"[+] Streaming snapshot {d} (external sort-merge) ...")
+            _stream_day(prev_dir, snap_dir, d)
+            _export_master(d)
+            if prev_dir is not None:
+                last_change_date = d
+            prev_df = None
+            prev_dir = snap_dir
+            continue
+
         print(f"[+] Consolidating snapshot {d} ...")
-        curr_df = consolidate_snapshot_dir(snap_dir)
+        curr_df = _consolidate(snap_dir, d)
 
-        if prev_df is None:
+        if prev_dir is None:
             # First day: seed master without changes
-            upsert_companies(curr_df.to_dict(orient='records'))
-            export_master_csv(MASTER_CSV)
-            prev_df = curr_df.copy()
+            _seed(curr_df, d)
+            _export_master(d)
+            prev_df = curr_df
+            prev_dir = snap_dir
             print(f"Seeded master with {len(curr_df)} companies for {d}.")
             continue
 
+        if prev_df is None and hashes_date() != dates[dates.index(d)-1]:
+            # Previous day was streamed but didn't finish updating company_hashes; load it
+            # for the in-memory diff (otherwise the day is diffed against the DB)
+            prev_df = _consolidate(prev_dir, dates[dates.index(d)-1])
+
         print(f"[+] Detecting changes {dates[dates.index(d)-1]} -> {d} ...")
-        ch = detect_changes(prev_df, curr_df, d)
-        CHANGELOGS_DIR.mkdir(parents=True, exist_ok=True)
-        change_csv = CHANGELOGS_DIR / f"changes_{d}.csv"
-        ch.to_csv(change_csv, index=False)
-        last_change_csv = change_csv
-
-        # Apply updates to DB (use latest data)
-        upsert_companies(curr_df.to_dict(orient='records'))
-        log_changes(ch.to_dict(orient='records'))
-        export_master_csv(MASTER_CSV)
-        prev_df = curr_df.copy()
-
-    if last_change_csv is not None:
-        # Enrich changed CINs (from the latest change file)
-        latest_changes = pd.read_csv(last_change_csv)
+        _commit_day(prev_df, curr_df, d)
+        last_change_date = d
+        _export_master(d)
+        prev_df = curr_df
+        prev_dir = snap_dir
+
+    # A streamed last day leaves no frame; the checkpoint then records its date only
+    save_checkpoint(dates[-1], prev_df)
+    _archive_old_changes()
+    _enrich_and_summarize(last_change_date, dates[-1])
+
+def _commit_day(prev_df, curr_df, d):
+    """Diff one day, write its change CSV and apply it to the DB; safe to repeat for a date.
+
+    With prev_df None the day is diffed against the DB's company_hashes, which
+    must match the previous day (see database.hashes_date).
+    """
+    rows = None
+    with stage("diff", d, rows_in=len(curr_df) + (len(prev_df) if prev_df is not None else 0)) as st:
+        if prev_df is None:
+            ch, rows = detect_changes_against_db(curr_df, d)
+        else:
+            ch = detect_changes(prev_df, curr_df, d)
+        st.rows_out = len(ch)
+    change_csv = _change_csv_path(d)
+    if change_csv:
+        with stage("csv_export", d, rows_in=len(ch)) as st:
+            ch.to_csv(change_csv, index=False)
+            st.rows_out = len(ch)
+
+    # Apply only the day's inserted/updated companies plus its change log, in one transaction
+    with stage("db_write", d) as st:
+        if rows is None:
+            rows = rows_to_write(prev_df, curr_df, ch)
+        st.rows_in = len(rows) + len(ch)
+        apply_daily_changes(rows, ch, d)
+        st.rows_out = st.rows_in
+    bump_generation()
+
+def run_backfill(dates=None, workers=BACKFILL_WORKERS):
+    """Rebuild history for many dates: consolidate and diff pairs in a process pool,
+    commit days in date order from this process, then export and summarize once."""
+    load_dotenv()
+    dates = sorted(dates or (p.name for p in SNAPSHOTS_DIR.iterdir() if p.is_dir()))
+    if not dates:
+        print(f"[!] No snapshot dates to backfill in {SNAPSHOTS_DIR}.")
+        return
+    init_db()
+    if any(snapshot_size_bytes(SNAPSHOTS_DIR / d) > STREAMING_DIFF_THRESHOLD_BYTES for d in dates):
+        print("[!] Snapshots above STREAMING_DIFF_THRESHOLD_BYTES need the streaming diff; running day by day.")
+        return run_for_dates(dates)
+    if workers > 1 and not cache_available():
+        # Pool workers would each parse both dates of their pair from CSV
+        print("[!] Snapshot cache is off or pyarrow is missing; diffing in one process so each snapshot is parsed once.")
+        workers = 1
+
+    with pipeline_run("backfill", dates):
+        if workers > 1 and len(dates) > 1:
+            # Fill the snapshot cache in parallel; each date is then read back, not re-parsed, by both of its diffs
+            print(f"[+] Consolidating {len(dates)} snapshots with {workers} worker(s) ...")
+            with stage("consolidate", rows_in=len(dates)) as st:
+                st.rows_out = consolidate_all(dates, workers)
+        first_df = _consolidate(SNAPSHOTS_DIR / dates[0], dates[0])
+        _seed(first_df, dates[0])
+        print(f"Seeded master with {len(first_df)} companies for {dates[0]}.")
+
+        print(f"[+] Detecting changes for {len(dates) - 1} day(s) ...")
+        diffs = iter_diffs(dates, workers, _change_csv_path, first_df if workers <= 1 else None)
+        del first_df
+        with get_conn() as conn:
+            for i, d in enumerate(dates[1:], 1):
+                # Time spent waiting on the pool; the diffs themselves run in the workers
+                with stage("diff", d) as st:
+                    _, ch, rows = next(diffs)
+                    st.rows_out = len(ch)
+                with stage("db_write", d, rows_in=len(rows) + len(ch)) as st:
+                    apply_daily_changes(rows, ch, d, conn=conn)
+                    if i % BACKFILL_COMMIT_DAYS == 0 or i == len(dates) - 1:
+                        conn.commit()
+                    st.rows_out = st.rows_in
+        bump_generation()
+        _export_master(dates[-1])
+        # company_hashes now matches dates[-1]; the next incremental run diffs against it
+        save_checkpoint(dates[-1])
+        _archive_old_changes()
+        _enrich_and_summarize(dates[-1] if len(dates) > 1 else None, dates[-1])
+
+def run_incremental(dates=None):
+    """Process only snapshot dates after the stored checkpoint, one day of data at a time."""
+    load_dotenv()
+    init_db()
+    if dates is None:
+        dates = sorted(p.name for p in SNAPSHOTS_DIR.iterdir() if p.is_dir())
+    last_date = checkpoint_date()
+    pending = [d for d in sorted(dates) if last_date is None or d > last_date]
+    if not pending:
+        print(f"[✓] Up to date (checkpoint {last_date}).")
+        return
+
+    with pipeline_run("incremental", pending):
+        last_change_date = None
+        for d in pending:
+            snap_dir = SNAPSHOTS_DIR / d
+            if snapshot_size_bytes(snap_dir) > STREAMING_DIFF_THRESHOLD_BYTES:
+                prev_dir = SNAPSHOTS_DIR / last_date if last_date else None
+                if prev_dir is not None and not prev_dir.is_dir():
+                    raise FileNotFoundError(f"Streaming {d} needs the previous snapshot directory {prev_dir}")
+                print(f"[+] Streaming snapshot {d} (external sort-merge) ...")
+                _stream_day(prev_dir, snap_dir, d)
+                if prev_dir is not None:
+                    last_change_date = d
+                save_checkpoint(d)
+                last_date = d
+                continue
+
+            print(f"[+] Consolidating snapshot {d} ...")
+            curr_df = _consolidate(snap_dir, d)
+            if last_date is None:
+                _seed(curr_df, d)
+                print(f"Seeded master with {len(curr_df)} companies for {d}.")
+            else:
+                print(f"[+] Detecting changes {last_date} -> {d} ...")
+                # The previous day's frame is only loaded when company_hashes doesn't match it
+                prev_df = None
+                if hashes_date() != last_date:
+                    _, prev_df = load_checkpoint()
+                    if prev_df is None:
+                        # Checkpointed without a frame (streamed) and the hashes moved on since
+                        prev_df = _consolidate(SNAPSHOTS_DIR / last_date, last_date)
+                _commit_day(prev_df, curr_df, d)
+                last_change_date = d
+            save_checkpoint(d, curr_df)
+            last_date = d
+
+        _export_master(last_date)
+        _archive_old_changes()
+        _enrich_and_summarize(last_change_date, last_date)
+
+def _archive_old_changes():
+    if CHANGELOG_RETENTION_DAYS > 0:
+        archived = archive_changes(CHANGELOG_RETENTION_DAYS)
+        if archived:
+            print(f"[+] Archived change_log for {len(archived)} day(s) older than {CHANGELOG_RETENTION_DAYS} days")
+
+def _day_changes(d):
+    """The day's change rows: from its CSV when one is written, else from the DB."""
+    change_csv = _change_csv_path(d)
+    if change_csv is not None and change_csv.exists():
+        return pd.read_csv(change_csv)
+    changes = read_changes_since(d)
+    return changes[changes['Date'] == d].drop(columns='id')
+
+def _enrich_and_summarize(last_change_date, summary_date):
+    if last_change_date is not None:
+        # Enrich changed CINs (from the latest change day)
+        latest_changes = _day_changes(last_change_date)
         changed_cins = latest_changes['CIN'].unique().tolist()
         master_latest = pd.read_csv(MASTER_CSV)
         print(f"[+] Enriching {min(100, len(changed_cins))} changed CINs ...")
-        enriched_path = enrich_sample(changed_cins, master_latest, limit=100)
+        with stage("enrichment", summary_date, rows_in=min(100, len(changed_cins))) as st:
+            enriched_path = enrich_sample(changed_cins, master_latest, limit=100, changes_df=latest_changes)
+            st.rows_out = st.rows_in
         print(f"[+] Enriched output -> {enriched_path}")
 
         # AI daily summary
-        print(f"[+] Generating daily summary for {dates[-1]} ...")
-        generate_daily_summary(last_change_csv, dates[-1])
+        print(f"[+] Generating daily summary for {summary_date} ...")
+        with stage("summary", summary_date, rows_in=len(latest_changes)):
+            generate_daily_summary(summary_date)
 
     print("[✓] Pipeline complete.")
 
 if __name__ == "__main__":
-    # Expect three dates (YYYY-MM-DD) present under data/snapshots/
-    # Defaults to the demo dates we ship with the project.
-    demo_dates = ["2025-10-17", "2025-10-18", "2025-10-19"]
-    run_for_dates(demo_dates)
+    parser = argparse.ArgumentParser(description="Run the MCA insights pipeline.")
+    parser.add_argument("dates", nargs="*", help="Snapshot dates (YYYY-MM-DD) under data/snapshots/")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process dates after the stored checkpoint")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Rebuild history for the given dates (default: all) with parallel diffs")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Processes used by --backfill")
+    args = parser.parse_args()
+    if args.backfill:
+        run_backfill(args.dates or None, args.workers)
+    elif args.incremental:
+        run_incremental(args.dates or None)
+    else:
+        # Expect three dates (YYYY-MM-DD) present under data/snapshots/
+        # Defaults to the demo dates we ship with the project.
+        demo_dates = ["2025-10-17", "2025-10-18", "2025-10-19"]
+        run_for_dates(args.dates or demo_dates)
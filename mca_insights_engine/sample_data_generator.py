@@ -1,5 +1,10 @@
+import argparse
+import os
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from datetime import date, timedelta
 from mca_insights.config import SNAPSHOTS_DIR, SELECTED_STATES, CANONICAL_COLUMNS
@@ -77,13 +82,19 @@ def mutate_snapshot(prev_day: str, new_day: str, add_ratio: float = 0.15, upd_ra
         n_upd = int(len(df2)*upd_ratio)
         n_upd = max(1, n_upd)
         to_upd = set(random.sample(list(df2['CIN']), k=n_upd))
-        for idx in df2.index:
-            if df2.loc[idx, 'CIN'] in to_upd:
+        # Draw in row order (same random sequence as before), then assign column-wise
+        status_idx, status_val, cap_idx, cap_val = [], [], [], []
+        for idx, cin, cap in zip(df2.index, df2['CIN'], df2['Authorized_Capital']):
+            if cin in to_upd:
                 # Flip status or tweak capital
                 if random.random() < 0.5:
-                    df2.loc[idx, 'Company_Status'] = random.choice(["Active", "Strike Off", "Amalgamated", "Dormant"])
+                    status_idx.append(idx)
+                    status_val.append(random.choice(["Active", "Strike Off", "Amalgamated", "Dormant"]))
                 else:
-                    df2.loc[idx, 'Authorized_Capital'] = float(df2.loc[idx, 'Authorized_Capital'] * random.choice([0.8, 1.2, 1.5]))
+                    cap_idx.append(idx)
+                    cap_val.append(float(cap * random.choice([0.8, 1.2, 1.5])))
+        df2.loc[status_idx, 'Company_Status'] = status_val
+        df2.loc[cap_idx, 'Authorized_Capital'] = cap_val
 
         # Add some new companies
         try:
@@ -98,9 +109,136 @@ def mutate_snapshot(prev_day: str, new_day: str, add_ratio: float = 0.15, upd_ra
         out = pd.concat([df2, pd.DataFrame(adds)], ignore_index=True)
         out.to_csv(n / (state.lower().replace(' ', '_') + '.csv'), index=False)
 
+# --- Fast mode: vectorized, one process per state, reproducible from a single seed ---
+
+STATE_CODES = {"Maharashtra": "MH", "Gujarat": "GJ", "Delhi": "DL", "Tamil Nadu": "TN", "Karnataka": "KA"}
+NAME_WORDS = np.array(['Tech', 'Agro', 'Foods', 'Retail', 'Fin', 'Info', 'Consult'])
+CAPITALS = np.array([1e5, 2e5, 5e5, 1e6, 2e6, 5e6, 1e7])
+STATUS_WEIGHTS = np.array([5, 1, 1, 1]) / 8  # Active x5, as in generate_company
+
+def _state_rng(seed: int, state_idx: int):
+    # Independent stream per state, so output doesn't depend on the worker count
+    return np.random.default_rng(np.random.SeedSequence([seed, state_idx]))
+
+# Zero-padded digit strings by lookup: far cheaper than formatting millions of ints
+_PAD3 = np.array([f"{i:03d}" for i in range(1000)], dtype=object)
+_NUM = np.array([str(i) for i in range(10000)], dtype=object)
+
+def generate_companies_fast(rng, seqs: np.ndarray, state: str) -> pd.DataFrame:
+    """Companies for `seqs` (unique per state, < 10**8) as a frame in CANONICAL_COLUMNS order.
+
+    CINs follow the 21-character registry layout (listing, 5-digit NIC, state,
+    year, class, 6-digit number). The number holds seq % 10**6 and the last NIC
+    digits carry seq // 10**6, so CINs stay unique per state past a million.
+    """
+    n = len(seqs)
+    years = rng.integers(2005, 2026, n)
+    # Day 1-28 of a random month, as in generate_company
+    inc = ((years - 1970).astype('datetime64[Y]').astype('datetime64[M]') + rng.integers(0, 12, n)).astype('datetime64[D]')
+    inc = (inc + rng.integers(0, 28, n)).astype(str).astype(object)
+    auth = rng.choice(CAPITALS, n)
+    nic = rng.choice(np.array(NIC_CODES, dtype=object), n)
+    cls_idx = rng.integers(0, len(CLASSES), n)
+    cls_code = np.where(np.array(CLASSES)[cls_idx] == "Public", "PLC", "PTC").astype(object)
+    low = seqs % 10**6
+    seq_pad = _PAD3[low // 1000] + _PAD3[low % 1000]
+    nic_tail = _PAD3[(seqs // 10**6) * 10 + rng.integers(0, 10, n)]
+    cin = ("U" + nic + nic_tail + STATE_CODES.get(state, state[:2].upper())
+           + _NUM[years] + cls_code + seq_pad)
+    return pd.DataFrame({
+        "CIN": cin,
+        "Company_Name": state[:3].upper() + "-" + rng.choice(NAME_WORDS.astype(object), n) + "-"
+                        + seqs.astype(str).astype(object) + " Pvt Ltd",
+        "Company_Class": np.array(CLASSES, dtype=object)[cls_idx],
+        "Date_of_Incorporation": inc,
+        "Authorized_Capital": auth,
+        "Paidup_Capital": auth * rng.choice(np.array([0.5, 0.8, 1.0]), n),
+        "Company_Status": rng.choice(np.array(STATUSES, dtype=object), n, p=STATUS_WEIGHTS),
+        "NIC_Code": nic,
+        "Registered_Address": _NUM[rng.integers(1, 201, n)] + f", {state}",
+        "RoC": ROCS[state],
+        "State": state,
+    }, columns=CANONICAL_COLUMNS)
+
+def mutate_companies_fast(rng, df: pd.DataFrame, next_seq: int, state: str,
+                          add_ratio: float, upd_ratio: float, del_ratio: float):
+    """One day of churn, like mutate_snapshot: drop, update status/capital, append new companies."""
+    n = len(df)
+    keep = np.ones(n, dtype=bool)
+    keep[rng.choice(n, size=max(1, int(n * del_ratio)), replace=False)] = False
+    out = df[keep].reset_index(drop=True)
+
+    upd = rng.choice(len(out), size=min(len(out), max(1, int(len(out) * upd_ratio))), replace=False)
+    flip = rng.random(len(upd)) < 0.5
+    status = out['Company_Status'].to_numpy(copy=True)
+    status[upd[flip]] = rng.choice(np.array(STATUSES, dtype=object), int(flip.sum()))
+    cap = out['Authorized_Capital'].to_numpy(copy=True)
+    cap[upd[~flip]] *= rng.choice(np.array([0.8, 1.2, 1.5]), int((~flip).sum()))
+    out['Company_Status'] = status
+    out['Authorized_Capital'] = cap
+
+    n_add = max(1, int(n * add_ratio))
+    adds = generate_companies_fast(rng, np.arange(next_seq, next_seq + n_add), state)
+    return pd.concat([out, adds], ignore_index=True), next_seq + n_add
+
+def _write_state_days(args):
+    (state, state_idx, per_state, days, seed, out_dir, add_ratio, upd_ratio, del_ratio) = args
+    rng = _state_rng(seed, state_idx)
+    fname = state.lower().replace(' ', '_') + '.csv'
+    df = generate_companies_fast(rng, np.arange(1, per_state + 1), state)
+    next_seq = per_state + 1
+    for i, day in enumerate(days):
+        if i:
+            df, next_seq = mutate_companies_fast(rng, df, next_seq, state, add_ratio, upd_ratio, del_ratio)
+        (out_dir / day).mkdir(parents=True, exist_ok=True)
+        df.to_csv(out_dir / day / fname, index=False)
+    return state, len(df)
+
+def write_snapshots_fast(days, companies: int, seed: int = 42, workers: int = None, out_dir: Path = None,
+                         add_ratio: float = 0.05, upd_ratio: float = 0.05, del_ratio: float = 0.02):
+    """Write `companies` (split across SELECTED_STATES) for the first day, then one
+    mutated snapshot per following day. Same arguments give byte-identical files."""
+    out_dir = Path(out_dir or SNAPSHOTS_DIR)
+    per_state = max(1, companies // len(SELECTED_STATES))
+    jobs = [(state, i, per_state, list(days), seed, out_dir, add_ratio, upd_ratio, del_ratio)
+            for i, state in enumerate(SELECTED_STATES)]
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        return dict(map(_write_state_days, jobs))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return dict(ex.map(_write_state_days, jobs))
+
+def _parse_count(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
 if __name__ == "__main__":
-    # Demo: create 3 days of snapshots 2025-10-17, 2025-10-18, 2025-10-19
-    write_snapshot("2025-10-17", base_seq_start=1, per_state=140)
-    mutate_snapshot("2025-10-17", "2025-10-18", add_ratio=0.18, upd_ratio=0.20, del_ratio=0.06)
-    mutate_snapshot("2025-10-18", "2025-10-19", add_ratio=0.18, upd_ratio=0.22, del_ratio=0.06)
-    print("Demo snapshots created.")
+    parser = argparse.ArgumentParser(description="Generate synthetic MCA state snapshots.")
+    parser.add_argument("--fast", action="store_true",
+                        help="vectorized generator for large volumes (default: the small demo data set)")
+    parser.add_argument("--companies", type=_parse_count, default=1_000_000, help="first-day companies, e.g. 500k, 2M")
+    parser.add_argument("--days", type=int, default=3, help="number of daily snapshots")
+    parser.add_argument("--start", default="2025-10-17", help="first snapshot date (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per state, up to CPUs)")
+    parser.add_argument("--out", type=Path, default=None, help=f"snapshot root (default: {SNAPSHOTS_DIR})")
+    parser.add_argument("--add-ratio", type=float, default=0.05)
+    parser.add_argument("--upd-ratio", type=float, default=0.05)
+    parser.add_argument("--del-ratio", type=float, default=0.02)
+    args = parser.parse_args()
+
+    if args.fast:
+        start = date.fromisoformat(args.start)
+        days = [(start + timedelta(days=i)).isoformat() for i in range(args.days)]
+        t0 = time.perf_counter()
+        sizes = write_snapshots_fast(days, args.companies, seed=args.seed, workers=args.workers, out_dir=args.out,
+                                     add_ratio=args.add_ratio, upd_ratio=args.upd_ratio, del_ratio=args.del_ratio)
+        print(f"Wrote {len(days)} days ({days[0]} .. {days[-1]}), {sum(sizes.values()):,} companies on the last day, "
+              f"in {time.perf_counter() - t0:.1f}s.")
+    else:
+        # Demo: create 3 days of snapshots 2025-10-17, 2025-10-18, 2025-10-19
+        write_snapshot("2025-10-17", base_seq_start=1, per_state=140)
+        mutate_snapshot("2025-10-17", "2025-10-18", add_ratio=0.18, upd_ratio=0.20, del_ratio=0.06)
+        mutate_snapshot("2025-10-18", "2025-10-19", add_ratio=0.18, upd_ratio=0.22, del_ratio=0.06)
+        print("Demo snapshots created.")
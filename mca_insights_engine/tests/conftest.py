@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from stub_http import StubServer
+
+# Scratch DB/outputs must be set before mca_insights.config is imported, so tests never
+# touch outputs/master.db; snapshots are still read from the repo's data/ directory
+_TMP = Path(tempfile.mkdtemp(prefix="mca_tests_"))
+os.environ["MCA_OUTPUTS_DIR"] = str(_TMP / "outputs")
+os.environ["MCA_DB_PATH"] = str(_TMP / "outputs" / "master.db")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+@pytest.fixture
+def stub_server():
+    """Factory for running StubServers (see stub_http); all are stopped after the test."""
+    servers = []
+
+    def start(**kwargs):
+        server = StubServer(**kwargs).__enter__()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.__exit__(None, None, None)
+
+@pytest.fixture
+def fresh_db():
+    """An empty scratch DB at the current schema version."""
+    from mca_insights.config import DB_PATH
+    from mca_insights.database import init_db
+    for suffix in ("", "-wal", "-shm"):
+        DB_PATH.with_name(DB_PATH.name + suffix).unlink(missing_ok=True)
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    init_db()
+    return DB_PATH
@@ -0,0 +1,80 @@
+"""A local company-page server for PageFetcher tests and benchmarks/bench_enrichment.py.
+
+GET /company/<CIN> answers with a small page naming the CIN's directors after
+`latency_s`. `script` maps a CIN to the responses for its first attempts, each
+(status, headers) or (status, headers, delay_s); `fail_ratio` answers that share
+of first attempts with 503. Request start times per CIN are kept in `hits`.
+"""
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def page(cin: str) -> str:
+    return (f"<html><head><title>{cin} - Company Profile</title></head><body><table>"
+            f"<tr><td><a>Director A {cin[-3:]}</a></td></tr><tr><td><a>Director B</a></td></tr>"
+            f"</table></body></html>")
+
+class StubServer:
+    def __init__(self, latency_s: float = 0.0, fail_ratio: float = 0.0, script=None, seed: int = 7):
+        self.latency_s = latency_s
+        self.fail_ratio = fail_ratio
+        self.script = {cin: list(responses) for cin, responses in (script or {}).items()}
+        self.hits = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        # Handlers still sleeping past a test's deadline must not hold up shutdown
+        self._server.daemon_threads = True
+        self._server.block_on_close = False
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/company/"
+
+    def _respond(self, cin):
+        """(status, headers, delay_s) for this request to `cin`."""
+        with self._lock:
+            attempts = self.hits.setdefault(cin, [])
+            attempts.append(time.monotonic())
+            scripted = self.script.get(cin)
+            if scripted:
+                status, headers, *delay = scripted.pop(0)
+                return status, headers, delay[0] if delay else self.latency_s
+            if len(attempts) == 1 and self.fail_ratio and self._rng.random() < self.fail_ratio:
+                return 503, {}, self.latency_s
+        return 200, {}, self.latency_s
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so session pooling matters
+
+            def do_GET(self):
+                cin = self.path.rsplit("/", 1)[-1]
+                status, headers, delay = stub._respond(cin)
+                time.sleep(delay)
+                body = (page(cin) if status == 200 else "busy").encode()
+                self.send_response(status)
+                for name, value in {"Content-Type": "text/html", **headers}.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except OSError:
+                    pass  # the client gave up (deadline) before the reply
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,284 @@
+"""Flask API endpoints against a seeded scratch DB."""
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from mca_insights import api
+from mca_insights.database import upsert_companies, log_changes, bump_generation, record_history
+
+COMPANIES = [{'CIN': f"U{i:05d}MH2020PTC{i:06d}", 'Company_Name': f"Tech Company {i}",
+              'State': "Maharashtra" if i % 3 else "Gujarat", 'Company_Status': "Active"} for i in range(12)]
+
+@pytest.fixture
+def client(fresh_db, monkeypatch):
+    """A test client on a freshly seeded DB, with its own read pool and an empty response cache."""
+    upsert_companies(COMPANIES)
+    monkeypatch.setattr(api, "_pool", api._ReadPool(2))
+    monkeypatch.setattr(api, "_cache", api._ResponseCache(16, 60, 0))
+    return api.app.test_client()
+
+@pytest.mark.parametrize("limit,expected", [(-1, 1), (0, 1), (5, 5), (10 ** 6, len(COMPANIES))])
+def test_search_limit_is_clamped(client, monkeypatch, limit, expected):
+    monkeypatch.setattr(api, "API_PAGE_MAX", 8)
+    res = client.get("/search_company", query_string={"name": "tech", "limit": limit})
+    assert len(res.get_json()["results"]) == min(expected, 8)
+
+def cache_stats(client):
+    return client.get("/cache_stats").get_json()
+
+def test_repeated_search_is_a_cache_hit(client):
+    first = client.get("/search_company", query_string={"name": "tech"})
+    second = client.get("/search_company", query_string={"name": "tech"})
+    assert second.get_data() == first.get_data()
+    stats = cache_stats(client)
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+@pytest.mark.parametrize("first,second", [
+    ({"name": "Tech Company 1"}, {"name": "  tech COMPANY 1 "}),
+    ({"cin": COMPANIES[0]['CIN']}, {"cin": f" {COMPANIES[0]['CIN'].lower()}"}),
+])
+def test_equivalent_queries_share_a_cache_key(client, first, second):
+    body = client.get("/search_company", query_string=first).get_json()
+    assert body["results"]
+    assert client.get("/search_company", query_string=second).get_json() == body
+    stats = cache_stats(client)
+    assert (stats["hits"], stats["size"]) == (1, 1)
+
+def test_new_generation_drops_cached_entries(client):
+    client.get("/search_company", query_string={"name": "tech"})
+    generation = cache_stats(client)["generation"]
+    bump_generation()
+    client.get("/search_company", query_string={"name": "tech"})
+    stats = cache_stats(client)
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (0, 2, 1)
+    assert stats["generation"] == generation + 1 and stats["size"] == 1
+
+def test_expired_entries_are_refetched(client, monkeypatch):
+    monkeypatch.setattr(api, "_cache", api._ResponseCache(16, 0.05, 0))
+    client.get("/search_company", query_string={"name": "tech"})
+    time.sleep(0.1)
+    client.get("/search_company", query_string={"name": "tech"})
+    stats = cache_stats(client)
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (0, 2, 1)
+
+def test_least_recently_used_entry_is_evicted(client, monkeypatch):
+    monkeypatch.setattr(api, "_cache", api._ResponseCache(2, 60, 0))
+    for name in ("company 1", "company 2", "company 1", "company 3"):
+        client.get("/search_company", query_string={"name": name})
+    stats = cache_stats(client)
+    assert (stats["evictions"], stats["size"], stats["maxsize"]) == (1, 2, 2)
+    # "company 2" was the least recently used, so it is the one refetched
+    client.get("/search_company", query_string={"name": "company 1"})
+    client.get("/search_company", query_string={"name": "company 2"})
+    stats = cache_stats(client)
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 4, 2)
+
+@pytest.mark.parametrize("filters,limit", [({}, 5), ({}, 4), ({"state": "Gujarat"}, 2), ({"state": "Gujarat"}, 3),
+                                           ({"q": "company 1"}, 1), ({"state": "Delhi"}, 5)])
+def test_companies_keyset_pages(client, filters, limit):
+    expected = sorted(c['CIN'] for c in COMPANIES
+                      if c['State'] == filters.get('state', c['State'])
+                      and filters.get('q', '') in c['Company_Name'].lower())
+    rows, pages, cursor = [], 0, None
+    while True:
+        params = {**filters, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/companies", query_string=params).get_json()
+        pages += 1
+        rows += body["results"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+        assert cursor == body["results"][-1]["CIN"] and len(body["results"]) == limit
+    cins = [r["CIN"] for r in rows]
+    assert cins == expected  # CIN order, no duplicates or gaps
+    # "more" comes from one extra row, so an exact multiple of the limit ends without an empty page
+    assert pages == max(1, -(-len(expected) // limit))
+
+def test_companies_ndjson_streams_after_cursor(client):
+    cins = sorted(c['CIN'] for c in COMPANIES)
+    res = client.get("/companies", query_string={"format": "ndjson", "cursor": cins[3]})
+    assert res.mimetype == api.NDJSON_MIMETYPE
+    assert [json.loads(line)["CIN"] for line in res.get_data(as_text=True).splitlines()] == cins[4:]
+
+def batch(client, cins, **extra):
+    return client.post("/companies/batch", json={"cins": cins, **extra})
+
+@pytest.fixture
+def batch_client(client):
+    cins = [c['CIN'] for c in COMPANIES]
+    log_changes(feed_changes(cins[:2], "2025-10-18", "New Incorporation") + feed_changes(cins[1:3], "2025-10-19"))
+    record_history("2025-10-17", cins)
+    upsert_companies([{**COMPANIES[1], 'Company_Status': "Strike Off"}])
+    record_history("2025-10-19", cins[1:2])
+    return client
+
+def test_batch_results_in_request_order(batch_client):
+    cins = [COMPANIES[5]['CIN'], "U99999MH2020PTC999999", COMPANIES[1]['CIN'].lower(), COMPANIES[0]['CIN']]
+    results = batch(batch_client, cins).get_json()["results"]
+    assert [r["CIN"] for r in results] == [c.upper() for c in cins]
+    assert results[1]["company"] is None and results[1]["change_history"] == []
+    assert results[0]["company"]["Company_Name"] == COMPANIES[5]['Company_Name']
+    # History is grouped per CIN, oldest first
+    history = {r["CIN"]: [(c["Date"], c["Change_Type"]) for c in r["change_history"]] for r in results}
+    assert history[COMPANIES[1]['CIN']] == [("2025-10-18", "New Incorporation"), ("2025-10-19", "Field Update")]
+    assert history[COMPANIES[0]['CIN']] == [("2025-10-18", "New Incorporation")]
+    assert history[COMPANIES[5]['CIN']] == []
+
+def test_batch_duplicates_collapse(batch_client):
+    cin = COMPANIES[0]['CIN']
+    assert [r["CIN"] for r in batch(batch_client, [cin, f" {cin.lower()} ", cin]).get_json()["results"]] == [cin]
+
+def test_batch_as_of(batch_client):
+    cin = COMPANIES[1]['CIN']
+    before = batch(batch_client, [cin], as_of="2025-10-18").get_json()["results"][0]
+    assert before["company"]["Company_Status"] == "Active"
+    assert [c["Date"] for c in before["change_history"]] == ["2025-10-18"]
+    after = batch(batch_client, [cin], as_of="2025-10-19").get_json()["results"][0]
+    assert after["company"]["Company_Status"] == "Strike Off"
+    assert batch(batch_client, [cin], as_of="2025-10-16").get_json()["results"][0]["company"] is None
+    assert batch(batch_client, [cin], as_of="soon").status_code == 400
+
+def test_batch_ndjson(batch_client):
+    cins = [COMPANIES[2]['CIN'], COMPANIES[1]['CIN']]
+    res = batch_client.post("/companies/batch?format=ndjson", json={"cins": cins})
+    assert res.mimetype == api.NDJSON_MIMETYPE
+    lines = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert lines == batch(batch_client, cins).get_json()["results"]
+    accept = batch_client.post("/companies/batch", json={"cins": cins}, headers={"Accept": api.NDJSON_MIMETYPE})
+    assert accept.get_data() == res.get_data()
+
+@pytest.mark.parametrize("body", [{}, {"cins": "U1"}, {"cins": [1, 2]}, None])
+def test_batch_rejects_bad_bodies(client, body):
+    assert client.post("/companies/batch", json=body).status_code == 400
+
+def test_batch_size_cap(client, monkeypatch):
+    monkeypatch.setattr(api, "API_BATCH_MAX_CINS", 3)
+    assert batch(client, [c['CIN'] for c in COMPANIES[:3]]).status_code == 200
+    res = batch(client, [c['CIN'] for c in COMPANIES[:4]])
+    assert res.status_code == 400 and "at most 3" in res.get_json()["error"]
+
+def feed_changes(cins, date_str, change_type="Field Update"):
+    field = "Company_Status" if change_type == "Field Update" else ""
+    return [{'CIN': cin, 'Change_Type': change_type, 'Field_Changed': field, 'Old_Value': '',
+             'New_Value': '', 'Date': date_str} for cin in cins]
+
+@pytest.fixture
+def feed_client(client):
+    cins = [c['CIN'] for c in COMPANIES]
+    log_changes(feed_changes(cins[:6], "2025-10-18", "New Incorporation") + feed_changes(cins, "2025-10-18")
+                + feed_changes(cins[::2], "2025-10-19") + feed_changes(cins[6:], "2025-10-19", "Deregistered"))
+    return client
+
+def read_feed(client, params, limit):
+    """Follow the feed from the start until has_more is false; returns rows and the final cursor."""
+    rows, cursor = [], 0
+    while True:
+        body = client.get("/changes", query_string={**params, "limit": limit, "cursor": cursor}).get_json()
+        assert body["next_cursor"] >= cursor
+        rows += body["changes"]
+        if body["has_more"]:
+            assert body["next_cursor"] == body["changes"][-1]["id"] and len(body["changes"]) == limit
+        cursor = body["next_cursor"]
+        if not body["has_more"]:
+            return rows, cursor
+
+@pytest.mark.parametrize("filters,limit", [({}, 7), ({}, 1), ({"type": "Deregistered"}, 2),
+                                           ({"type": "Field Update", "state": "Gujarat"}, 3),
+                                           ({"field": "Company_Status"}, 5)])
+def test_change_feed_pages(feed_client, fresh_db, filters, limit):
+    states = {c['CIN']: c['State'] for c in COMPANIES}
+    with sqlite3.connect(fresh_db) as conn:
+        all_rows = conn.execute("SELECT id, CIN, Change_Type, Field_Changed FROM change_log ORDER BY id").fetchall()
+    expected = [i for i, cin, change_type, field in all_rows
+                if change_type == filters.get("type", change_type) and field == filters.get("field", field)
+                and states[cin] == filters.get("state", states[cin])]
+    rows, cursor = read_feed(feed_client, filters, limit)
+    assert [r["id"] for r in rows] == expected  # ascending, no duplicates or gaps
+    assert cursor == all_rows[-1][0]
+
+def test_change_feed_cursor_moves_past_filtered_rows(feed_client, fresh_db):
+    params = {"type": "Field Update", "state": "Delhi"}  # no company is in Delhi
+    body = feed_client.get("/changes", query_string={**params, "cursor": 0}).get_json()
+    head = body["next_cursor"]
+    assert body["changes"] == [] and not body["has_more"] and head > 0
+
+    # Newer rows that don't match move the cursor on again, without returning anything
+    log_changes(feed_changes([COMPANIES[0]['CIN']], "2025-10-20"))
+    body = feed_client.get("/changes", query_string={**params, "cursor": head}).get_json()
+    assert body["changes"] == [] and body["next_cursor"] == head + 1
+
+    # Once a matching row arrives it is the next one returned
+    upsert_companies([{**COMPANIES[1], 'State': "Delhi"}])
+    log_changes(feed_changes([COMPANIES[1]['CIN']], "2025-10-21"))
+    body = feed_client.get("/changes", query_string={**params, "cursor": head + 1}).get_json()
+    assert [(r["id"], r["CIN"]) for r in body["changes"]] == [(head + 2, COMPANIES[1]['CIN'])]
+    assert body["next_cursor"] == head + 2
+
+def test_change_feed_idle_read_keeps_cursor(feed_client):
+    head = feed_client.get("/changes", query_string={"cursor": 0, "limit": 1000}).get_json()["next_cursor"]
+    body = feed_client.get("/changes", query_string={"cursor": head}).get_json()
+    assert body == {"changes": [], "next_cursor": head, "has_more": False}
+
+@pytest.fixture
+def fast_feed(monkeypatch):
+    monkeypatch.setattr(api, "API_FEED_POLL_INTERVAL", 0.02)
+
+def test_long_poll_returns_row_logged_during_wait(feed_client, fast_feed):
+    head = feed_client.get("/changes", query_string={"cursor": 0, "limit": 1000}).get_json()["next_cursor"]
+    cin = COMPANIES[3]['CIN']
+    writer = threading.Timer(0.2, log_changes, args=(feed_changes([cin], "2025-10-20"),))
+    writer.start()
+    start = time.monotonic()
+    body = feed_client.get("/changes", query_string={"cursor": head, "wait": 5}).get_json()
+    writer.join()
+    assert 0.15 <= time.monotonic() - start < 4
+    assert [(r["id"], r["CIN"]) for r in body["changes"]] == [(head + 1, cin)]
+    assert body["next_cursor"] == head + 1
+
+def test_long_poll_times_out_with_cursor_unchanged(feed_client, fast_feed):
+    head = feed_client.get("/changes", query_string={"cursor": 0, "limit": 1000}).get_json()["next_cursor"]
+    start = time.monotonic()
+    body = feed_client.get("/changes", query_string={"cursor": head, "wait": 0.3}).get_json()
+    assert time.monotonic() - start >= 0.3
+    assert body == {"changes": [], "next_cursor": head, "has_more": False}
+
+def sse_events(client, count, **kwargs):
+    """The first `count` SSE messages of /changes/stream, as (id, event, data) or ('', 'comment', text)."""
+    res = client.get("/changes/stream", buffered=False, **kwargs)
+    assert res.mimetype == "text/event-stream"
+    events, buf = [], ""
+    chunks = iter(res.response)
+    try:
+        while len(events) < count:
+            chunk = next(chunks)
+            buf += chunk.decode() if isinstance(chunk, bytes) else chunk
+            while "\n\n" in buf and len(events) < count:
+                message, buf = buf.split("\n\n", 1)
+                if message.startswith(":"):
+                    events.append(("", "comment", message[1:].strip()))
+                    continue
+                fields = dict(line.split(": ", 1) for line in message.splitlines())
+                events.append((fields["id"], fields["event"], json.loads(fields["data"])))
+    finally:
+        res.close()
+    return events
+
+def test_sse_stream_and_resume(feed_client, fast_feed, fresh_db):
+    with sqlite3.connect(fresh_db) as conn:
+        ids = [r[0] for r in conn.execute("SELECT id FROM change_log WHERE Change_Type = 'Deregistered' ORDER BY id")]
+    first = sse_events(feed_client, 3, query_string={"type": "Deregistered"})
+    assert [(int(i), e) for i, e, _ in first] == [(i, "change") for i in ids[:3]]
+    assert all(data["id"] == int(i) and data["Change_Type"] == "Deregistered" for i, _, data in first)
+
+    # An EventSource reconnects with the last id it saw and gets only later rows
+    resumed = sse_events(feed_client, 2, query_string={"type": "Deregistered"},
+                         headers={"Last-Event-ID": first[-1][0]})
+    assert [int(i) for i, _, _ in resumed] == ids[3:5]
+
+def test_sse_keep_alive_when_idle(feed_client, fast_feed, monkeypatch):
+    monkeypatch.setattr(api, "API_FEED_HEARTBEAT", 0)
+    head = feed_client.get("/changes", query_string={"cursor": 0, "limit": 1000}).get_json()["next_cursor"]
+    assert sse_events(feed_client, 1, query_string={"cursor": head}) == [("", "comment", "keep-alive")]
@@ -0,0 +1,23 @@
+"""Backfill diffs: the pool and the single-process path agree with detect_changes per pair."""
+import pandas as pd
+import pytest
+
+from mca_insights import backfill
+from mca_insights.config import SNAPSHOTS_DIR
+from mca_insights.integrate import consolidate_snapshot_dir
+
+DATES = ["2025-10-17", "2025-10-18", "2025-10-19"]
+
+@pytest.mark.parametrize("workers,seeded", [(1, False), (1, True), (2, False)])
+def test_iter_diffs_matches_pairwise(workers, seeded):
+    first_df = consolidate_snapshot_dir(SNAPSHOTS_DIR / DATES[0], workers=1) if seeded else None
+    got = list(backfill.iter_diffs(DATES, workers, first_df=first_df))
+    assert [d for d, _, _ in got] == DATES[1:]
+    for (d, changes, rows), prev_date in zip(got, DATES):
+        want_changes, want_rows = backfill.diff_dates(prev_date, d)
+        pd.testing.assert_frame_equal(changes, want_changes)
+        pd.testing.assert_frame_equal(rows, want_rows)
+
+def test_cache_available_follows_setting(monkeypatch):
+    monkeypatch.setattr(backfill, "SNAPSHOT_CACHE_ENABLED", False)
+    assert not backfill.cache_available()
@@ -0,0 +1,122 @@
+"""detect_changes against the original row-wise implementation, kept here as the reference."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from mca_insights.change_detector import detect_changes, KEY_FIELDS, CHANGE_COLUMNS
+from mca_insights.config import SNAPSHOTS_DIR, CANONICAL_COLUMNS
+from mca_insights.integrate import consolidate_snapshot_dir
+from mca_insights.utils import normalize_cin
+
+DATES = ("2025-10-17", "2025-10-18", "2025-10-19")
+
+def reference_detect_changes(prev_df, curr_df, date_str):
+    """The row-wise detect_changes as first written (one str() comparison per field)."""
+    prev = prev_df.copy()
+    prev['CIN'] = prev['CIN'].apply(normalize_cin)
+    curr = curr_df.copy()
+    curr['CIN'] = curr['CIN'].apply(normalize_cin)
+    prev_idx = prev.set_index('CIN')
+    curr_idx = curr.set_index('CIN')
+    prev_cins = set(prev_idx.index)
+    curr_cins = set(curr_idx.index)
+    changes = []
+    for change_type, cins in (('New Incorporation', curr_cins - prev_cins), ('Deregistered', prev_cins - curr_cins)):
+        for cin in sorted(cins):
+            changes.append({'CIN': cin, 'Change_Type': change_type, 'Field_Changed': '',
+                            'Old_Value': '', 'New_Value': '', 'Date': date_str})
+    for cin in sorted(prev_cins & curr_cins):
+        prev_row = prev_idx.loc[cin]
+        curr_row = curr_idx.loc[cin]
+        for field in KEY_FIELDS:
+            pv = str(prev_row.get(field))
+            cv = str(curr_row.get(field))
+            if pv != cv:
+                changes.append({'CIN': cin, 'Change_Type': 'Field Update', 'Field_Changed': field,
+                                'Old_Value': pv, 'New_Value': cv, 'Date': date_str})
+    return pd.DataFrame(changes, columns=CHANGE_COLUMNS)
+
+def as_object(df):
+    """A consolidated frame with the object dtypes the reference was written for."""
+    out = {}
+    for col in df.columns.drop('Row_Hash', errors='ignore'):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(s.cat.categories.dtype)
+        elif isinstance(s.dtype, pd.StringDtype):
+            s = s.astype(object).where(s.notna(), np.nan)
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+def assert_same(actual, expected):
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True).astype(object),
+                                  expected.reset_index(drop=True).astype(object))
+
+def company(cin, **fields):
+    row = {c: f"{c}-{normalize_cin(cin)}" for c in CANONICAL_COLUMNS}
+    row.update(CIN=cin, Authorized_Capital=100000.0, Paidup_Capital=50000.0)
+    row.update(fields)
+    return row
+
+@pytest.fixture(scope="module")
+def snapshots():
+    return {d: consolidate_snapshot_dir(SNAPSHOTS_DIR / d, workers=1, use_cache=False) for d in DATES}
+
+@pytest.mark.parametrize("prev_date,curr_date", list(zip(DATES, DATES[1:])))
+def test_demo_snapshots_match_reference(snapshots, prev_date, curr_date):
+    prev, curr = snapshots[prev_date], snapshots[curr_date]
+    expected = reference_detect_changes(as_object(prev), as_object(curr), curr_date)
+    assert len(expected) > 0
+    # Typed frames (with ingest-time Row_Hash) and plain object frames give the same rows
+    assert_same(detect_changes(prev, curr, curr_date), expected)
+    assert_same(detect_changes(as_object(prev), as_object(curr), curr_date), expected)
+
+def test_nan_values():
+    prev = pd.DataFrame([company("U1", Company_Status=np.nan, Paidup_Capital=np.nan),
+                         company("U2", Company_Status="Active"),
+                         company("U3", Authorized_Capital=np.nan)])
+    curr = pd.DataFrame([company("U1", Company_Status="Active", Paidup_Capital=np.nan),
+                         company("U2", Company_Status=np.nan),
+                         company("U3", Authorized_Capital=np.nan)])
+    expected = reference_detect_changes(prev, curr, "2025-01-02")
+    assert set(expected['Old_Value']) | set(expected['New_Value']) >= {'nan', 'Active'}
+    assert_same(detect_changes(prev, curr, "2025-01-02"), expected)
+
+def test_changed_dtype():
+    # Capitals read as text one day and as floats the next print alike, so only real edits show
+    prev = pd.DataFrame([company("U1"), company("U2"), company("U3", NIC_Code=62011)])
+    curr = pd.DataFrame([company("U1", Authorized_Capital="100000.0"), company("U2", Paidup_Capital="60000.0"),
+                         company("U3", NIC_Code="62011")])
+    prev['NIC_Code'] = prev['NIC_Code'].astype(object)
+    expected = reference_detect_changes(prev, curr, "2025-01-02")
+    assert list(expected['Field_Changed']) == ['Paidup_Capital']
+    assert_same(detect_changes(prev, curr, "2025-01-02"), expected)
+
+def test_missing_column():
+    prev = pd.DataFrame([company("U1"), company("U2")])
+    curr = pd.DataFrame([company("U1"), company("U2")]).drop(columns=['NIC_Code'])
+    expected = reference_detect_changes(prev, curr, "2025-01-02")
+    assert set(expected['New_Value']) == {'None'}
+    assert_same(detect_changes(prev, curr, "2025-01-02"), expected)
+
+@pytest.mark.parametrize("empty", ["prev", "curr", "both"])
+def test_empty_frame(empty):
+    full = pd.DataFrame([company("U2"), company("U1")])
+    none = pd.DataFrame(columns=CANONICAL_COLUMNS)
+    prev = none if empty in ("prev", "both") else full
+    curr = none if empty in ("curr", "both") else full
+    expected = reference_detect_changes(prev, curr, "2025-01-02")
+    assert_same(detect_changes(prev, curr, "2025-01-02"), expected)
+
+def test_duplicate_cins_resolve_to_last_row():
+    # Consolidation keeps the last row per CIN; detect_changes does the same for raw frames
+    # (keys are compared after normalization, so 'u1 ' and 'U1' are one company)
+    prev = pd.DataFrame([company("U1", Company_Status="Active"), company("u1 ", Company_Status="Dormant"),
+                         company("U2")])
+    curr = pd.DataFrame([company("U1", Company_Status="Strike Off"), company("U2", RoC="RoC-Delhi"),
+                         company("U2", RoC="RoC-Mumbai"), company("U3")])
+    dedupe = lambda df: df.assign(CIN=df['CIN'].map(normalize_cin)).drop_duplicates('CIN', keep='last')  # noqa: E731
+    expected = reference_detect_changes(dedupe(prev), dedupe(curr), "2025-01-02")
+    assert expected['Old_Value'].tolist() == ['', 'Dormant', 'RoC-U2']
+    assert expected['New_Value'].tolist() == ['', 'Strike Off', 'RoC-Mumbai']
+    assert_same(detect_changes(prev, curr, "2025-01-02"), expected)
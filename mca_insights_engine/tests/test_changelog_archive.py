@@ -0,0 +1,43 @@
+"""change_log archival: archived days read back unchanged, and a rerun day's DB rows win."""
+import sqlite3
+
+import pandas as pd
+
+from mca_insights import changelog_archive
+from mca_insights.database import replace_changes_for_date, read_changes_since
+
+DATES = ["2025-10-17", "2025-10-18", "2025-10-19"]
+
+def day_rows(date_str, cins, status="Strike Off"):
+    return [{'CIN': cin, 'Change_Type': 'Field Update', 'Field_Changed': 'Company_Status',
+             'Old_Value': 'Active', 'New_Value': status, 'Date': date_str} for cin in cins] + \
+           [{'CIN': f"N{date_str}", 'Change_Type': 'New Incorporation', 'Field_Changed': '',
+             'Old_Value': '', 'New_Value': '', 'Date': date_str}]
+
+def test_archive_round_trip_and_rerun(fresh_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(changelog_archive, "CHANGELOG_ARCHIVE_DIR", tmp_path / "archive")
+    for i, d in enumerate(DATES):
+        replace_changes_for_date(d, day_rows(d, [f"U{i}{j}" for j in range(3)]))
+    before = read_changes_since(DATES[0])
+
+    assert changelog_archive.archive_changes(keep_days=1, as_of=DATES[2]) == [DATES[0]]
+    assert changelog_archive.archived_dates() == [DATES[0]]
+    with sqlite3.connect(fresh_db) as conn:
+        assert conn.execute("SELECT count(*) FROM change_events WHERE Day = 20251017").fetchone()[0] == 0
+    pd.testing.assert_frame_equal(read_changes_since(DATES[0]), before)
+    pd.testing.assert_frame_equal(read_changes_since(DATES[1]),
+                                  before[before['Date'] >= DATES[1]].reset_index(drop=True))
+
+    # Rerunning the archived day puts it back in the DB; its Parquet copy is stale from then on
+    rerun = day_rows(DATES[0], ["U99"], status="Under Liquidation")
+    replace_changes_for_date(DATES[0], rerun)
+    after = read_changes_since(DATES[0])
+    got = after.loc[after['Date'] == DATES[0], ['CIN', 'New_Value']]
+    assert got.values.tolist() == [[r['CIN'], r['New_Value']] for r in rerun]
+    pd.testing.assert_frame_equal(after[after['Date'] > DATES[0]].reset_index(drop=True),
+                                  before[before['Date'] > DATES[0]].reset_index(drop=True))
+
+    # Archiving the rerun day again replaces the stale file
+    assert changelog_archive.archive_changes(keep_days=1, as_of=DATES[2]) == [DATES[0]]
+    final = read_changes_since(DATES[0])
+    assert final.loc[final['Date'] == DATES[0], 'CIN'].tolist() == ["U99", f"N{DATES[0]}"]
@@ -0,0 +1,28 @@
+"""Chatbot intents return the right rows from the SQL they compile to."""
+from datetime import date, timedelta
+
+from mca_insights.chatbot import query_new_incorporations, query_capital_threshold, interpret_and_execute
+from mca_insights.database import upsert_companies, log_changes
+
+def test_new_incorporations_by_state(fresh_db):
+    recent, old = [(date.today() - timedelta(days=d)).isoformat() for d in (2, 60)]
+    upsert_companies([{'CIN': cin, 'Company_Name': cin, 'State': state}
+                      for cin, state in (("U1", "Maharashtra"), ("U2", "Tamil Nadu"), ("U3", "Maharashtra"))])
+    log_changes([{'CIN': cin, 'Change_Type': 'New Incorporation', 'Field_Changed': '', 'Old_Value': '',
+                  'New_Value': '', 'Date': d} for cin, d in (("U1", recent), ("U2", recent), ("U3", old))]
+                + [{'CIN': "U1", 'Change_Type': 'Field Update', 'Field_Changed': 'Company_Status',
+                    'Old_Value': 'Active', 'New_Value': 'Strike Off', 'Date': recent}])
+
+    assert sorted(query_new_incorporations()['CIN']) == ["U1", "U2"]
+    df = interpret_and_execute("Show new incorporations in maharashtra")["dataframe"]
+    assert df['CIN'].tolist() == ["U1"]
+    assert df['State'].tolist() == ["Maharashtra"]
+    assert query_new_incorporations(state="TAMIL NADU", limit=1)['CIN'].tolist() == ["U2"]
+
+def test_capital_threshold_in_manufacturing(fresh_db):
+    upsert_companies([{'CIN': cin, 'Company_Name': cin, 'NIC_Code': nic, 'Authorized_Capital': cap}
+                      for cin, nic, cap in (("U1", "10712", 5e6), ("U2", "11040", 1e6), ("U3", "10712", 5e5),
+                                            ("U4", "62011", 9e6), ("U5", None, 9e6))])
+    df = interpret_and_execute("manufacturing companies with authorized capital above 1000000")["dataframe"]
+    assert sorted(df['CIN']) == ["U1", "U2"]
+    assert query_capital_threshold(min_auth_cap=1e6, limit=2, offset=1)['CIN'].tolist() == ["U2", "U4"]
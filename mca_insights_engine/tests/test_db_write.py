@@ -0,0 +1,81 @@
+"""The delta write path (rows_to_write + apply_daily_changes) against a full-table rewrite.
+
+Two days are applied both ways and must leave the same `companies` and
+`change_log`, including an address-only edit (no change_log row, but a new
+row value) and deregistered CINs (their last row is kept).
+"""
+import sqlite3
+
+import pandas as pd
+
+from mca_insights.change_detector import detect_changes, rows_to_write
+from mca_insights.config import CANONICAL_COLUMNS
+from mca_insights.database import SCHEMA_COMPANIES, SCHEMA_CHANGELOG, apply_daily_changes, seed_companies
+
+DATES = ["2025-10-17", "2025-10-18", "2025-10-19"]
+CHANGE_SQL = "SELECT CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date FROM change_log ORDER BY id"
+COMPANY_SQL = f"SELECT {', '.join(CANONICAL_COLUMNS)} FROM companies ORDER BY CIN"
+
+def snapshots():
+    day0 = pd.DataFrame({
+        "CIN": [f"U{i:05d}MH2020PTC{i:06d}" for i in range(6)],
+        "Company_Name": [f"Company {i} Pvt Ltd" for i in range(6)],
+        "Company_Class": "Private",
+        "Date_of_Incorporation": "2020-01-01",
+        "Authorized_Capital": 1e6,
+        "Paidup_Capital": 5e5,
+        "Company_Status": "Active",
+        "NIC_Code": "62011",
+        "Registered_Address": [f"{i}, Mumbai" for i in range(6)],
+        "RoC": "RoC-Mumbai",
+        "State": "Maharashtra",
+    })
+    day1 = day0[day0["CIN"] != day0.at[5, "CIN"]].copy()         # deregistered
+    day1.loc[0, "Registered_Address"] = "0, Pune"                 # address only
+    day1.loc[1, "Company_Status"] = "Strike Off"                  # field update
+    new = day0.iloc[[2]].assign(CIN="U00006MH2025PTC000006", Company_Name="Company 6 Pvt Ltd")
+    day1 = pd.concat([day1, new], ignore_index=True)               # new incorporation
+    day2 = day1[day1["CIN"] != day0.at[4, "CIN"]].copy()           # deregistered
+    day2.loc[day2["CIN"] == day0.at[3, "CIN"], "Registered_Address"] = "3, Nagpur"
+    day2.loc[day2["CIN"] == day0.at[0, "CIN"], "Authorized_Capital"] = 2e6
+    return [day0, day1, day2.reset_index(drop=True)]
+
+def full_rewrite(path, curr, changes):
+    # The pre-delta write path: REPLACE every row of the snapshot, append the day's changes
+    with sqlite3.connect(path) as conn:
+        conn.executemany(f"REPLACE INTO companies ({', '.join(CANONICAL_COLUMNS)}) "
+                         f"VALUES ({', '.join('?' * len(CANONICAL_COLUMNS))})",
+                         curr[CANONICAL_COLUMNS].astype(object).itertuples(index=False, name=None))
+        conn.executemany("INSERT INTO change_log (CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         [(r.CIN, r.Change_Type, r.Field_Changed, str(r.Old_Value), str(r.New_Value), r.Date)
+                          for r in changes.itertuples(index=False)])
+
+def table(path, sql):
+    with sqlite3.connect(path) as conn:
+        return pd.read_sql_query(sql, conn)
+
+def test_delta_write_matches_full_rewrite(fresh_db, tmp_path):
+    frames = snapshots()
+    full_db = tmp_path / "full.db"
+    with sqlite3.connect(full_db) as conn:
+        conn.executescript(SCHEMA_COMPANIES + SCHEMA_CHANGELOG)
+    full_rewrite(full_db, frames[0], detect_changes(frames[0], frames[0], DATES[0]))
+    seed_companies(frames[0], DATES[0])
+
+    written = []
+    for prev, curr, date_str in zip(frames, frames[1:], DATES[1:]):
+        changes = detect_changes(prev, curr, date_str)
+        delta = rows_to_write(prev, curr, changes)
+        written.append(set(delta["CIN"]))
+        apply_daily_changes(delta, changes, date_str)
+        full_rewrite(full_db, curr, changes)
+
+    # Day 1: the address-only edit, the status change and the new company; not the unchanged rows
+    cins = frames[0]["CIN"]
+    assert written[0] == {cins[0], cins[1], "U00006MH2025PTC000006"}
+    assert written[1] == {cins[0], cins[3]}
+    pd.testing.assert_frame_equal(table(fresh_db, COMPANY_SQL), table(full_db, COMPANY_SQL))
+    pd.testing.assert_frame_equal(table(fresh_db, CHANGE_SQL), table(full_db, CHANGE_SQL))
+    # Deregistered companies keep their last row
+    assert {cins[4], cins[5]} <= set(table(fresh_db, COMPANY_SQL)["CIN"])
@@ -0,0 +1,24 @@
+"""enrich_sample output: enriched_changes.csv is merged across runs, not rewritten."""
+import pandas as pd
+
+from mca_insights import enrichers
+
+def master(names):
+    return pd.DataFrame({'CIN': list(names), 'Company_Name': list(names.values()),
+                         'State': 'Maharashtra', 'Company_Status': 'Active'})
+
+def test_output_merges_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(enrichers, "ENRICH_DIR", tmp_path / "enrichment")
+    first = {"U00001MH2020PTC000001": "Alpha", "U00002MH2020PTC000002": "Beta"}
+    second = {"U00002MH2020PTC000002": "Beta Renamed", "U00003MH2020PTC000003": "Gamma"}
+
+    enrichers.enrich_sample(list(first), master(first), live=False)
+    out_path = enrichers.enrich_sample(list(second), master(second), live=False)
+
+    out = pd.read_csv(out_path, dtype=str, keep_default_na=False)
+    assert list(out.columns) == enrichers.ENRICH_COLUMNS
+    assert sorted(out['CIN']) == sorted(first.keys() | second.keys())
+    assert not out['CIN'].duplicated().any()
+    names = dict(zip(out['CIN'], out['COMPANY_NAME']))
+    assert names == {**first, **second}
+    assert not list(out_path.parent.glob("*.tmp"))
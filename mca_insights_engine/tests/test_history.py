@@ -0,0 +1,92 @@
+"""Type-2 company history: versions open and close on the right dates, and as-of
+lookups (database.company_as_of and /search_company?as_of=) return the version then valid."""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from mca_insights import api
+from mca_insights.change_detector import detect_changes, rows_to_write
+from mca_insights.database import OPEN_VALID_TO, apply_daily_changes, seed_companies, company_as_of
+
+DATES = ["2025-10-17", "2025-10-18", "2025-10-19", "2025-10-20"]
+CIN, GONE, SAME = "U00000MH2020PTC000000", "U00001MH2020PTC000001", "U00002MH2020PTC000002"
+
+def snapshots():
+    day0 = pd.DataFrame({
+        "CIN": [CIN, GONE, SAME],
+        "Company_Name": ["Alpha Pvt Ltd", "Beta Pvt Ltd", "Gamma Pvt Ltd"],
+        "Company_Class": "Private",
+        "Date_of_Incorporation": "2020-01-01",
+        "Authorized_Capital": 1e6,
+        "Paidup_Capital": 5e5,
+        "Company_Status": "Active",
+        "NIC_Code": "62011",
+        "Registered_Address": "1, Mumbai",
+        "RoC": "RoC-Mumbai",
+        "State": "Maharashtra",
+    })
+    day1 = day0.copy()
+    day1.loc[0, "Company_Status"] = "Under Liquidation"    # first update
+    day2 = day1.copy()
+    day2.loc[0, "Company_Name"] = "Alpha Renamed Pvt Ltd"   # second update
+    day3 = day2[day2["CIN"] != GONE].reset_index(drop=True)  # deregistered
+    return [day0, day1, day2, day3]
+
+@pytest.fixture
+def history_db(fresh_db):
+    frames = snapshots()
+    seed_companies(frames[0], DATES[0])
+    for prev, curr, d in zip(frames, frames[1:], DATES[1:]):
+        changes = detect_changes(prev, curr, d)
+        apply_daily_changes(rows_to_write(prev, curr, changes), changes, d)
+    return fresh_db
+
+def versions(db_path, cin):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT valid_from, valid_to, Company_Name, Company_Status FROM company_history "
+                            "WHERE CIN = ? ORDER BY valid_from", (cin,)).fetchall()
+
+def test_versions_close_and_open(history_db):
+    assert versions(history_db, CIN) == [
+        (DATES[0], DATES[1], "Alpha Pvt Ltd", "Active"),
+        (DATES[1], DATES[2], "Alpha Pvt Ltd", "Under Liquidation"),
+        (DATES[2], OPEN_VALID_TO, "Alpha Renamed Pvt Ltd", "Under Liquidation"),
+    ]
+    assert versions(history_db, GONE) == [(DATES[0], DATES[3], "Beta Pvt Ltd", "Active")]
+    assert versions(history_db, SAME) == [(DATES[0], OPEN_VALID_TO, "Gamma Pvt Ltd", "Active")]
+
+def test_rerunning_a_day_keeps_history(history_db):
+    before = versions(history_db, CIN)
+    frames = snapshots()
+    changes = detect_changes(frames[1], frames[2], DATES[2])
+    apply_daily_changes(rows_to_write(frames[1], frames[2], changes), changes, DATES[2])
+    assert versions(history_db, CIN) == before
+
+@pytest.mark.parametrize("as_of,expected", [
+    ("2025-10-16", None),
+    (DATES[0], ("Alpha Pvt Ltd", "Active")),
+    (DATES[1], ("Alpha Pvt Ltd", "Under Liquidation")),   # a version starts on its valid_from
+    (DATES[2], ("Alpha Renamed Pvt Ltd", "Under Liquidation")),
+    ("2026-01-01", ("Alpha Renamed Pvt Ltd", "Under Liquidation")),
+])
+def test_company_as_of(history_db, as_of, expected):
+    row = company_as_of(CIN, as_of)
+    assert (row and (row["Company_Name"], row["Company_Status"])) == expected
+
+def test_deregistered_company_as_of(history_db):
+    assert company_as_of(GONE, DATES[2])["Company_Name"] == "Beta Pvt Ltd"
+    assert company_as_of(GONE, DATES[3]) is None
+
+def test_search_company_as_of(history_db, monkeypatch):
+    monkeypatch.setattr(api, "_pool", api._ReadPool(2))
+    monkeypatch.setattr(api, "_cache", api._ResponseCache(16, 60, 0))
+    client = api.app.test_client()
+    body = client.get("/search_company", query_string={"cin": CIN.lower(), "as_of": DATES[1]}).get_json()
+    assert [r["Company_Status"] for r in body["results"]] == ["Under Liquidation"]
+    assert [r["Company_Name"] for r in body["results"]] == ["Alpha Pvt Ltd"]
+    # Changes after the as-of date are left out
+    assert [c["Date"] for c in body["change_history"]] == [DATES[1]]
+    current = client.get("/search_company", query_string={"cin": CIN}).get_json()
+    assert [r["Company_Name"] for r in current["results"]] == ["Alpha Renamed Pvt Ltd"]
+    assert client.get("/search_company", query_string={"cin": CIN, "as_of": "yesterday"}).status_code == 400
@@ -0,0 +1,94 @@
+"""run_incremental and its checkpoint: reruns are no-ops, every checkpoint format resumes
+to the DB state of an uninterrupted run, and an unusable pointer falls back to a full run."""
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import run_pipeline
+from mca_insights import checkpoint
+from mca_insights.config import CHECKPOINT_DIR, CHANGELOGS_DIR, DB_PATH
+from mca_insights.database import init_db, set_hashes_date, data_generation
+
+DATES = ["2025-10-17", "2025-10-18", "2025-10-19"]
+STATE_SQL = {
+    "companies": "SELECT * FROM companies ORDER BY CIN",
+    "change_log": "SELECT CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date FROM change_log "
+                  "ORDER BY Date, CIN, Change_Type, Field_Changed, Old_Value, New_Value",
+    "company_history": "SELECT * FROM company_history ORDER BY CIN, valid_from",
+    "company_hashes": "SELECT * FROM company_hashes ORDER BY CIN",
+}
+
+def reset():
+    for suffix in ("", "-wal", "-shm"):
+        DB_PATH.with_name(DB_PATH.name + suffix).unlink(missing_ok=True)
+    shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+    shutil.rmtree(CHANGELOGS_DIR, ignore_errors=True)
+    init_db()
+
+def db_state(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {name: pd.read_sql_query(sql, conn) for name, sql in STATE_SQL.items()}
+
+def assert_same_state(got, expected):
+    for name in STATE_SQL:
+        pd.testing.assert_frame_equal(got[name], expected[name], obj=name)
+
+@pytest.fixture
+def uninterrupted(fresh_db):
+    """DB state after one incremental run over every date; the DB and checkpoint are reset after."""
+    reset()
+    run_pipeline.run_incremental(DATES)
+    state = db_state(fresh_db)
+    reset()
+    return state
+
+def test_rerun_without_new_snapshot_is_noop(fresh_db, capsys):
+    reset()
+    run_pipeline.run_incremental(DATES[:2])
+    before, generation = db_state(fresh_db), data_generation()
+    pointer = checkpoint.CHECKPOINT_FILE.read_text()
+
+    run_pipeline.run_incremental(DATES[:2])
+    assert "Up to date (checkpoint 2025-10-18)" in capsys.readouterr().out
+    assert_same_state(db_state(fresh_db), before)
+    assert data_generation() == generation
+    assert checkpoint.CHECKPOINT_FILE.read_text() == pointer
+
+@pytest.mark.parametrize("hashes_current", [True, False], ids=["hashes-current", "hashes-stale"])
+@pytest.mark.parametrize("fmt", ["feather", "pickle", "hashes"])
+def test_resume_from_each_format(uninterrupted, fresh_db, monkeypatch, fmt, hashes_current):
+    if fmt == "pickle":
+        monkeypatch.setattr(checkpoint, "write_frame", lambda path, df: False)
+    run_pipeline.run_incremental(DATES[:2])
+    if fmt == "hashes":
+        checkpoint.save_checkpoint(DATES[1])
+    meta = checkpoint._read_meta()
+    assert (meta["last_date"], meta["format"]) == (DATES[1], fmt)
+    if not hashes_current:
+        # company_hashes no longer matches the checkpoint, so the next day is diffed
+        # against the checkpointed frame (or the re-read snapshot for 'hashes')
+        set_hashes_date(None)
+
+    run_pipeline.run_incremental(DATES)
+    assert checkpoint.checkpoint_date() == DATES[2]
+    assert_same_state(db_state(fresh_db), uninterrupted)
+
+@pytest.mark.parametrize("damage", ["corrupt", "truncated", "missing", "state-file-missing"])
+def test_unusable_checkpoint_falls_back_to_full_run(uninterrupted, fresh_db, damage):
+    run_pipeline.run_incremental(DATES[:2])
+    if damage == "corrupt":
+        checkpoint.CHECKPOINT_FILE.write_text("{not json")
+    elif damage == "truncated":
+        checkpoint.CHECKPOINT_FILE.write_text('{"last_date": "2025-10-18"}')
+    elif damage == "missing":
+        checkpoint.CHECKPOINT_FILE.unlink()
+    else:
+        for p in CHECKPOINT_DIR.glob("state_*"):
+            p.unlink()
+    assert checkpoint.checkpoint_date() is None
+
+    run_pipeline.run_incremental(DATES)
+    assert checkpoint.checkpoint_date() == DATES[2]
+    assert_same_state(db_state(fresh_db), uninterrupted)
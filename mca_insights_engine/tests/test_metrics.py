@@ -0,0 +1,14 @@
+"""Stage profiling: one file per profiled stage execution."""
+from pathlib import Path
+
+from mca_insights import metrics
+
+def test_repeated_stage_profiles_do_not_collide(monkeypatch):
+    monkeypatch.setattr(metrics, "PROFILE_STAGE", "csv_export")
+    monkeypatch.setattr(metrics, "PROFILE_MODE", "cprofile")
+    with metrics.pipeline_run("test", ["2025-10-18"]) as run:
+        for _ in range(2):
+            with metrics.stage("csv_export", "2025-10-18"):
+                sum(range(1000))
+    assert len(run.profiles) == len(set(run.profiles)) == 2
+    assert all(Path(p).exists() for p in run.profiles)
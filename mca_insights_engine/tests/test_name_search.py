@@ -0,0 +1,63 @@
+"""name_search_sql returns the same companies, in the same order, as a plain substring
+search would: trigram terms, short LIKE-fallback terms and FTS/LIKE special characters."""
+import sqlite3
+
+import pytest
+
+from mca_insights import database
+from mca_insights.database import name_search_sql, upsert_companies
+
+NAMES = ["Tech Mahindra Ltd", "Infotech Solutions Pvt Ltd", "Technova Pvt Ltd", "Biotech", "TECHNO Pvt Ltd",
+         "AB Foods Ltd", "Dabur India Ltd", "Kab Ltd", "O'Neil Traders", 'The "Quoted" Co',
+         "A AND B Pvt Ltd", "Star*Works Ltd", "Alpha-Beta (India) Ltd", "100% Cotton Mills", "Net_Works Ltd",
+         "Netaworks Ltd", "Col:on Ltd", "Back\\Slash Ltd", "Plain Ltd"]
+
+def company(i, name):
+    return {'CIN': f"U{i:05d}MH2020PTC{i:06d}", 'Company_Name': name, 'Company_Class': 'Private',
+            'Date_of_Incorporation': '2020-01-01', 'Authorized_Capital': 1e6, 'Paidup_Capital': 5e5,
+            'Company_Status': 'Active', 'NIC_Code': '62011', 'Registered_Address': 'Mumbai',
+            'RoC': 'RoC-Mumbai', 'State': 'Maharashtra'}
+
+@pytest.fixture
+def names_db(fresh_db):
+    upsert_companies([company(i, n) for i, n in enumerate(NAMES)])
+    return fresh_db
+
+def search(db_path, term, **kwargs):
+    sql, params = name_search_sql(term, columns="c.Company_Name", **kwargs)
+    with sqlite3.connect(db_path) as conn:
+        return [r[0] for r in conn.execute(sql, params)]
+
+def expected(term, prefix=False, names=NAMES):
+    t = term.strip().lower()
+    hits = [n for n in names if (n.lower().startswith(t) if prefix else t in n.lower())]
+    return sorted(hits, key=lambda n: (not n.lower().startswith(t), len(n), n))
+
+@pytest.mark.parametrize("term", [
+    "tech", "TECH", " tech ", "india", "works", "ltd",   # trigram substrings
+    "ab", "a", "t",                                       # shorter than 3: LIKE fallback
+    "o'neil", "'", '"quoted"', '"', "a and b", "and", "star*", "*", "(india)", "-beta", "col:on", ":",
+    "%", "100%", "_", "net_", "t_w", "\\", "k\\s",       # LIKE wildcards are matched literally
+    "nomatch",
+])
+@pytest.mark.parametrize("prefix", [False, True], ids=["substring", "prefix"])
+def test_matches_plain_substring_search(names_db, term, prefix):
+    assert search(names_db, term, prefix=prefix) == expected(term, prefix)
+
+def test_cin_substring(names_db):
+    sql, params = name_search_sql("00003mh", include_cin=True, columns="c.Company_Name")
+    with sqlite3.connect(names_db) as conn:
+        assert [r[0] for r in conn.execute(sql, params)] == [NAMES[3]]
+
+def test_limit_keeps_the_best_ranked(names_db):
+    assert search(names_db, "tech", limit=2) == expected("tech")[:2]
+
+def test_ranking_window(fresh_db, monkeypatch):
+    # Beyond NAME_SEARCH_RANK_WINDOW matches (in rowid order), later ones aren't ranked with a limit
+    names = [f"Zeta Tech Number {i:02d} Ltd" for i in range(6)] + ["Tech Ltd"]
+    upsert_companies([company(i, n) for i, n in enumerate(names)])
+    monkeypatch.setattr(database, "NAME_SEARCH_RANK_WINDOW", 3)
+    assert "Tech Ltd" not in search(fresh_db, "tech", limit=1)
+    assert search(fresh_db, "tech", limit=None) == expected("tech", names=names)
+    monkeypatch.setattr(database, "NAME_SEARCH_RANK_WINDOW", 10)
+    assert search(fresh_db, "tech", limit=1) == ["Tech Ltd"]
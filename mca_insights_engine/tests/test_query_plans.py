@@ -0,0 +1,132 @@
+"""Migrations on a legacy database, and EXPLAIN QUERY PLAN checks for the hot queries.
+
+A version-1 database (companies + plain change_log) is built in the scratch DB
+and brought to the current schema by init_db. Every hot query must then be
+served by an index: no full scan of `companies` or `change_events` (behind the
+`change_log` view), and no temp B-tree sort where an index should give the order.
+"""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from mca_insights.chatbot import new_incorporations_sql, capital_threshold_sql
+from mca_insights.config import DB_PATH, CANONICAL_COLUMNS
+from mca_insights.database import (init_db, explain_query_plan, name_search_sql, company_filter_sql,
+                                   company_page_sql, change_feed_sql, schema_version, MIGRATIONS, AS_OF_SQL,
+                                   CHANGE_HISTORY_SQL, CHANGE_HISTORY_UNTIL_SQL, CHANGE_ROWS_SQL,
+                                   CHANGE_HISTORY_BATCH_SQL, CHANGE_HISTORY_BATCH_UNTIL_SQL, COMPANIES_BY_CINS_SQL,
+                                   LATEST_CHANGE_ID_SQL, SCHEMA_COMPANIES, SCHEMA_CHANGELOG)
+from mca_insights.utils import incorporation_year_series, nic_sector_series
+
+CIN = "U00000MH2020PTC000000"
+# (label, sql, params, ordered_by_index)
+HOT_QUERIES = [
+    ("api/dashboard change history", CHANGE_HISTORY_SQL, (CIN,), True),
+    ("api change history as of", CHANGE_HISTORY_UNTIL_SQL, (CIN, 20251018), True),
+    ("api batch change history", CHANGE_HISTORY_BATCH_SQL, (f'["{CIN}"]',), True),
+    ("api batch change history as of", CHANGE_HISTORY_BATCH_UNTIL_SQL, (f'["{CIN}"]', 20251018), True),
+    ("api batch companies", COMPANIES_BY_CINS_SQL, (f'["{CIN}"]',), False),
+    ("api company keyset page", *company_page_sql(CIN, 100), True),
+    ("api change feed head", LATEST_CHANGE_ID_SQL, (), False),
+    ("api change feed", *change_feed_sql(100, 200, 500), True),
+    ("api change feed filtered",
+     *change_feed_sql(100, 200, 500, change_type="Field Update", field="Company_Status", state="Maharashtra"), True),
+    ("read_changes_since", CHANGE_ROWS_SQL + " WHERE e.Day >= ? ORDER BY e.Day, e.id", (20251018,), False),
+    ("summary status-change CINs",
+     "SELECT CIN FROM change_events WHERE Day BETWEEN ? AND ? AND Type_Id = (SELECT id FROM change_types WHERE name = ?) "
+     "AND Field_Id = (SELECT id FROM change_fields WHERE name = 'Company_Status') GROUP BY CIN ORDER BY min(id) LIMIT ?",
+     (20251019, 20251019, "Field Update", 20), False),
+    ("chatbot new incorporations", *new_incorporations_sql(), False),
+    ("chatbot new incorporations by state", *new_incorporations_sql("maharashtra"), False),
+    ("chatbot capital threshold", *capital_threshold_sql("manufacturing", 1e6), False),
+    ("chatbot struck off",
+     CHANGE_ROWS_SQL + " WHERE (t.name='Deregistered' OR (t.name='Field Update' AND f.name='Company_Status' "
+     "AND e.New_Value LIKE '%Strike Off%')) AND e.Day >= CAST(strftime('%Y%m%d', 'now', ?) AS INTEGER)",
+     ("-30 day",), False),
+    ("companies by state and year",
+     "SELECT * FROM companies WHERE State = ? AND Incorporation_Year = ?", ("Maharashtra", 2015), False),
+    ("companies by year",
+     "SELECT * FROM companies WHERE Incorporation_Year = ?", (2015,), False),
+    ("companies by sector and capital",
+     "SELECT * FROM companies WHERE NIC_Sector = ? AND Authorized_Capital >= ?", ("Manufacturing", 1e6), False),
+    ("summary window from rollups",
+     "SELECT Date, Change_Type, Field_Changed, State, Sector, Count FROM daily_rollups "
+     "WHERE Date BETWEEN ? AND ? ORDER BY Date", ("2025-10-13", "2025-10-19"), True),
+    ("company as of date", AS_OF_SQL, (CIN, "2025-10-18", "2025-10-18"), True),
+    ("close open history versions",
+     "UPDATE company_history SET valid_to = ? WHERE +valid_to = ? AND valid_from < ? AND CIN IN (?, ?)",
+     ("2025-10-19", "9999-12-31", "2025-10-19", CIN, CIN), False),
+    ("company by CIN",
+     "SELECT * FROM companies WHERE CIN = ?", (CIN,), False),
+    ("name search (trigram)", *name_search_sql("tech"), False),
+    ("name or CIN search (trigram)", *name_search_sql("U0000", include_cin=True, limit=None), False),
+]
+
+_from, _params = company_filter_sql(None, 2015, "Maharashtra", None)
+HOT_QUERIES.append(("dashboard page by state and year",
+                    "SELECT c.* " + _from + " ORDER BY c.rowid LIMIT ? OFFSET ?", _params + (50, 0), False))
+_from, _params = company_filter_sql("bharat", None, None, "Active")
+HOT_QUERIES.append(("dashboard count by text and status", "SELECT COUNT(*) " + _from, _params, False))
+
+# Plans name tables by their alias when the query uses one
+SCANNED = {"companies", "change_log", "change_events", "daily_rollups", "company_history", "c", "cl", "e"}
+
+def plan_problems(plan, ordered_by_index):
+    problems = [line for line in plan if line.startswith("SCAN ")
+                and line.split()[1] in SCANNED]
+    if ordered_by_index:
+        problems += [line for line in plan if "TEMP B-TREE" in line]
+    return problems
+
+# Legacy rows (CIN, Date_of_Incorporation, NIC_Code, expected year), with dates in
+# every format utils.parse_date reads
+LEGACY_COMPANIES = [
+    ("U00000MH2020PTC000000", "2020-03-15", "62011", 2020),
+    ("U00001MH2015PLC000001", "07-11-2015", "10712", 2015),
+    ("U00002DL2011PTC000002", "21/06/2011", "4520", 2011),
+    ("U00003KA2009PTC000003", "2009/01/30", None, 2009),
+    ("U00004TN2001PTC000004", "not a date", "64191", None),
+    ("U00005GJ1999PTC000005", None, "99999", None),
+]
+
+@pytest.fixture(scope="module")
+def migrated_db():
+    """The scratch DB created at schema version 1 with legacy rows, then migrated."""
+    for suffix in ("", "-wal", "-shm"):
+        DB_PATH.with_name(DB_PATH.name + suffix).unlink(missing_ok=True)
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.executescript(SCHEMA_COMPANIES + SCHEMA_CHANGELOG)
+        conn.executemany(f"INSERT INTO companies ({', '.join(CANONICAL_COLUMNS)}) VALUES "
+                         f"({', '.join('?' * len(CANONICAL_COLUMNS))})",
+                         [(cin, f"Company {i}", "Private", d, 1e6, 5e5, "Active", nic, "Addr", "RoC-X", "Maharashtra")
+                          for i, (cin, d, nic, _) in enumerate(LEGACY_COMPANIES)])
+        conn.executemany("INSERT INTO change_log (CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         [(LEGACY_COMPANIES[0][0], "New Incorporation", "", "", "", "2025-10-18"),
+                          (LEGACY_COMPANIES[1][0], "Field Update", "Company_Status", "Active", "Strike Off", "2025-10-19")])
+        conn.execute("PRAGMA user_version = 1")
+    init_db()
+    return DB_PATH
+
+def test_migrations_reach_current_version(migrated_db):
+    with sqlite3.connect(migrated_db) as conn:
+        assert schema_version(conn) == MIGRATIONS[-1][0]
+        assert conn.execute("SELECT count(*) FROM change_log").fetchone()[0] == 2
+
+def test_migrated_derived_columns_match_ingest(migrated_db):
+    # The migration backfill must agree with what ingest writes for the same values
+    with sqlite3.connect(migrated_db) as conn:
+        got = pd.read_sql_query("SELECT CIN, Incorporation_Year, NIC_Sector FROM companies ORDER BY rowid", conn)
+    legacy = pd.DataFrame(LEGACY_COMPANIES, columns=["CIN", "Date_of_Incorporation", "NIC_Code", "Year"])
+    assert got['Incorporation_Year'].astype('Int64').tolist() == legacy['Year'].astype('Int64').tolist()
+    assert got['Incorporation_Year'].astype('Int64').tolist() == \
+        incorporation_year_series(legacy['Date_of_Incorporation']).tolist()
+    expected_sectors = nic_sector_series(legacy['NIC_Code'])
+    assert got['NIC_Sector'].tolist() == expected_sectors.where(expected_sectors.notna(), None).tolist()
+
+@pytest.mark.parametrize("label,sql,params,ordered_by_index", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_query_plan_uses_indexes(migrated_db, label, sql, params, ordered_by_index):
+    plan = explain_query_plan(sql, params)
+    assert not plan_problems(plan, ordered_by_index), " | ".join(plan)
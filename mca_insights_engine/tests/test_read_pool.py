@@ -0,0 +1,80 @@
+"""api._ReadPool hands out pooled read-only connections, and the API refuses a database
+it would have to migrate."""
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from mca_insights import api
+from mca_insights.config import DB_PATH
+from mca_insights.database import SCHEMA_VERSION, schema_version
+
+def test_connections_are_reused(fresh_db):
+    pool = api._ReadPool(2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as again:
+        assert again is first
+    assert pool._opened == 1
+
+def test_pool_size_caps_open_connections(fresh_db):
+    pool = api._ReadPool(2)
+    got = []
+    with pool.connection() as a, pool.connection() as b:
+        assert a is not b
+        waiter = threading.Thread(target=lambda: got.append(pool.connection().__enter__()))
+        waiter.start()
+        waiter.join(0.2)
+        assert waiter.is_alive() and not got   # a third borrower waits instead of opening
+    waiter.join(2)
+    assert got[0] in (a, b)
+    assert pool._opened == 2
+
+def test_connections_reject_writes(fresh_db):
+    with api._ReadPool(1).connection() as conn:
+        assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM companies")
+
+def test_pool_resets_after_fork(fresh_db):
+    pool = api._ReadPool(1)
+    with pool.connection() as parent_conn:
+        parent_id = id(parent_conn)
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # The child must open its own connection, even with the parent's still idle in the pool
+        try:
+            with pool.connection() as conn:
+                ok = pool._opened == 1 and pool._pid == os.getpid() and id(conn) != parent_id
+                conn.execute("SELECT count(*) FROM companies").fetchone()
+            os.write(write, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(write)
+    assert os.read(read, 1) == b"1"
+    os.close(read)
+    os.waitpid(pid, 0)
+    with pool.connection() as conn:
+        assert id(conn) == parent_id
+
+def test_api_refuses_outdated_schema(fresh_db, monkeypatch):
+    with sqlite3.connect(fresh_db) as conn:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1}")
+    monkeypatch.setattr(api, "_pool", api._ReadPool(2))
+    monkeypatch.setattr(api, "_cache", api._ResponseCache(16, 60, 0))
+    res = api.app.test_client().get("/search_company", query_string={"name": "tech"})
+    assert res.status_code == 503
+    assert f"schema version {SCHEMA_VERSION - 1}" in res.get_json()["error"]
+    with sqlite3.connect(fresh_db) as conn:
+        assert schema_version(conn) == SCHEMA_VERSION - 1   # the API never migrates
+
+def test_api_refuses_missing_database(fresh_db, monkeypatch):
+    for suffix in ("", "-wal", "-shm"):
+        DB_PATH.with_name(DB_PATH.name + suffix).unlink(missing_ok=True)
+    monkeypatch.setattr(api, "_pool", api._ReadPool(2))
+    res = api.app.test_client().get("/companies")
+    assert res.status_code == 503
+    assert "does not exist" in res.get_json()["error"]
+    assert not DB_PATH.exists()
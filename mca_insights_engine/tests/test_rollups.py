@@ -0,0 +1,102 @@
+"""daily_rollups stays equal to a GROUP BY over change_log through reruns and appends,
+and summarize_window totals a multi-day window from it."""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from mca_insights.ai_summary import PERIOD_DAYS, summarize_window, window_start
+from mca_insights.change_detector import detect_changes, rows_to_write
+from mca_insights.database import apply_daily_changes, log_changes, replace_changes_for_date, seed_companies
+
+DATES = ["2025-10-17", "2025-10-18", "2025-10-19", "2025-10-20"]
+ROLLUP_SQL = "SELECT Date, Change_Type, Field_Changed, State, Sector, Count FROM daily_rollups ORDER BY 1, 2, 3, 4, 5"
+GROUP_BY_SQL = """
+SELECT cl.Date, cl.Change_Type, cl.Field_Changed, coalesce(c.State, '') AS State,
+       coalesce(c.NIC_Sector, '') AS Sector, COUNT(*) AS Count
+FROM change_log cl LEFT JOIN companies c ON c.CIN = cl.CIN
+GROUP BY 1, 2, 3, 4, 5 ORDER BY 1, 2, 3, 4, 5
+"""
+
+def snapshots():
+    n = 8
+    day0 = pd.DataFrame({
+        "CIN": [f"U{i:05d}MH2020PTC{i:06d}" for i in range(n)],
+        "Company_Name": [f"Company {i} Pvt Ltd" for i in range(n)],
+        "Company_Class": "Private",
+        "Date_of_Incorporation": "2020-01-01",
+        "Authorized_Capital": 1e6,
+        "Paidup_Capital": 5e5,
+        "Company_Status": "Active",
+        "NIC_Code": ["62011", "10712", "46900"] * 2 + ["62011", "10712"],
+        "Registered_Address": [f"{i}, City" for i in range(n)],
+        "RoC": "RoC",
+        "State": ["Maharashtra", "Gujarat", "Delhi", "Maharashtra"] * 2,
+    })
+    day1 = day0[day0["CIN"] != day0.at[7, "CIN"]].copy()
+    day1.loc[[0, 1], "Company_Status"] = "Strike Off"
+    new = day0.iloc[[2]].assign(CIN="U00008DL2025PTC000008", Company_Name="Company 8 Pvt Ltd")
+    day1 = pd.concat([day1, new], ignore_index=True)
+    day2 = day1[day1["CIN"] != day0.at[6, "CIN"]].copy()
+    day2.loc[day2["CIN"] == day0.at[3, "CIN"], ["Company_Status", "Authorized_Capital"]] = ["Dormant", 2e6]
+    day3 = day2.copy()
+    day3.loc[day3["CIN"] == day0.at[4, "CIN"], "Company_Status"] = "Under Liquidation"
+    return [day0, day1, day2, day3]
+
+def apply_day(prev, curr, d):
+    changes = detect_changes(prev, curr, d)
+    apply_daily_changes(rows_to_write(prev, curr, changes), changes, d)
+
+def rollups_and_group_by(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql_query(ROLLUP_SQL, conn), pd.read_sql_query(GROUP_BY_SQL, conn)
+
+@pytest.fixture
+def rolled_up(fresh_db):
+    frames = snapshots()
+    seed_companies(frames[0], DATES[0])
+    for prev, curr, d in zip(frames, frames[1:], DATES[1:]):
+        apply_day(prev, curr, d)
+    return fresh_db
+
+def test_rollups_match_change_log(rolled_up):
+    rollups, expected = rollups_and_group_by(rolled_up)
+    assert len(rollups) > len(DATES)   # several states, sectors and types per day
+    pd.testing.assert_frame_equal(rollups, expected)
+
+def test_rerun_same_date_keeps_rollups_exact(rolled_up):
+    before, _ = rollups_and_group_by(rolled_up)
+    frames = snapshots()
+    apply_day(frames[2], frames[3], DATES[3])   # the latest day, applied again
+    apply_day(frames[2], frames[3], DATES[3])
+    rollups, expected = rollups_and_group_by(rolled_up)
+    pd.testing.assert_frame_equal(rollups, expected)
+    pd.testing.assert_frame_equal(rollups, before)
+
+    # replace_changes_for_date swaps a day's rows; log_changes adds to them
+    cin = snapshots()[0].at[5, "CIN"]
+    replace_changes_for_date(DATES[2], [{'CIN': cin, 'Change_Type': 'Field Update', 'Field_Changed': 'Company_Status',
+                                         'Old_Value': 'Active', 'New_Value': 'Dormant', 'Date': DATES[2]}])
+    log_changes([{'CIN': "U99999KA2025PTC999999", 'Change_Type': 'New Incorporation', 'Date': DATES[2]}])
+    rollups, expected = rollups_and_group_by(rolled_up)
+    pd.testing.assert_frame_equal(rollups, expected)
+    assert rollups.loc[rollups['Date'] == DATES[2], 'Count'].sum() == 2
+
+@pytest.mark.parametrize("period", ["day", "week"])
+def test_summarize_window_matches_change_log(rolled_up, period):
+    end = DATES[-1]
+    start = window_start(end, period)
+    summary = summarize_window(start, end)
+    with sqlite3.connect(rolled_up) as conn:
+        log = pd.read_sql_query(
+            "SELECT cl.Date, cl.Change_Type, cl.Field_Changed, coalesce(c.State, '') AS State "
+            "FROM change_log cl LEFT JOIN companies c ON c.CIN = cl.CIN WHERE cl.Date BETWEEN ? AND ?",
+            conn, params=(start, end))
+    by_type = log['Change_Type'].value_counts()
+    assert (summary["new_incorporations"], summary["deregistered"], summary["updated_records"]) == (
+        by_type.get('New Incorporation', 0), by_type.get('Deregistered', 0), by_type.get('Field Update', 0))
+    updates = log[log['Change_Type'] == 'Field Update']
+    assert summary["field_updates"] == updates['Field_Changed'].value_counts().to_dict()
+    assert {s: sum(v.values()) for s, v in summary["by_state"].items()} == log['State'].value_counts().to_dict()
+    assert [d["date"] for d in summary["daily"]] == sorted(log['Date'].unique())
+    assert len(summary["daily"]) == min(PERIOD_DAYS[period], len(DATES) - 1)
@@ -0,0 +1,22 @@
+"""Fast-mode sample data: CIN layout and uniqueness."""
+import re
+
+import numpy as np
+
+from sample_data_generator import generate_companies_fast, _state_rng
+
+REGISTRY_CIN = re.compile(r"U[0-9]{5}[A-Z]{2}[0-9]{4}(?:PLC|PTC)[0-9]{6}")
+
+def test_cins_follow_registry_layout():
+    seqs = np.array([1, 999_999, 10**6, 10**6 + 1, 42 * 10**6 + 7, 10**8 - 1])
+    df = generate_companies_fast(_state_rng(42, 0), seqs, "Maharashtra")
+    assert all(REGISTRY_CIN.fullmatch(c) for c in df['CIN'])
+    assert [c[-6:] for c in df['CIN']] == [f"{s % 10**6:06d}" for s in seqs]
+    assert df['CIN'].is_unique
+
+def test_cins_unique_across_million_blocks():
+    # Same low six digits in every block; the NIC tail keeps them apart
+    seqs = np.concatenate([np.arange(1, 2001) + b * 10**6 for b in range(5)])
+    df = generate_companies_fast(_state_rng(7, 1), seqs, "Gujarat")
+    assert df['CIN'].is_unique
+    assert df['CIN'].str.len().eq(21).all()
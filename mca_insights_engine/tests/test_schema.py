@@ -0,0 +1,21 @@
+"""concat_typed: categoricals stay categorical, values as plain concat gives them."""
+import pandas as pd
+import pytest
+
+from mca_insights.schema import concat_typed
+
+@pytest.mark.parametrize("left,right", [
+    ([62, 46], [62, 10]),          # same dtype
+    ([62, 46], ["62", "x"]),       # int and text -> object
+    ([62, 46], [1.5]),             # int and float -> float
+    ([True], [1]),                 # bool and int -> object
+    ([], [62, 46]),                # empty categories don't decide the dtype
+])
+def test_concat_typed_matches_plain_concat(left, right):
+    frames = [pd.DataFrame({'NIC_Code': pd.Series(v, dtype=object if not v else None).astype('category')})
+              for v in (left, right)]
+    out = concat_typed(frames)
+    assert isinstance(out['NIC_Code'].dtype, pd.CategoricalDtype)
+    plain = pd.concat([f.astype({'NIC_Code': f['NIC_Code'].cat.categories.dtype}) for f in frames],
+                      ignore_index=True)['NIC_Code']
+    pd.testing.assert_series_equal(out['NIC_Code'].astype(plain.dtype), plain)
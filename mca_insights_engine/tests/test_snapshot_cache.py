@@ -0,0 +1,76 @@
+"""The consolidated-snapshot cache is rebuilt when a state CSV's content changes, even with its
+mtime set back, and served as-is when a file was only touched."""
+import os
+
+import pytest
+
+from mca_insights import integrate, snapshot_cache
+
+pytest.importorskip("pyarrow")
+
+HEADER = ("CIN,Company_Name,Company_Class,Date_of_Incorporation,Authorized_Capital,Paidup_Capital,"
+          "Company_Status,NIC_Code,Registered_Address,RoC,State\n")
+
+def row(n, status="Active"):
+    return (f"U{n:05d}MH2020PTC{n:06d},Company {n} Pvt Ltd,Private,2020-01-01,100000,50000,"
+            f"{status},62011,1 Mumbai,RoC-Mumbai,Maharashtra\n")
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    """A snapshot dir with one state CSV, consolidated once so its cache entry exists;
+    returns (csv path, list of dirs parsed from CSV since)."""
+    monkeypatch.setattr(snapshot_cache, "SNAPSHOT_CACHE_DIR", tmp_path / "cache")
+    snap = tmp_path / "2025-10-18"
+    snap.mkdir()
+    csv = snap / "maharashtra.csv"
+    csv.write_text(HEADER + row(1) + row(2))
+    integrate.consolidate_snapshot_dir(snap, workers=1, use_cache=True)
+
+    parsed = []
+    from_csv = integrate._consolidate_from_csv
+    monkeypatch.setattr(integrate, "_consolidate_from_csv",
+                        lambda d, workers=None: parsed.append(d) or from_csv(d, workers))
+    return csv, parsed
+
+def consolidate(csv):
+    return integrate.consolidate_snapshot_dir(csv.parent, workers=1, use_cache=True)
+
+def test_unchanged_snapshot_is_served_from_cache(snapshot):
+    csv, parsed = snapshot
+    assert consolidate(csv)['CIN'].tolist() == ["U00001MH2020PTC000001", "U00002MH2020PTC000002"]
+    assert parsed == []
+
+@pytest.mark.parametrize("edit", ["same-size", "resized"])
+def test_content_change_with_mtime_restored_rebuilds(snapshot, edit):
+    csv, parsed = snapshot
+    st = csv.stat()
+    status = "Closed" if edit == "same-size" else "Strike Off"   # 'Active' -> same length / longer
+    csv.write_text(HEADER + row(1) + row(2, status))
+    os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert (csv.stat().st_size == st.st_size) == (edit == "same-size")
+
+    assert consolidate(csv)['Company_Status'].tolist() == ["Active", status]
+    assert parsed == [csv.parent]
+    # The rebuilt entry is current again
+    consolidate(csv)
+    assert parsed == [csv.parent]
+
+def test_touch_only_is_served_from_cache(snapshot, monkeypatch):
+    csv, parsed = snapshot
+    st = csv.stat()
+    os.utime(csv, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert consolidate(csv)['Company_Status'].tolist() == ["Active", "Active"]
+    assert parsed == []
+    # The manifest now records the new times, so the next load doesn't rehash
+    hashed = []
+    sha256 = snapshot_cache._sha256
+    monkeypatch.setattr(snapshot_cache, "_sha256", lambda p: hashed.append(p) or sha256(p))
+    consolidate(csv)
+    assert hashed == [] and parsed == []
+
+def test_cache_version_bump_invalidates(snapshot, monkeypatch):
+    csv, parsed = snapshot
+    monkeypatch.setattr(snapshot_cache, "CACHE_VERSION", snapshot_cache.CACHE_VERSION + 1)
+    assert snapshot_cache.load_cached_snapshot(csv.parent) is None
+    consolidate(csv)
+    assert parsed == [csv.parent]
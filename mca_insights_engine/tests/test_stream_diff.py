@@ -0,0 +1,135 @@
+"""stream_changes (out-of-core diff) against detect_changes on consolidated frames, and
+streamed pipeline days against the in-memory ones."""
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import run_pipeline
+from mca_insights.change_detector import detect_changes, rows_to_write, CHANGE_COLUMNS
+from mca_insights.config import SNAPSHOTS_DIR
+from mca_insights.database import (init_db, set_hashes_date, seed_companies, apply_daily_changes, company_as_of,
+                                   OPEN_VALID_TO)
+from mca_insights.integrate import consolidate_snapshot_dir
+from mca_insights.stream_diff import stream_changes
+
+DATES = ("2025-10-17", "2025-10-18", "2025-10-19")
+TYPE_ORDER = {'New Incorporation': 0, 'Deregistered': 1, 'Field Update': 2}
+
+def in_memory(prev_dir, curr_dir, date_str):
+    prev = consolidate_snapshot_dir(prev_dir, workers=1, use_cache=False)
+    curr = consolidate_snapshot_dir(curr_dir, workers=1, use_cache=False)
+    return detect_changes(prev, curr, date_str)
+
+def streamed(prev_dir, curr_dir, date_str):
+    # stream_changes yields in CIN order; regroup by change type as detect_changes orders them
+    df = pd.DataFrame(list(stream_changes(prev_dir, curr_dir, date_str, chunk_rows=97)), columns=CHANGE_COLUMNS)
+    order = df['Change_Type'].map(TYPE_ORDER).sort_values(kind='stable').index
+    return df.loc[order].reset_index(drop=True)
+
+@pytest.mark.parametrize("prev_date,curr_date", list(zip(DATES, DATES[1:])))
+def test_demo_snapshots(prev_date, curr_date):
+    prev_dir, curr_dir = SNAPSHOTS_DIR / prev_date, SNAPSHOTS_DIR / curr_date
+    pd.testing.assert_frame_equal(streamed(prev_dir, curr_dir, curr_date),
+                                  in_memory(prev_dir, curr_dir, curr_date).astype(object))
+
+def test_blank_fields(tmp_path):
+    prev_dir, curr_dir = tmp_path / DATES[0], tmp_path / DATES[1]
+    shutil.copytree(SNAPSHOTS_DIR / DATES[0], prev_dir)
+    shutil.copytree(SNAPSHOTS_DIR / DATES[1], curr_dir)
+    # Blank a few fields on either side, including text, categorical and capital columns
+    for day_dir, rows, cols in ((prev_dir, [0, 3], ['Company_Status', 'Paidup_Capital']),
+                                (curr_dir, [1, 3], ['Company_Status', 'Company_Name', 'Authorized_Capital'])):
+        path = day_dir / "maharashtra.csv"
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        df.loc[rows, cols] = ''
+        df.to_csv(path, index=False)
+
+    expected = in_memory(prev_dir, curr_dir, DATES[1])
+    assert 'nan' in set(expected['Old_Value']) and 'nan' in set(expected['New_Value'])
+    pd.testing.assert_frame_equal(streamed(prev_dir, curr_dir, DATES[1]), expected.astype(object))
+
+STATE_SQL = {
+    "companies": "SELECT * FROM companies ORDER BY CIN",
+    "change_log": "SELECT CIN, Change_Type, Field_Changed, Old_Value, New_Value, Date FROM change_log "
+                  "ORDER BY Date, CIN, Change_Type, Field_Changed",
+    "company_hashes": "SELECT * FROM company_hashes ORDER BY CIN",
+    "company_history": "SELECT * FROM company_history ORDER BY CIN, valid_from",
+}
+
+def reset_db(db_path):
+    for suffix in ("", "-wal", "-shm"):
+        db_path.with_name(db_path.name + suffix).unlink(missing_ok=True)
+    init_db()
+
+def db_state(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {name: pd.read_sql_query(sql, conn) for name, sql in STATE_SQL.items()}
+
+@pytest.mark.parametrize("stream_seed", [False, True], ids=["seeded-in-memory", "seeded-streamed"])
+def test_streamed_days_write_only_changed_companies(fresh_db, monkeypatch, stream_seed):
+    run_pipeline.run_for_dates(list(DATES))
+    expected = db_state(fresh_db)
+    reset_db(fresh_db)
+
+    if stream_seed:
+        run_pipeline._stream_day(None, SNAPSHOTS_DIR / DATES[0], DATES[0])
+    else:
+        run_pipeline.run_for_dates(list(DATES[:1]))
+    written, upsert = [], run_pipeline.upsert_companies
+
+    def recording_upsert(rows, hashes=None):
+        written.extend(r['CIN'] for r in rows)
+        upsert(rows, hashes)
+
+    monkeypatch.setattr(run_pipeline, "upsert_companies", recording_upsert)
+    for prev_date, curr_date in zip(DATES, DATES[1:]):
+        written.clear()
+        run_pipeline._stream_day(SNAPSHOTS_DIR / prev_date, SNAPSHOTS_DIR / curr_date, curr_date)
+        prev = consolidate_snapshot_dir(SNAPSHOTS_DIR / prev_date, workers=1, use_cache=False)
+        curr = consolidate_snapshot_dir(SNAPSHOTS_DIR / curr_date, workers=1, use_cache=False)
+        want = rows_to_write(prev, curr, detect_changes(prev, curr, curr_date))['CIN']
+        assert sorted(written) == sorted(want)
+        assert 0 < len(written) < len(curr)
+
+    got = db_state(fresh_db)
+    for name in STATE_SQL:
+        pd.testing.assert_frame_equal(got[name], expected[name], obj=name)
+
+def test_streamed_day_writes_all_without_matching_hashes(fresh_db, monkeypatch):
+    run_pipeline.run_for_dates(list(DATES[:1]))
+    set_hashes_date(None)
+    written = []
+    monkeypatch.setattr(run_pipeline, "upsert_companies", lambda rows, hashes=None: written.extend(rows))
+    run_pipeline._stream_day(SNAPSHOTS_DIR / DATES[0], SNAPSHOTS_DIR / DATES[1], DATES[1])
+    assert len(written) == len(consolidate_snapshot_dir(SNAPSHOTS_DIR / DATES[1], workers=1, use_cache=False))
+
+@pytest.mark.parametrize("streamed", [False, True], ids=["in-memory", "streamed"])
+def test_address_only_edit_opens_a_version(fresh_db, tmp_path, streamed):
+    prev_dir, curr_dir = tmp_path / DATES[0], tmp_path / DATES[1]
+    shutil.copytree(SNAPSHOTS_DIR / DATES[0], prev_dir)
+    shutil.copytree(SNAPSHOTS_DIR / DATES[0], curr_dir)
+    path = curr_dir / "maharashtra.csv"
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    cin, old_address = df.at[0, 'CIN'], df.at[0, 'Registered_Address']
+    df.at[0, 'Registered_Address'] = "1, Moved Street, Pune"
+    df.to_csv(path, index=False)
+
+    prev = consolidate_snapshot_dir(prev_dir, workers=1, use_cache=False)
+    seed_companies(prev, DATES[0])
+    if streamed:
+        run_pipeline._stream_day(prev_dir, curr_dir, DATES[1])
+    else:
+        curr = consolidate_snapshot_dir(curr_dir, workers=1, use_cache=False)
+        changes = detect_changes(prev, curr, DATES[1])
+        assert changes.empty
+        apply_daily_changes(rows_to_write(prev, curr, changes), changes, DATES[1])
+
+    with sqlite3.connect(fresh_db) as conn:
+        got = conn.execute("SELECT valid_from, valid_to, Registered_Address FROM company_history "
+                           "WHERE CIN = ? ORDER BY valid_from", (cin,)).fetchall()
+        opened = conn.execute("SELECT count(*) FROM company_history WHERE valid_from = ?", (DATES[1],)).fetchone()[0]
+    assert got == [(DATES[0], DATES[1], old_address), (DATES[1], OPEN_VALID_TO, "1, Moved Street, Pune")]
+    assert opened == 1
+    assert company_as_of(cin, DATES[1])['Registered_Address'] == "1, Moved Street, Pune"
@@ -0,0 +1,38 @@
+"""The vectorized cleaning helpers give the same value per cell as their scalar versions."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from mca_insights.utils import (normalize_cin, normalize_cin_series, to_float, to_float_series,
+                                incorporation_year, incorporation_year_series, nic_sector, nic_sector_series)
+
+TEXT = ['1,00,000', '₹ 5,000', ' 2,500.50 ', '', None, np.nan, 'abc', '12abc', '-3', '1e3', 'nan',
+        'u12345mh2020ptc123456', ' L12345 DL2019 PLC000001 ', 'U12345MH2020PTC123456',
+        '2020-03-15', ' 2020-03-15', '07-11-2015', '21/06/2011', '2009/01/30', 'not a date', '+202-01-01',
+        '62011', '4520', '10', 'No', 'x']
+COLUMNS = {
+    "object": pd.Series(TEXT, dtype=object),
+    "string-only": pd.Series([t for t in TEXT if isinstance(t, str)], dtype=object),
+    "float": pd.Series([100000.0, 5000.5, np.nan, 0.0, 62011.0, 2020.0]),
+    "int": pd.Series([100000, 5000, 0, 62011, 4520, 2020]),
+    "object-numbers": pd.Series([100000, 5000.5, None, np.nan, '62', 2020], dtype=object),
+    "string-dtype": pd.Series([t if isinstance(t, str) else None for t in TEXT], dtype="string"),
+    "category": pd.Series(['62011', '4520', None, '2020-03-15', 'u12345mh2020ptc123456'], dtype="category"),
+}
+HELPERS = [(normalize_cin, normalize_cin_series), (to_float, to_float_series),
+           (incorporation_year, incorporation_year_series), (nic_sector, nic_sector_series)]
+
+def same(a, b):
+    """Equal values, counting any two missing values (None, NaN, NA) as equal."""
+    if pd.isna(a) or pd.isna(b):
+        return pd.isna(a) and pd.isna(b)
+    return a == b
+
+@pytest.mark.parametrize("scalar,vectorized", HELPERS, ids=[h[0].__name__ for h in HELPERS])
+@pytest.mark.parametrize("column", list(COLUMNS))
+def test_vectorized_matches_scalar(scalar, vectorized, column):
+    s = COLUMNS[column]
+    got = vectorized(s)
+    assert got.index.equals(s.index)
+    mismatches = [(v, g, scalar(v)) for v, g in zip(s, got) if not same(g, scalar(v))]
+    assert not mismatches, mismatches